@@ -0,0 +1,78 @@
+import collections
+import os
+import numpy as np
+
+class ACache(object):
+    """Cache of generated A matrices keyed by (variant, seedA), for performance
+    testing with many operations against the same public key.
+
+    The in-memory tier is an LRU bounded by max_bytes. If directory is given,
+    matrices are also stored there as .npy files and loaded memory-mapped, so
+    they are shared across processes and runs.
+
+    Note that looking up A by seedA is not constant-time; do not use this in
+    production environments."""
+
+    def __init__(self, max_bytes = 64 * 2**20, directory = None):
+        self.max_bytes = max_bytes
+        self.directory = directory
+        self.nbytes = 0
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.__entries = collections.OrderedDict()
+        if directory is not None:
+            os.makedirs(directory, exist_ok = True)
+
+    def __path(self, variant, seedA):
+        return os.path.join(self.directory, "{:s}-{:s}.npy".format(variant, bytes(seedA).hex()))
+
+    def __insert(self, key, A):
+        """Insert into the in-memory tier, evicting least recently used entries
+        to stay within max_bytes; matrices larger than max_bytes are not kept"""
+        if A.nbytes > self.max_bytes: return
+        self.__entries[key] = A
+        self.nbytes += A.nbytes
+        while self.nbytes > self.max_bytes:
+            _, evicted = self.__entries.popitem(last = False)
+            self.nbytes -= evicted.nbytes
+
+    def get(self, variant, seedA):
+        """Return the cached (read-only) A for (variant, seedA), or None"""
+        key = (variant, bytes(seedA))
+        if key in self.__entries:
+            self.__entries.move_to_end(key)
+            self.hits += 1
+            return self.__entries[key]
+        if self.directory is not None:
+            path = self.__path(variant, seedA)
+            if os.path.exists(path):
+                A = np.load(path, mmap_mode = 'r')
+                self.__insert(key, A)
+                self.disk_hits += 1
+                return A
+        self.misses += 1
+        return None
+
+    def put(self, variant, seedA, A):
+        """Store A for (variant, seedA) in the cache"""
+        key = (variant, bytes(seedA))
+        # Freeze a view so the caller's array is left writeable
+        A = np.asarray(A).view()
+        A.flags.writeable = False
+        if key in self.__entries:
+            self.nbytes -= self.__entries.pop(key).nbytes
+        self.__insert(key, A)
+        if self.directory is not None:
+            path = self.__path(variant, seedA)
+            if not os.path.exists(path):
+                # Write to a temporary file first so other processes never see a partial file
+                tmp_path = "{:s}.{:d}.tmp".format(path, os.getpid())
+                with open(tmp_path, 'wb') as fh:
+                    np.save(fh, A)
+                os.replace(tmp_path, path)
+
+    def clear(self):
+        """Empty the in-memory tier (files on disk are kept)"""
+        self.__entries.clear()
+        self.nbytes = 0
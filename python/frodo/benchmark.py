@@ -0,0 +1,167 @@
+import argparse
+import contextlib
+import io
+import json
+import platform
+import sys
+import time
+import warnings
+import numpy as np
+from frodokem import FrodoKEM
+from nist_kat import NISTKAT, KAT_FILES
+
+# Methods of FrodoKEM timed by the benchmark and the stage each is accounted to
+STAGES = {
+    'gen_rows': 'gen',
+    'sample_matrix': 'sample',
+    'sample': 'sample',
+    '_matrix_mul': 'matrix_mul',
+    '_gen_A_mul': 'matrix_mul',
+    '_mul_gen_A': 'matrix_mul',
+    '_matrix_add': 'matrix_add',
+    '_matrix_sub': 'matrix_add',
+    'pack': 'pack',
+    'unpack': 'pack',
+    'encode': 'encode',
+    'decode': 'encode',
+}
+
+OPS = ['keygen', 'encaps', 'decaps']
+
+class StageTimer(object):
+    """Wraps the methods of a FrodoKEM instance listed in STAGES (and shake) so that
+    the time spent in each stage is accumulated. Times are exclusive: time spent in
+    a nested timed call (e.g. gen_rows inside _gen_A_mul) is only counted once, for
+    the innermost stage."""
+
+    def __init__(self, kem):
+        self.times = dict()
+        self.__stack = []
+        for name, stage in STAGES.items():
+            setattr(kem, name, self.__wrap(getattr(kem, name), lambda *args, stage = stage: stage))
+        # shake calls with a longer output than seedSE || k (the longest hash) are the
+        # expansion of seedSE into r, the others are the seedA/pkh/seedSE||k/ss hashes
+        hash_max_bytes = kem.len_seedSE_bytes + kem.len_k_bytes
+        shake_stage = lambda msg, digest_len: 'shake_expand' if digest_len > hash_max_bytes else 'shake_hash'
+        kem.shake = self.__wrap(kem.shake, shake_stage)
+
+    def __wrap(self, func, stage_of):
+        def timed(*args):
+            self.__stack.append(0.0)
+            start = time.perf_counter()
+            try:
+                return func(*args)
+            finally:
+                elapsed = time.perf_counter() - start
+                children = self.__stack.pop()
+                if self.__stack: self.__stack[-1] += elapsed
+                stage = stage_of(*args)
+                self.times[stage] = self.times.get(stage, 0.0) + elapsed - children
+        return timed
+
+    def measure(self, func, *args):
+        """Call func and return (result, {stage: seconds}); time not spent in any
+        timed stage is reported as 'other' and the whole call as 'total'"""
+        self.times = dict()
+        start = time.perf_counter()
+        result = func(*args)
+        total = time.perf_counter() - start
+        times = dict(self.times)
+        times['other'] = total - sum(times.values())
+        times['total'] = total
+        return result, times
+
+def summarize(samples):
+    """Median and spread (min, max, interquartile range) of a list of timings"""
+    samples = np.asarray(samples)
+    q1, median, q3 = np.percentile(samples, [25, 50, 75])
+    return {'median': float(median), 'iqr': float(q3 - q1), 'min': float(samples.min()), 'max': float(samples.max())}
+
+def benchmark_variant(variant, trials = 10, warmup = 2, gen_workers = None):
+    """Time keygen, encaps and decaps of one variant stage by stage; returns
+    {op: {stage: summary}}"""
+    kem = FrodoKEM(variant)
+    kem.gen_workers = gen_workers
+    kem.randombytes = NISTKAT.NISTRNG().randombytes
+    timer = StageTimer(kem)
+    samples = {op: dict() for op in OPS}
+    with contextlib.redirect_stdout(io.StringIO()):
+        for trial in range(warmup + trials):
+            (pk, sk), keygen_times = timer.measure(kem.kem_keygen)
+            (ct, ss), encaps_times = timer.measure(kem.kem_encaps, pk)
+            _, decaps_times = timer.measure(kem.kem_decaps, sk, ct)
+            if trial < warmup: continue
+            for op, times in zip(OPS, [keygen_times, encaps_times, decaps_times]):
+                for stage, t in times.items():
+                    samples[op].setdefault(stage, []).append(t)
+    return {op: {stage: summarize(t) for stage, t in samples[op].items()} for op in OPS}
+
+def run_benchmarks(variants = None, trials = 10, warmup = 2, gen_workers = None):
+    """Benchmark the given variants (default: all); returns a JSON-serializable result"""
+    if variants is None: variants = list(KAT_FILES.keys())
+    return {
+        'meta': {
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'machine': platform.machine(),
+            'trials': trials,
+            'warmup': warmup,
+            'gen_workers': gen_workers,
+        },
+        'results': {variant: benchmark_variant(variant, trials, warmup, gen_workers) for variant in variants},
+    }
+
+def compare(current, baseline, threshold = 0.1, min_seconds = 1e-4):
+    """Compare the medians of current against baseline; returns a list of regressions
+    (variant, op, stage, baseline median, current median) where the current median is
+    more than threshold (relative) slower. Stages faster than min_seconds in both runs
+    are ignored as noise."""
+    regressions = []
+    for variant, ops in current['results'].items():
+        for op, stages in ops.items():
+            for stage, summary in stages.items():
+                try:
+                    base = baseline['results'][variant][op][stage]['median']
+                except KeyError:
+                    continue
+                cur = summary['median']
+                if max(base, cur) < min_seconds: continue
+                if cur > base * (1 + threshold):
+                    regressions.append((variant, op, stage, base, cur))
+    return regressions
+
+def print_results(current):
+    for variant, ops in current['results'].items():
+        print("=" * 60)
+        print(variant)
+        for op, stages in ops.items():
+            print("  {:s}: {:.2f} ms (iqr {:.2f} ms)".format(op, 1e3 * stages['total']['median'], 1e3 * stages['total']['iqr']))
+            for stage, summary in sorted(stages.items(), key = lambda item: -item[1]['median']):
+                if stage == 'total': continue
+                print("    {:<14s} {:8.3f} ms  (iqr {:.3f}, min {:.3f}, max {:.3f})".format(stage, 1e3 * summary['median'], 1e3 * summary['iqr'], 1e3 * summary['min'], 1e3 * summary['max']))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description = "Per-stage benchmark of the FrodoKEM reference implementation")
+    parser.add_argument('--variants', nargs = '+', default = None, help = "variants to benchmark (default: all)")
+    parser.add_argument('--trials', type = int, default = 10)
+    parser.add_argument('--warmup', type = int, default = 2)
+    parser.add_argument('--gen-workers', type = int, default = None, help = "threads generating the rows of A (default: serial)")
+    parser.add_argument('--save', help = "write the results as a JSON baseline to this file")
+    parser.add_argument('--compare', help = "compare against the JSON baseline in this file")
+    parser.add_argument('--threshold', type = float, default = 0.1, help = "relative slowdown of a median flagged as a regression")
+    args = parser.parse_args()
+    warnings.simplefilter("ignore")
+    current = run_benchmarks(args.variants, args.trials, args.warmup, args.gen_workers)
+    print_results(current)
+    if args.save:
+        with open(args.save, 'w') as fh:
+            json.dump(current, fh, indent = 4)
+    if args.compare:
+        with open(args.compare, 'r') as fh:
+            baseline = json.load(fh)
+        regressions = compare(current, baseline, args.threshold)
+        for (variant, op, stage, base, cur) in regressions:
+            print("REGRESSION {:s} {:s} {:s}: {:.3f} ms -> {:.3f} ms ({:+.0%})".format(variant, op, stage, 1e3 * base, 1e3 * cur, cur / base - 1))
+        if not regressions:
+            print("No regressions beyond {:.0%}".format(args.threshold))
+        sys.exit(1 if regressions else 0)
@@ -2,17 +2,16 @@
 # SPDX-License-Identifier: CC0-1.0
 # Created by Douglas Stebila
 
-import bitstring
-import math
+import concurrent.futures
 import secrets
 import struct
 import warnings
 from cryptography.hazmat.backends import default_backend
-from cryptography.hazmat.primitives import hashes
 from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
 import numpy as np
+from lwe_matrix import LWEMatrixEngine
 
-class FrodoKEM(object):
+class FrodoKEM(LWEMatrixEngine):
     """Reference implementation of FrodoKEM, specification version TBD, 2020
     
     Note this specification is quite slow, as it is meant to be as close as possible
@@ -22,27 +21,46 @@ class FrodoKEM(object):
         """Construct a new FrodoKEM instance
         
         - variant: One of FrodoKEM-{640,976,1344}-{AES,SHAKE}"""
+        # Optional callable trace(name, value) receiving the named intermediate values
+        # of each operation (see FrodoKEMTrace); when None nothing is captured
+        self.trace = None
         self.print_intermediate_values = False
+        # Number of rows of A generated at a time when computing A*S and S'*A;
+        # None generates the whole matrix at once
+        self.A_chunk_rows = None
+        # Optional ACache (see a_cache.py) from which A is reused across operations
+        # with the same seedA instead of being regenerated
+        self.A_cache = None
+        # Number of threads among which the rows of A are shared out when generating 
+        # A; the hash and cipher backends release the GIL while they run, so row 
+        # ranges are generated in parallel. None or 1 generates A serially
+        self.gen_workers = None
         self.variant = variant
         self.randombytes = lambda k : bytes((secrets.randbits(8) for i in range(k)))
         if variant == "FrodoKEM-640-AES":
             self.setParamsFrodo640()
             self.gen = self.genAES128
+            self.gen_rows = self.genAES128_rows
         elif variant == "FrodoKEM-640-SHAKE":
             self.setParamsFrodo640()
             self.gen = self.genSHAKE128
+            self.gen_rows = self.genSHAKE128_rows
         elif variant == "FrodoKEM-976-AES":
             self.setParamsFrodo976()
             self.gen = self.genAES128
+            self.gen_rows = self.genAES128_rows
         elif variant == "FrodoKEM-976-SHAKE":
             self.setParamsFrodo976()
             self.gen = self.genSHAKE128
+            self.gen_rows = self.genSHAKE128_rows
         elif variant == "FrodoKEM-1344-AES":
             self.setParamsFrodo1344()
             self.gen = self.genAES128
+            self.gen_rows = self.genAES128_rows
         elif variant == "FrodoKEM-1344-SHAKE":
             self.setParamsFrodo1344()
             self.gen = self.genSHAKE128
+            self.gen_rows = self.genSHAKE128_rows
         else:
             assert "Unknown variant"
         warnings.warn("WARNING: This Python3 implementation of FrodoKEM is not designed to be fast or secure, and may leak secret information via timing or other side channels; it should not be used in production environments.")
@@ -79,7 +97,7 @@ class FrodoKEM(object):
         self.len_pkh_bytes = int(self.len_pkh / 8)
         self.len_ss_bytes = int(self.len_ss / 8)
         self.len_chi_bytes = int(self.len_chi / 8)
-        self.shake = FrodoKEM.__shake128
+        self.shake = FrodoKEM._shake128
         # FrodoKEM specification, Table 5
         self.len_sk_bytes = 19888
         self.len_pk_bytes = 9616
@@ -118,7 +136,7 @@ class FrodoKEM(object):
         self.len_pkh_bytes = int(self.len_pkh / 8)
         self.len_ss_bytes = int(self.len_ss / 8)
         self.len_chi_bytes = int(self.len_chi / 8)
-        self.shake = FrodoKEM.__shake256
+        self.shake = FrodoKEM._shake256
         # FrodoKEM specification, Table 5
         self.len_sk_bytes = 31296
         self.len_pk_bytes = 15632
@@ -157,16 +175,27 @@ class FrodoKEM(object):
         self.len_pkh_bytes = int(self.len_pkh / 8)
         self.len_ss_bytes = int(self.len_ss / 8)
         self.len_chi_bytes = int(self.len_chi / 8)
-        self.shake = FrodoKEM.__shake256
+        self.shake = FrodoKEM._shake256
         # FrodoKEM specification, Table 5
         self.len_sk_bytes = 43088
         self.len_pk_bytes = 21520
         self.len_ct_bytes = 21696
         self.len_ss_bytes = 32
 
+    @property
+    def print_intermediate_values(self):
+        """Whether intermediate values are printed for debugging purposes"""
+        return self.trace == self.__print_intermediate_value
+
+    @print_intermediate_values.setter
+    def print_intermediate_values(self, enabled):
+        if enabled:
+            self.trace = self.__print_intermediate_value
+        elif self.print_intermediate_values:
+            self.trace = None
+
     def __print_intermediate_value(self, name, value):
         """Prints an intermediate value for debugging purposes"""
-        if not(self.print_intermediate_values): return None
         if isinstance(value, bytes):
             print("{:s} ({:d}) = {:s}".format(name, len(value), value.hex().upper()))
         elif name in ["r"]:
@@ -184,25 +213,9 @@ class FrodoKEM(object):
             assert False, "Unknown value type for " + name
 
     @staticmethod
-    def __shake128(msg, digest_len):
-        """Returns a bytes object containing the SHAKE-128 hash of msg with 
-        digest_len bytes of output"""
-        shake_ctx = hashes.Hash(hashes.SHAKE128(digest_len), backend = default_backend())
-        shake_ctx.update(msg)
-        return shake_ctx.finalize()
-
-    @staticmethod
-    def __shake256(msg, digest_len):
-        """Returns a bytes object containing the SHAKE-256 hash of msg with 
-        digest_len bytes of output"""
-        shake_ctx = hashes.Hash(hashes.SHAKE256(digest_len), backend = default_backend())
-        shake_ctx.update(msg)
-        return shake_ctx.finalize()
-
-    @staticmethod
-    def __aes128_16bytesonly(key, msg):
-        """Returns a bytes object containing the AES-128 encryption of the 16-byte 
-        message msg using the given key"""
+    def __aes128_ecb(key, msg):
+        """Returns a bytes object containing the AES-128 ECB encryption of msg, 
+        whose length must be a multiple of 16 bytes, using the given key"""
         cipher_ctx = Cipher(algorithms.AES(key), modes.ECB(), backend = default_backend())
         encryptor_ctx = cipher_ctx.encryptor()
         return encryptor_ctx.update(msg) + encryptor_ctx.finalize()
@@ -219,338 +232,280 @@ class FrodoKEM(object):
             T_chi[z] = T_chi[0] + sum(chi[1:z + 1])
         return T_chi
 
-    def __matrix_mul(self, X, Y):
-        """Compute matrix multiplication X * Y mod q"""
-        nrows_X = len(X)
-        ncols_X = len(X[0])
-        nrows_Y = len(Y)
-        ncols_Y = len(Y[0])
-        assert ncols_X == nrows_Y, "Mismatched matrix dimensions"
-        R = [[0 for j in range(ncols_Y)] for i in range(nrows_X)]
-        for i in range(nrows_X):
-            for j in range(ncols_Y):
-                for k in range(ncols_X):
-                    R[i][j] += X[i][k] * Y[k][j]
-                R[i][j] %= self.q
-        return R
-
-    def __matrix_add(self, X, Y):
-        """Compute matrix addition X + Y mod q"""
-        nrows_X = len(X)
-        ncols_X = len(X[0])
-        nrows_Y = len(Y)
-        ncols_Y = len(Y[0])
-        assert ncols_X == ncols_Y and nrows_X == nrows_Y, "Mismatched matrix dimensions"
-        return [[(X[i][j] + Y[i][j]) % self.q for j in range(ncols_X)] for i in range(nrows_X)]
-
-    def __matrix_sub(self, X, Y):
-        """Compute matrix subtraction X - Y mod q"""
-        nrows_X = len(X)
-        ncols_X = len(X[0])
-        nrows_Y = len(Y)
-        ncols_Y = len(Y[0])
-        assert ncols_X == ncols_Y and nrows_X == nrows_Y, "Mismatched matrix dimensions"
-        return [[(X[i][j] - Y[i][j]) % self.q for j in range(ncols_X)] for i in range(nrows_X)]
-    
-    def __matrix_transpose(self, X):
-        """Compute transpose of matrix X"""
-        nrows = len(X)
-        ncols = len(X[0])
-        return [[X[j][i] for j in range(nrows)] for i in range(ncols)]
-
-    @staticmethod
-    def __bytes_to_bit_array(B):
-        """Convert a byte array in little-endian format to a little-endian bit 
-        array"""
-        b = bitstring.BitArray(length=8*len(B))
-        for i in range(len(B)):
-            for l in range(8):
-                b.set((B[i] >> l) % 2, 8*i+l)
-        return b
-
     @staticmethod
     def __ctverify(a, b):
-        """Compares two equal-length matrices of integers; returns True if equal, False if any element differs.
+        """Compares two equal-length arrays of integers; returns True if equal, False if any element differs.
         
-        For a secure implementation, this method must be implemented in constant-time. While 
-        the Python code here is similar to a typical constant-time implementation in C, the
-        internal representation of integers in implementations of Python means that this 
-        method may not be constant-time."""
-        r = 0
-        for i in range(len(a)):
-            for j in range(len(a[i])):
-                r = r | (a[i][j] ^ b[i][j])
-        return r == 0
+        For a secure implementation, this method must be implemented in constant-time. Here 
+        all elements are XORed and OR-reduced as whole arrays without branching on the data; 
+        however, implementations of Python and NumPy give no constant-time guarantees."""
+        a = np.asarray(a, dtype=np.int64)
+        b = np.asarray(b, dtype=np.int64)
+        assert a.shape == b.shape, "Mismatched lengths"
+        r = np.bitwise_or.reduce(np.bitwise_xor(a, b), axis=None)
+        return bool(r == 0)
 
     @staticmethod
     def __ctselect(a, b, selector):
         """Select one of two equal-length byte arrays. If selector True, use a, else use b."""
-        mask = 0
-        for i in range(8):
-            mask = mask | (selector << i)
-        r = bytearray()
-        for i in range(len(a)):
-            r.append((a[i] & mask) | (b[i] & ~mask))
-        return bytes(r)
+        # mask is 0xFF if selector is True, 0x00 otherwise
+        mask = np.uint8(-int(selector) & 0xFF)
+        a = np.frombuffer(a, dtype=np.uint8)
+        b = np.frombuffer(b, dtype=np.uint8)
+        return ((a & mask) | (b & ~mask)).tobytes()
     
     def encode(self, k):
         """Encode a bitstring (represented in Python as a bytes object) as a mod-q 
         integer matrix (FrodoKEM specification, Algorithm 1)"""
         l = self.B * self.mbar * self.nbar
-        K = [[0 for j in range(self.nbar)] for i in range(self.mbar)]
-        kbits = FrodoKEM.__bytes_to_bit_array(k)
+        # bits of k in little-endian order within each byte
+        kbits = np.unpackbits(np.frombuffer(k, dtype=np.uint8), bitorder='little')[:l].astype(np.int64)
         # 1. for i = 0; i < mbar; i += 1
-        for i in range(self.mbar):
-            # 2. for j = 0; j < nbar; j += 1
-            for j in range(self.nbar):
-                # 3. tmp = sum_{l=0}^{B-1} k_{(i*nbar+j)*B+l} 2^l
-                tmp = 0
-                for l in range(self.B):
-                    if kbits[(i * self.nbar + j) * self.B + l]: tmp += 2 ** l
-                # 4. K[i][j] = ec(tmp) = tmp * q/2^B
-                K[i][j] = tmp * int(self.q / (2 ** self.B))
-        return K
-    
-    @staticmethod
-    def __bit_array_to_bytes(b):
-        """Convert a little-endian bit array to a byte array in little-endian format"""
-        B = bytearray(int(len(b)/8))
-        for i in range(len(B)):
-            for l in range(8):
-                if b[8*i+l]: B[i] |= 1 << l
-        return bytes(B)
+        # 2. for j = 0; j < nbar; j += 1
+        # 3. tmp = sum_{l=0}^{B-1} k_{(i*nbar+j)*B+l} 2^l
+        tmp = kbits.reshape(self.mbar * self.nbar, self.B) @ (1 << np.arange(self.B, dtype=np.int64))
+        # 4. K[i][j] = ec(tmp) = tmp * q/2^B
+        return (tmp << (self.D - self.B)).reshape(self.mbar, self.nbar)
     
     def decode(self, K):
         """Decode a mod-q integer matrix into a bitstring (represented in Python 
         as a bytes object) (FrodoKEM specification, Algorithm 2)"""
-        k = bitstring.BitArray(length=self.B * self.mbar * self.nbar)
+        K = np.asarray(K, dtype=np.int64).reshape(self.mbar * self.nbar)
         # 1. for i = 0; i < mbar; i += 1
-        for i in range(self.mbar):
-            # 2. for j = 0; j < nbar; j += 1
-            for j in range(self.nbar):
-                # 3. tmp = dc(K[i][j]) = round(K[i][j] * 2^B / q) mod 2^B
-                # Note that round is defined (as in FrodoKEM specification, Section 2.1.1) as
-                #     round(x) = floor(x + 1/2)
-                # The native implementation using floating point arithmentic and the round function
-                #     tmp = round(K[i][j] * (2 ** self.B) / self.q) % (2 ** self.B)
-                # should not be used because floating point rounding rules are not quite the same
-                # (IEEE 754 rounds ties to even, i.e., half integers round to the closest even number).
-                # Either of the following two lines produce correct results.
-                #     3.a) tmp = floor(K[i][j] * 2^B / q + 0.5) mod 2^B
-                tmp = math.floor(K[i][j] * (2 ** self.B) / self.q + 0.5) % (2 ** self.B)
-                #     3.b) tmp = (((K[i][j] << 2^B) + 2^(D-1)) >> D) mod 2^B, where q = 2^D
-                #tmp = (((K[i][j] << self.B) + 2 ** (self.D - 1)) >> self.D) % (2 ** self.B)
-                # 4. tmp' = sum_{l=0}^{B-1} tmp_l * 2^l
-                tmpbits = [0 for l in range(self.B)]
-                for l in range(self.B):
-                    tmpbits[l] = tmp % 2
-                    tmp >>= 1
-                # 5. for l = 0; l < B; l += 1
-                for l in range(self.B):
-                    # 6. k[(i*nbar+j)*B+l] = tmpbits[l]
-                    k.set(tmpbits[l], (i * self.nbar + j) * self.B + l)
-        return FrodoKEM.__bit_array_to_bytes(k)
+        # 2. for j = 0; j < nbar; j += 1
+        # 3. tmp = dc(K[i][j]) = round(K[i][j] * 2^B / q) mod 2^B
+        # Note that round is defined (as in FrodoKEM specification, Section 2.1.1) as
+        #     round(x) = floor(x + 1/2)
+        # The native implementation using floating point arithmentic and the round function
+        #     tmp = round(K[i][j] * (2 ** self.B) / self.q) % (2 ** self.B)
+        # should not be used because floating point rounding rules are not quite the same
+        # (IEEE 754 rounds ties to even, i.e., half integers round to the closest even number).
+        # Since q = 2^D this is computed with integer arithmetic as
+        #     tmp = (((K[i][j] << B) + 2^(D-1)) >> D) mod 2^B
+        tmp = (((K << self.B) + (1 << (self.D - 1))) >> self.D) & ((1 << self.B) - 1)
+        # 4. tmp' = sum_{l=0}^{B-1} tmp_l * 2^l
+        # 5. for l = 0; l < B; l += 1
+        # 6. k[(i*nbar+j)*B+l] = tmpbits[l]
+        tmpbits = (tmp[:, None] >> np.arange(self.B)) & 1
+        return np.packbits(tmpbits.reshape(-1).astype(np.uint8), bitorder='little').tobytes()
 
     def pack(self, C):
         """Pack a matrix mod q into a bitstring (represented in Python as a bytes 
-        object) (FrodoKEM specification, Algorithm 3)"""
-        n1 = len(C)
-        n2 = len(C[0])
-        b = bitstring.BitArray(self.D * n1 * n2)
+        object) (FrodoKEM specification, Algorithm 3)
+        
+        Each entry is written as D bits, most significant bit first, so for D = 16 
+        this is a big-endian uint16 view and for D = 15 each group of 8 entries 
+        fills exactly 15 bytes."""
+        C = np.asarray(C, dtype=np.int64).reshape(-1) & ((1 << self.D) - 1)
+        if self.D == 16:
+            return C.astype('>u2').tobytes()
+        if self.D == 15 and len(C) % 8 == 0:
+            C = C.astype(np.uint64).reshape(-1, 8)
+            # the 120 bits of a group as hi (entries 0..3) || lo (entries 4..7), 60 bits each
+            hi = (C[:, 0] << 45) | (C[:, 1] << 30) | (C[:, 2] << 15) | C[:, 3]
+            lo = (C[:, 4] << 45) | (C[:, 5] << 30) | (C[:, 6] << 15) | C[:, 7]
+            b = np.empty((len(C), 15), dtype=np.uint8)
+            b[:, 0:8] = ((hi << 4) | (lo >> 56)).astype('>u8').view(np.uint8).reshape(-1, 8)
+            b[:, 8:15] = (lo & ((1 << 56) - 1)).astype('>u8').view(np.uint8).reshape(-1, 8)[:, 1:]
+            return b.tobytes()
         # 1. for i = 0; i < n1; i += 1
-        for i in range(n1):
-            # for j = 0; j < n2; j += 1
-            for j in range(n2):
-                # 3. Cij = sum_{l=0}^{D-1} c_l * 2^l
-                tmp = C[i][j]
-                c = [0 for l in range(self.D)]
-                for l in range(self.D):
-                    c[l] = tmp % 2
-                    tmp >>= 1
-                # 4. for l = 0; l < D; L += 1
-                for l in range(self.D):
-                    # 5. b[(i * n2 + j) * D + l] = c[D - 1 - l]
-                    b[(i * n2 + j) * self.D + l] = c[self.D - 1 - l]
-        return b.bytes
+        # 2. for j = 0; j < n2; j += 1
+        # 3. Cij = sum_{l=0}^{D-1} c_l * 2^l
+        # 4. for l = 0; l < D; L += 1
+        # 5. b[(i * n2 + j) * D + l] = c[D - 1 - l]
+        bits = np.unpackbits(C.astype('>u2').view(np.uint8).reshape(-1, 2), axis=1)
+        return np.packbits(bits[:, 16 - self.D:].reshape(-1)).tobytes()
     
     def unpack(self, b, n1, n2):
         """Unpack a bitstring (represented in Python as a bytes object) into a 
         matrix mod q (FrodoKEM specification, Algorithm 4)"""
-        C = [[0 for j in range(n2)] for i in range(n1)]
-        bbits = bitstring.Bits(b)
+        b = np.frombuffer(b, dtype=np.uint8, count=self.D * n1 * n2 // 8)
+        if self.D == 16:
+            return b.view('>u2').astype(np.int64).reshape(n1, n2)
+        if self.D == 15 and (n1 * n2) % 8 == 0:
+            b = b.reshape(-1, 15)
+            tail = np.zeros((len(b), 8), dtype=np.uint8)
+            tail[:, 1:] = b[:, 8:15]
+            first = b[:, 0:8].copy().view('>u8').reshape(-1).astype(np.uint64)
+            tail = tail.view('>u8').reshape(-1).astype(np.uint64)
+            hi = first >> 4
+            lo = ((first & 0xF) << 56) | tail
+            C = np.empty((len(b), 8), dtype=np.int64)
+            for k, shift in enumerate((45, 30, 15, 0)):
+                C[:, k] = (hi >> shift) & 0x7FFF
+                C[:, k + 4] = (lo >> shift) & 0x7FFF
+            return C.reshape(n1, n2)
         # 1. for i = 0; i < n1; i += 1
-        for i in range(n1):
-            # 2. for j = 0; j < n2; j += 1
-            for j in range(n2):
-                # 3. Cij = sum_{l=0}^{D-1} b_{(i*n2+j)*D+l} * 2^{D-1-l}
-                for l in range(self.D):
-                    if bbits[(i * n2 + j) * self.D + l]: C[i][j] += 2 ** (self.D - 1 - l)
-        return C
+        # 2. for j = 0; j < n2; j += 1
+        # 3. Cij = sum_{l=0}^{D-1} b_{(i*n2+j)*D+l} * 2^{D-1-l}
+        bits = np.zeros((n1 * n2, 16), dtype=np.uint8)
+        bits[:, 16 - self.D:] = np.unpackbits(b).reshape(-1, self.D)
+        return np.packbits(bits, axis=1).view('>u2').astype(np.int64).reshape(n1, n2)
 
     def sample(self, r):
         """Sample from the error distribution using noise r (a two-byte array 
         encoding a 16-bit integer in little-endian byte order) (FrodoKEM 
-        specification, Algorithm 5)"""
+        specification, Algorithm 5)
+        
+        r may also be an array of such integers, in which case all of them are 
+        sampled at once."""
+        r = np.asarray(r, dtype=np.int64)
         # 1. t = sum_{i=1}^{len_x - 1} r_i * 2^{i-1}
         t = r >> 1
         # 2. e = 0
-        e = 0
         # 3. for z = 0; z < s; z += 1
-        for z in range(len(self.T_chi) - 1):
-            # 4. if t > T_chi(z)
-            if t > self.T_chi[z]:
-                # 5. e = e + 1
-                e += 1
+        # 4. if t > T_chi(z)
+        # 5. e = e + 1
+        # (every comparison is always made, so the work does not depend on t)
+        e = np.sum(t[..., None] > np.asarray(self.T_chi[:-1], dtype=np.int64), axis=-1)
         # 6. e = (-1)^{r_0} * e
-        r0 = r % 2
-        e = ((-1) ** r0) * e
+        # (negated by masking: sign is -1 if r_0 is set and 0 otherwise)
+        sign = -(r & 1)
+        e = (e ^ sign) - sign
         return e
 
     def sample_matrix(self, r, n1, n2):
         """Sample an n1 x n2 matrix from the error distribution using noise r 
         (FrodoKEM specification, Algorithm 6)"""
-        E = [[None for j in range(n2)] for i in range(n1)]
         # 1. for i = 0; i < n1; i += 1
-        for i in range(n1):
-            # 2. for j = 0; j < n2; j += 1
-            for j in range(n2):
-                # 3. E[i][j] = Frodo.Sample(r^{i*n2+j}, T_chi)
-                E[i][j] = self.sample(r[i * n2 + j])
-        return E
+        # 2. for j = 0; j < n2; j += 1
+        # 3. E[i][j] = Frodo.Sample(r^{i*n2+j}, T_chi)
+        return self.sample(np.asarray(r)[:n1 * n2]).reshape(n1, n2)
 
     def genAES128(self, seedA):
-        """Generate matrix A using AES-128 (FrodoKEM specification, Algorithm 7)"""
-        A = [[None for j in range(self.n)] for i in range(self.n)]
-        # 1. for i = 0; i < n; i += 1
-        for i in range(self.n):
-            # 2. for j = 0; j < n; j += 8
-            for j in range(0, self.n, 8):
-                # 3. b = i || j || 0 || ... || 0 in {0,1}^128, where i and j are encoded as 16-bit integers in little-endian byte order
-                b = bytearray(16)
-                struct.pack_into('<H', b, 0, i)
-                struct.pack_into('<H', b, 2, j)
-                # 4. c = AES128(seedA, b)
-                c = FrodoKEM.__aes128_16bytesonly(seedA, b)
-                # 5. for k = 0; k < 8; k += 1
-                for k in range(8):
-                    # 6. A[i][j+k] = c[k] where c is treated as a sequence of 8 16-bit integers each in little-endian byte order
-                    A[i][j + k] = struct.unpack_from('<H', c, 2 * k)[0] % self.q
+        """Generate matrix A using AES-128 (FrodoKEM specification, Algorithm 7)
+        
+        A is returned as an n x n uint16 NumPy array."""
+        return self.genAES128_rows(seedA, 0, self.n)
+
+    def genAES128_rows(self, seedA, start, stop):
+        """Generate rows start .. stop-1 of matrix A using AES-128; all counter 
+        blocks are encrypted with a single ECB context"""
+        A = np.empty((stop - start, self.n), dtype=np.uint16)
+        self.__gen_rows_parallel(self.__genAES128_into, seedA, start, stop, A)
         return A
 
+    def __genAES128_into(self, seedA, start, stop, A):
+        """Write rows start .. stop-1 of matrix A, generated using AES-128, into A"""
+        # 1. for i = 0; i < n; i += 1
+        # 2. for j = 0; j < n; j += 8
+        # 3. b = i || j || 0 || ... || 0 in {0,1}^128, where i and j are encoded as 16-bit integers in little-endian byte order
+        b = np.zeros((stop - start, self.n // 8, 8), dtype='<u2')
+        b[:, :, 0] = np.arange(start, stop)[:, None]
+        b[:, :, 1] = np.arange(0, self.n, 8)[None, :]
+        # 4. c = AES128(seedA, b)
+        c = FrodoKEM.__aes128_ecb(seedA, b.tobytes())
+        # 5. for k = 0; k < 8; k += 1
+        # 6. A[i][j+k] = c[k] where c is treated as a sequence of 8 16-bit integers each in little-endian byte order
+        np.bitwise_and(np.frombuffer(c, dtype='<u2').reshape(stop - start, self.n), self.q - 1, out=A)
+
     def genSHAKE128(self, seedA):
-        """Generate matrix A using SHAKE-128 (FrodoKEM specification, Algorithm 8)"""
-        A = [[None for j in range(self.n)] for i in range(self.n)]
+        """Generate matrix A using SHAKE-128 (FrodoKEM specification, Algorithm 8)
+        
+        A is returned as an n x n uint16 NumPy array."""
+        return self.genSHAKE128_rows(seedA, 0, self.n)
+
+    def genSHAKE128_rows(self, seedA, start, stop):
+        """Generate rows start .. stop-1 of matrix A using SHAKE-128"""
+        A = np.empty((stop - start, self.n), dtype=np.uint16)
+        self.__gen_rows_parallel(self.__genSHAKE128_into, seedA, start, stop, A)
+        return A
+
+    def __genSHAKE128_into(self, seedA, start, stop, A):
+        """Write rows start .. stop-1 of matrix A, generated using SHAKE-128, into A"""
         # 1. for i = 0; i < n; i += 1
-        for i in range(self.n):
+        for i in range(start, stop):
             # 2. b = i || seedA in {0,1}^{16 + len_seedA}, where i is encoded as a 16-bit integer in little-endian byte order
-            tmp = bytearray(2)
-            struct.pack_into('<H', tmp, 0, i)
-            b = tmp + seedA
+            b = struct.pack('<H', i) + seedA
             # 3. c_{i,0} || c_{i,1} || ... || c_{i,n-1} = SHAKE128(b, 16n) (length in bits) where each c_{i,j} is parsed as a 16-bit integer in little-endian byte order format
-            tmp = FrodoKEM.__shake128(b, int(16 * self.n / 8))
-            c_i = [struct.unpack_from('<H', tmp, 2 * j)[0] for j in range(self.n)]
+            c_i = np.frombuffer(FrodoKEM._shake128(b, int(16 * self.n / 8)), dtype='<u2')
             # 4. for j = 0; j < n; j +=1
-            for j in range(self.n):
-                # 5. A[i][j] = c[i][j] mod q
-                A[i][j] = c_i[j] % self.q
-        return A
+            # 5. A[i][j] = c[i][j] mod q
+            np.bitwise_and(c_i, self.q - 1, out=A[i - start])
+
+    def __gen_rows_parallel(self, gen_into, seedA, start, stop, A):
+        """Generate rows start .. stop-1 of A into the preallocated array A by calling 
+        gen_into on gen_workers contiguous row ranges, each writing into its own 
+        slice of A, in a thread pool"""
+        workers = min(self.gen_workers or 1, stop - start)
+        if workers <= 1:
+            gen_into(seedA, start, stop, A)
+            return
+        bounds = [start + (stop - start) * k // workers for k in range(workers + 1)]
+        with concurrent.futures.ThreadPoolExecutor(max_workers = workers) as executor:
+            futures = [executor.submit(gen_into, seedA, lo, hi, A[lo - start:hi - start]) for (lo, hi) in zip(bounds, bounds[1:])]
+            for future in futures:
+                future.result()
+
+    @staticmethod
+    def __group_by_seedA(seedAs):
+        """Group operation indices by seedA, in order of first occurrence"""
+        groups = dict()
+        for i, seedA in enumerate(seedAs):
+            groups.setdefault(bytes(seedA), []).append(i)
+        return groups.items()
+
+    def __gen_A_mul_batch(self, seedAs, S):
+        """Compute A_i * S_i mod q for a stack of N matrices S_i, where A_i = 
+        Frodo.Gen(seedAs[i]); operations sharing a seedA generate A once and 
+        multiply all their S_i side by side"""
+        S = np.asarray(S, dtype=np.int64)
+        R = np.empty((len(S), self.n, S.shape[2]), dtype=np.int64)
+        for seedA, idx in FrodoKEM.__group_by_seedA(seedAs):
+            AS = self._gen_A_mul(seedA, np.concatenate(S[idx], axis=1))
+            R[idx] = np.stack(np.split(AS, len(idx), axis=1))
+        return R
+
+    def __mul_gen_A_batch(self, Sprime, seedAs):
+        """Compute S'_i * A_i mod q for a stack of N matrices S'_i, where A_i = 
+        Frodo.Gen(seedAs[i]); operations sharing a seedA generate A once and 
+        multiply all their S'_i stacked on top of each other"""
+        Sprime = np.asarray(Sprime, dtype=np.int64)
+        R = np.empty((len(Sprime), Sprime.shape[1], self.n), dtype=np.int64)
+        for seedA, idx in FrodoKEM.__group_by_seedA(seedAs):
+            SA = self._mul_gen_A(Sprime[idx].reshape(-1, self.n), seedA)
+            R[idx] = SA.reshape(len(idx), -1, self.n)
+        return R
 
     def kem_keygen(self):
         """Generate a public key / secret key pair (FrodoKEM specification, 
         Algorithm 12)"""
         # 1. Choose uniformly random seeds s || seedSE || z
         s_seedSE_z = self.randombytes(self.len_s_bytes + self.len_seedSE_bytes + self.len_z_bytes)
-        self.__print_intermediate_value("randomness", s_seedSE_z)
-        #print("s_seedSE_z (hex):", s_seedSE_z.hex().upper())
+        if self.trace is not None: self.trace("randomness", s_seedSE_z)
         s = bytes(s_seedSE_z[0:self.len_s_bytes])
         seedSE = bytes(s_seedSE_z[self.len_s_bytes : self.len_s_bytes + self.len_seedSE_bytes])
-        print("seedSE",seedSE.hex().upper())
         z = bytes(s_seedSE_z[self.len_s_bytes + self.len_seedSE_bytes : self.len_s_bytes + self.len_seedSE_bytes + self.len_z_bytes])
         # 2. Generate pseudorandom seed seedA = SHAKE(z, len_seedA) (length in bits)
-        print("z",z.hex().upper())
-        
         seedA = self.shake(z, self.len_seedA_bytes)
-
-        print("seedA",seedA.hex().upper())
-
-        self.__print_intermediate_value("seedA", seedA)
+        if self.trace is not None: self.trace("seedA", seedA)
         # 3. A = Frodo.Gen(seedA)
-
-        #print(seedA.hex().upper()) 
-        A = self.gen(seedA)
-        A_ = np.array(A)
-        #np.savetxt('A_matrix_976.txt',A_,fmt='%d')
-        #print(A[0])
-        # self.__print_intermediate_value("A", A)
+        # (A is generated in chunks of rows while computing A S in step 7)
         # 4. r = SHAKE(0x5F || seedSE, 2*n*nbar*len_chi) (length in bits), parsed as 2*n*nbar len_chi-bit integers in little-endian byte order
         rbytes = self.shake(bytes(b'\x5f') + seedSE, 2 * self.n * self.nbar * self.len_chi_bytes)
-        # print(rbytes.hex().upper())
-        r = [struct.unpack_from('<H', rbytes, 2*i)[0] for i in range(2 * self.n * self.nbar)]
-        self.__print_intermediate_value("r", r)
-        #print(r)
+        r = np.frombuffer(rbytes, dtype='<u2', count=2 * self.n * self.nbar)
+        if self.trace is not None: self.trace("r", r)
         # 5. S^T = Frodo.SampleMatrix(r[0 .. n*nbar-1], nbar, n)
         Stransposed = self.sample_matrix(r[0 : self.n * self.nbar], self.nbar, self.n)
-        #print(Stransposed)
-        self.__print_intermediate_value("S^T", Stransposed)
-        S = self.__matrix_transpose(Stransposed)
-        #print(S)
+        if self.trace is not None: self.trace("S^T", Stransposed)
+        S = self._matrix_transpose(Stransposed)
         # 6. E = Frodo.SampleMatrix(r[n*nbar .. 2*n*nbar-1], n, nbar)
         E = self.sample_matrix(r[self.n * self.nbar : 2 * self.n * self.nbar], self.n, self.nbar)
-        # self.__print_intermediate_value("E", E)
+        if self.trace is not None: self.trace("E", E)
         # 7. B = A S + E
-
-        S_ = np.array(S)
-        # 保存S_为txt文件
-        #np.savetxt('S_matrix_976.txt', S_, fmt='%d')
-
-        zero_count = np.count_nonzero(S_ )
-        sparse = zero_count/S_.shape[0]/S_.shape[1]
-        #print("S is sparse with {}%".format(sparse*100))
-        unique_count = len(np.unique(S_))
-        #print("S has {} unique values".format(unique_count))
-        E_ = np.array(E)
-        #np.savetxt('E_matrix_976.txt', E_, fmt='%d')
-        zero_count = np.count_nonzero(E_ )
-        sparse = zero_count/E_.shape[0]/E_.shape[1]
-        #print("E is sparse with {}%".format(sparse*100))
-        unique_count = len(np.unique(E_))
-        #print("E has {} unique values".format(unique_count))
-
-
-        B = self.__matrix_add(self.__matrix_mul(A, S), E)
-        #print(B)
-        
-        B_ = np.array(B)
-        #np.savetxt('B_matrix_976.txt', B_, fmt='%d')
-        # zero_count = np.count_nonzero(B_)
-        # sparse = zero_count/B_.shape[0]/B_.shape[1]
-        # print("B is sparse with {}%".format(sparse*100))
-        # unique_count = len(np.unique(B_))
-        # print("B has {} unique values".format(unique_count))
-
-
-        self.__print_intermediate_value("B", B)
+        B = self._matrix_add(self._gen_A_mul(seedA, S), E)
+        if self.trace is not None: self.trace("B", B)
         # 8. b = Pack(B)
         b = self.pack(B)
-        self.__print_intermediate_value("b", b)
-        #print(b.hex().upper())
+        if self.trace is not None: self.trace("b", b)
         # 9. pkh = SHAKE(seedA || b, len_pkh) (length in bits)
         pkh = self.shake(seedA + b, self.len_pkh_bytes)
-        # with open('output_seedA_b.txt', 'w') as f:
-        #     f.write((seedA+b).hex().upper() + '\n')
-        #print("pkh",pkh.hex().upper())
-        self.__print_intermediate_value("pkh", pkh)
+        if self.trace is not None: self.trace("pkh", pkh)
         # 10. pk = seedA || b, sk = (s || seedA || b, S^T, pkh)
         pk = seedA + b
         assert len(pk) == self.len_pk_bytes
-        print(f"keygen pkh: {pkh.hex().upper()}")
-        sk = bitstring.BitArray()
-        sk.append(s + seedA + b)
-        for i in range(self.nbar):
-            for j in range(self.n):
-                sk.append(bitstring.BitArray(intle = Stransposed[i][j], length = 16))
-        sk.append(pkh)
-        sk = sk.bytes
+        # S^T is stored as nbar x n 16-bit signed integers in little-endian byte order
+        sk = s + seedA + b + np.asarray(Stransposed, dtype='<i2').tobytes() + pkh
         assert len(sk) == self.len_sk_bytes
         return (pk, sk)
 
@@ -560,95 +515,58 @@ class FrodoKEM(object):
         # Parse pk = seedA || b
         assert len(pk) == self.len_seedA_bytes + self.D * self.n * self.nbar / 8, "Incorrect public key length"
         seedA = pk[0 : self.len_seedA_bytes]
-        #print("seedA",seedA.hex().upper())
         b = pk[self.len_seedA_bytes:]
         # 1. Choose uniformly random values mu in {0,1}^len_mu and salt in {0,1}^len_salt (length in bits)
         mu_salt = self.randombytes(self.len_mu_bytes + self.len_salt_bytes)
         mu = mu_salt[0:self.len_mu_bytes]
         salt = mu_salt[self.len_mu_bytes:self.len_mu_bytes + self.len_salt_bytes]
-        print('mu',mu.hex().upper())
-        #print('salt',salt.hex().upper())
-        self.__print_intermediate_value("mu", mu)
-        self.__print_intermediate_value("salt", salt)
+        if self.trace is not None: self.trace("mu", mu)
+        if self.trace is not None: self.trace("salt", salt)
         # 2. pkh = SHAKE(pk, len_pkh)
         pkh = self.shake(pk, self.len_pkh_bytes)
-        self.__print_intermediate_value("pkh", pkh)
+        if self.trace is not None: self.trace("pkh", pkh)
         # 3. seedSE || k = SHAKE(pkh || mu || salt, len_seedSE + len_k) (length in bits)
         seedSE_k = self.shake(pkh + mu + salt, self.len_seedSE_bytes + self.len_k_bytes)
         seedSE = seedSE_k[0:self.len_seedSE_bytes]
-        #print("seedSE",seedSE.hex().upper())
-        self.__print_intermediate_value("seedSE", seedSE)
+        if self.trace is not None: self.trace("seedSE", seedSE)
         k = seedSE_k[self.len_seedSE_bytes:self.len_seedSE_bytes + self.len_k_bytes]
-        #print("k",k.hex().upper())
-        self.__print_intermediate_value("k", k)
+        if self.trace is not None: self.trace("k", k)
         # 4. r = SHAKE(0x96 || seedSE, 2*mbar*n + mbar*nbar*len_chi) (length in bits)
         rbytes = self.shake(bytes(b'\x96') + seedSE, (2 * self.mbar * self.n + self.mbar * self.mbar) * self.len_chi_bytes)
-        
-        r = [struct.unpack_from('<H', rbytes, 2*i)[0] for i in range(2 * self.mbar * self.n + self.mbar * self.nbar)]
-        #print(rbytes.hex().upper())
-        self.__print_intermediate_value("r", r)
+        r = np.frombuffer(rbytes, dtype='<u2', count=2 * self.mbar * self.n + self.mbar * self.nbar)
+        if self.trace is not None: self.trace("r", r)
         # 5. S' = Frodo.SampleMatrix(r[0 .. mbar*n-1], mbar, n)
         Sprime = self.sample_matrix(r[0 : self.mbar * self.n], self.mbar, self.n)
-        #print(Sprime)
-        #np.savetxt('Sprime_matrix_976.txt', Sprime, fmt='%d')
-
-        self.__print_intermediate_value("S'", Sprime)
+        if self.trace is not None: self.trace("S'", Sprime)
         # 6. E' = Frodo.SampleMatrix(r[mbar*n .. 2*mbar*n-1], mbar, n)
         Eprime = self.sample_matrix(r[self.mbar * self.n : 2 * self.mbar * self.n], self.mbar, self.n)
-        self.__print_intermediate_value("E'", Eprime)
-        #print(Eprime)
-        #np.savetxt('Eprime_matrix_976.txt', Eprime, fmt='%d')
+        if self.trace is not None: self.trace("E'", Eprime)
         # 7. A = Frodo.Gen(seedA)
-        A = self.gen(seedA)
-        #A_ = np.array(A)
-        #np.savetxt('A_matrix_640.txt', A, fmt='%d')
+        # (A is generated in chunks of rows while computing S' A in step 8)
         # 8. B' = S' A + E'
-        Bprime = self.__matrix_add(self.__matrix_mul(Sprime, A), Eprime)
-        Bprime_ = np.array(Bprime)
-        #np.savetxt('Bprime_matrix_1344.txt', Bprime_, fmt='%d')
-        self.__print_intermediate_value("B'", Bprime)
+        Bprime = self._matrix_add(self._mul_gen_A(Sprime, seedA), Eprime)
+        if self.trace is not None: self.trace("B'", Bprime)
         # 9. c1 = Frodo.Pack(B')
         c1 = self.pack(Bprime)
-        #print(c1.hex().upper())
-        self.__print_intermediate_value("c1", c1)
+        if self.trace is not None: self.trace("c1", c1)
         # 10. E'' = Frodo.SampleMatrix(r[2*mbar*n .. 2*mbar*n + mbar*nbar-1], mbar, nbar)
         Eprimeprime = self.sample_matrix(r[2 * self.mbar * self.n : 2 * self.mbar * self.n + self.mbar * self.nbar], self.mbar, self.nbar)
-        #print(Eprimeprime)
-        Eprimeprime_ = np.array(Eprimeprime)
-        #np.savetxt('Eprimeprime_matrix_976.txt',Eprimeprime_,fmt='%d')
-        self.__print_intermediate_value("E''", Eprimeprime)
+        if self.trace is not None: self.trace("E''", Eprimeprime)
         # 11. B = Frodo.Unpack(b, n, nbar)
         B = self.unpack(b, self.n, self.nbar)
-        self.__print_intermediate_value("B", B)
+        if self.trace is not None: self.trace("B", B)
         # 12. V = S' B + E''
-        V = self.__matrix_add(self.__matrix_mul(Sprime, B), Eprimeprime)
-        #print(V)
-        V_ = np.array(V)
-        #np.savetxt('V_matrix_976.txt',V_,fmt='%d')
-        self.__print_intermediate_value("V", V)
+        V = self._matrix_add(self._matrix_mul(Sprime, B), Eprimeprime)
+        if self.trace is not None: self.trace("V", V)
         # 13. C = V + Frodo.Encode(mu)
-        self.__print_intermediate_value("mu_encoded", self.encode(mu))
-        #print('u',mu.hex().upper())
-        #print('encodeu',self.encode(mu))
-        enu = np.array(self.encode(mu))
-        #np.savetxt('enu_976.txt',enu,fmt='%d')
-        C = self.__matrix_add(V, self.encode(mu))
-        self.__print_intermediate_value("C", C)
-        #print("C",C)
-        C_ = np.array(C)
-        #np.savetxt('C_976.txt',C_,fmt='%d')
-
+        if self.trace is not None: self.trace("mu_encoded", self.encode(mu))
+        C = self._matrix_add(V, self.encode(mu))
+        if self.trace is not None: self.trace("C", C)
         # 14. c2 = Frodo.Pack(C)
         c2 = self.pack(C)
-        self.__print_intermediate_value("c2", c2)
-        #print("C2_encap",c2.hex().upper())
+        if self.trace is not None: self.trace("c2", c2)
         # 15. ss = SHAKE(c1 || c2 || salt || k, len_ss)
         ss = self.shake(c1 + c2 + salt + k, self.len_ss_bytes)
-        #print('salt',salt.hex().upper())
-        print(f"encap ss: {ss.hex().upper()}")
-
-        # with open('ss_output.txt', 'w') as f:
-        #     f.write((c1+c2+salt+k).hex().upper() + '\n')
         ct = c1 + c2 + salt
         assert len(ct) == self.len_ct_bytes
         assert len(ss) == self.len_ss_bytes
@@ -661,95 +579,279 @@ class FrodoKEM(object):
         assert len(ct) == self.len_ct_bytes, "Incorrect ciphertext length"
         offset = 0; length = int(self.mbar * self.n * self.D / 8)
         c1 = ct[offset:offset+length]
-        self.__print_intermediate_value("c1", c1)
+        if self.trace is not None: self.trace("c1", c1)
         offset += length; length = int(self.mbar * self.nbar * self.D / 8)
         c2 = ct[offset:offset+length]
-        self.__print_intermediate_value("c2", c2)
+        if self.trace is not None: self.trace("c2", c2)
         offset += length; length = self.len_salt_bytes
         salt = ct[offset:offset+length]
-        self.__print_intermediate_value("salt", salt)
+        if self.trace is not None: self.trace("salt", salt)
         # Parse sk = (s || seedA || b, S^T, pkh)
         assert len(sk) == self.len_sk_bytes
         offset = 0; length = self.len_s_bytes
         s = sk[offset:offset+length]
-        self.__print_intermediate_value("s", s)
+        if self.trace is not None: self.trace("s", s)
         offset += length; length = self.len_seedA_bytes
         seedA = sk[offset:offset+length]
-        self.__print_intermediate_value("seedA", seedA)
+        if self.trace is not None: self.trace("seedA", seedA)
         offset += length; length = int(self.D * self.n * self.nbar / 8)
         b = sk[offset:offset+length]
-        self.__print_intermediate_value("b", b)
+        if self.trace is not None: self.trace("b", b)
         offset += length; length = int(self.n * self.nbar * 16 / 8)
-        Sbytes = bitstring.ConstBitStream(sk[offset:offset+length])
-        Stransposed = [[0 for j in range(self.n)] for i in range(self.nbar)]
-        for i in range(self.nbar):
-            for j in range(self.n):
-                Stransposed[i][j] = Sbytes.read('intle:16')
-        self.__print_intermediate_value("S^T", Stransposed)
-        S = self.__matrix_transpose(Stransposed)
+        Stransposed = np.frombuffer(sk[offset:offset+length], dtype='<i2').reshape(self.nbar, self.n).astype(np.int64)
+        if self.trace is not None: self.trace("S^T", Stransposed)
+        S = self._matrix_transpose(Stransposed)
         offset += length; length = self.len_pkh_bytes
         pkh = sk[offset:offset+length]
-        self.__print_intermediate_value("pkh", pkh)
+        if self.trace is not None: self.trace("pkh", pkh)
         # 1. B' = Frodo.Unpack(c1, mbar, n)
         Bprime = self.unpack(c1, self.mbar, self.n)
-        self.__print_intermediate_value("B'", Bprime)
+        if self.trace is not None: self.trace("B'", Bprime)
         # 2. C = Frodo.Unpack(c2, mbar, nbar)
         C = self.unpack(c2, self.mbar, self.nbar)
-        self.__print_intermediate_value("C", C)
+        if self.trace is not None: self.trace("C", C)
         # 3. M = C - B' S
-        BprimeS = self.__matrix_mul(Bprime, S)
-        self.__print_intermediate_value("B'S", BprimeS)
-        M = self.__matrix_sub(C, BprimeS)
-        M_ = np.array(M)
-        #np.savetxt('M_1344.txt',M_,fmt='%d')
-        self.__print_intermediate_value("M", M)
+        BprimeS = self._matrix_mul(Bprime, S)
+        if self.trace is not None: self.trace("B'S", BprimeS)
+        M = self._matrix_sub(C, BprimeS)
+        if self.trace is not None: self.trace("M", M)
         # 4. mu' = Frodo.Decode(M)
         muprime = self.decode(M)
-        #print('u',muprime.hex().upper())
-        self.__print_intermediate_value("mu'", muprime)
+        if self.trace is not None: self.trace("mu'", muprime)
         # 5. Parse pk = seedA || b
         # (done above)
         # 6. seedSE' || k' = SHAKE(pkh || mu' || salt, len_seedSE + len_k) (length in bits)
         seedSEprime_kprime = self.shake(pkh + muprime + salt, self.len_seedSE_bytes + self.len_k_bytes)
         seedSEprime = seedSEprime_kprime[0:self.len_seedSE_bytes]
-        self.__print_intermediate_value("seedSE'", seedSEprime)
+        if self.trace is not None: self.trace("seedSE'", seedSEprime)
         kprime = seedSEprime_kprime[self.len_seedSE_bytes:self.len_seedSE_bytes + self.len_k_bytes]
-        self.__print_intermediate_value("k'", kprime)
+        if self.trace is not None: self.trace("k'", kprime)
         # 7. r = SHAKE(0x96 || seedSE', 2*mbar*n + mbar*nbar*len_chi) (length in bits)
         rbytes = self.shake(bytes(b'\x96') + seedSEprime, (2 * self.mbar * self.n + self.mbar * self.mbar) * self.len_chi_bytes)
-        r = [struct.unpack_from('<H', rbytes, 2*i)[0] for i in range(2 * self.mbar * self.n + self.mbar * self.nbar)]
-        self.__print_intermediate_value("r", r)
+        r = np.frombuffer(rbytes, dtype='<u2', count=2 * self.mbar * self.n + self.mbar * self.nbar)
+        if self.trace is not None: self.trace("r", r)
         # 8. S' = Frodo.SampleMatrix(r[0 .. mbar*n-1], mbar, n)
         Sprime = self.sample_matrix(r[0 : self.mbar * self.n], self.mbar, self.n)
-        self.__print_intermediate_value("S'", Sprime)
+        if self.trace is not None: self.trace("S'", Sprime)
         # 9. E' = Frodo.SampleMatrix(r[mbar*n .. 2*mbar*n-1], mbar, n)
         Eprime = self.sample_matrix(r[self.mbar * self.n : 2 * self.mbar * self.n], self.mbar, self.n)
-        self.__print_intermediate_value("E'", Eprime)
+        if self.trace is not None: self.trace("E'", Eprime)
         # 10. A = Frodo.Gen(seedA)
-        A = self.gen(seedA)
+        # (A is generated in chunks of rows while computing S' A in step 11)
         # 11. B'' = S' A + E'
-        Bprimeprime = self.__matrix_add(self.__matrix_mul(Sprime, A), Eprime)
-        self.__print_intermediate_value("B''", Bprimeprime)
+        Bprimeprime = self._matrix_add(self._mul_gen_A(Sprime, seedA), Eprime)
+        if self.trace is not None: self.trace("B''", Bprimeprime)
         # 12. E'' = Frodo.SampleMatrix(r[2*mbar*n .. 2*mbar*n + mbar*nbar-1], mbar, n)
         Eprimeprime = self.sample_matrix(r[2 * self.mbar * self.n : 2 * self.mbar * self.n + self.mbar * self.nbar], self.mbar, self.nbar)
-        self.__print_intermediate_value("E''", Eprimeprime)
+        if self.trace is not None: self.trace("E''", Eprimeprime)
         # 13. B = Frodo.Unpack(b, n, nbar)
         B = self.unpack(b, self.n, self.nbar)
-        self.__print_intermediate_value("B", B)
+        if self.trace is not None: self.trace("B", B)
         # 14. V = S' B + E''
-        V = self.__matrix_add(self.__matrix_mul(Sprime, B), Eprimeprime)
-        self.__print_intermediate_value("V", V)
+        V = self._matrix_add(self._matrix_mul(Sprime, B), Eprimeprime)
+        if self.trace is not None: self.trace("V", V)
         # 15. C' = V + Frodo.Encode(muprime)
-        Cprime = self.__matrix_add(V, self.encode(muprime))
-        self.__print_intermediate_value("C'", Cprime)
+        Cprime = self._matrix_add(V, self.encode(muprime))
+        if self.trace is not None: self.trace("C'", Cprime)
         # 16. (in constant time) kbar = kprime if (B' || C == B'' || C') else kbar = s
         # Needs to avoid branching on secret data as per:
         #     Qian Guo, Thomas Johansson, Alexander Nilsson. A key-recovery timing attack on post-quantum 
         #     primitives using the Fujisaki-Okamoto transformation and its application on FrodoKEM. In CRYPTO 2020.
-        use_kprime = self.__ctverify(Bprime + C, Bprimeprime + Cprime)
+        use_kprime = self.__ctverify(np.concatenate((np.ravel(Bprime), np.ravel(C))), np.concatenate((np.ravel(Bprimeprime), np.ravel(Cprime))))
         kbar = self.__ctselect(kprime, s, use_kprime)
         # 17. ss = SHAKE(c1 || c2 || salt || kbar, len_ss) (length in bits)
         ss = self.shake(c1 + c2 + salt + kbar, self.len_ss_bytes)
-        print(f"decap ss: {ss.hex().upper()}")
         assert len(ss) == self.len_ss_bytes
         return ss
+
+    def kem_keygen_batch(self, count):
+        """Generate count public key / secret key pairs; returns a list of (pk, sk) 
+        identical to that of count successive calls to kem_keygen"""
+        # 1. Choose uniformly random seeds s || seedSE || z
+        s, seedSE, z = [], [], []
+        for _ in range(count):
+            s_seedSE_z = self.randombytes(self.len_s_bytes + self.len_seedSE_bytes + self.len_z_bytes)
+            s.append(bytes(s_seedSE_z[0:self.len_s_bytes]))
+            seedSE.append(bytes(s_seedSE_z[self.len_s_bytes : self.len_s_bytes + self.len_seedSE_bytes]))
+            z.append(bytes(s_seedSE_z[self.len_s_bytes + self.len_seedSE_bytes : self.len_s_bytes + self.len_seedSE_bytes + self.len_z_bytes]))
+        # 2. Generate pseudorandom seed seedA = SHAKE(z, len_seedA) (length in bits)
+        seedA = [self.shake(z_i, self.len_seedA_bytes) for z_i in z]
+        # 4. r = SHAKE(0x5F || seedSE, 2*n*nbar*len_chi) (length in bits), parsed as 2*n*nbar len_chi-bit integers in little-endian byte order
+        r = np.stack([np.frombuffer(self.shake(bytes(b'\x5f') + seedSE_i, 2 * self.n * self.nbar * self.len_chi_bytes), dtype='<u2', count=2 * self.n * self.nbar) for seedSE_i in seedSE])
+        # 5. S^T = Frodo.SampleMatrix(r[0 .. n*nbar-1], nbar, n)
+        Stransposed = self.sample(r[:, 0 : self.n * self.nbar]).reshape(count, self.nbar, self.n)
+        S = np.swapaxes(Stransposed, 1, 2)
+        # 6. E = Frodo.SampleMatrix(r[n*nbar .. 2*n*nbar-1], n, nbar)
+        E = self.sample(r[:, self.n * self.nbar : 2 * self.n * self.nbar]).reshape(count, self.n, self.nbar)
+        # 3. A = Frodo.Gen(seedA)
+        # 7. B = A S + E
+        B = self._matrix_add(self.__gen_A_mul_batch(seedA, S), E)
+        keys = []
+        for i in range(count):
+            # 8. b = Pack(B)
+            b = self.pack(B[i])
+            # 9. pkh = SHAKE(seedA || b, len_pkh) (length in bits)
+            pkh = self.shake(seedA[i] + b, self.len_pkh_bytes)
+            # 10. pk = seedA || b, sk = (s || seedA || b, S^T, pkh)
+            pk = seedA[i] + b
+            sk = s[i] + seedA[i] + b + np.asarray(Stransposed[i], dtype='<i2').tobytes() + pkh
+            assert len(pk) == self.len_pk_bytes
+            assert len(sk) == self.len_sk_bytes
+            keys.append((pk, sk))
+        return keys
+
+    def kem_encaps_batch(self, pks):
+        """Encapsulate against each public key in pks; returns a list of (ct, ss) 
+        identical to that of successive calls to kem_encaps"""
+        count = len(pks)
+        seedA, b, mu, salt, k = [], [], [], [], []
+        r = []
+        for pk in pks:
+            # Parse pk = seedA || b
+            assert len(pk) == self.len_seedA_bytes + self.D * self.n * self.nbar / 8, "Incorrect public key length"
+            seedA.append(pk[0 : self.len_seedA_bytes])
+            b.append(pk[self.len_seedA_bytes:])
+            # 1. Choose uniformly random values mu in {0,1}^len_mu and salt in {0,1}^len_salt (length in bits)
+            mu_salt = self.randombytes(self.len_mu_bytes + self.len_salt_bytes)
+            mu.append(mu_salt[0:self.len_mu_bytes])
+            salt.append(mu_salt[self.len_mu_bytes:self.len_mu_bytes + self.len_salt_bytes])
+            # 2. pkh = SHAKE(pk, len_pkh)
+            pkh = self.shake(pk, self.len_pkh_bytes)
+            # 3. seedSE || k = SHAKE(pkh || mu || salt, len_seedSE + len_k) (length in bits)
+            seedSE_k = self.shake(pkh + mu[-1] + salt[-1], self.len_seedSE_bytes + self.len_k_bytes)
+            seedSE = seedSE_k[0:self.len_seedSE_bytes]
+            k.append(seedSE_k[self.len_seedSE_bytes:self.len_seedSE_bytes + self.len_k_bytes])
+            # 4. r = SHAKE(0x96 || seedSE, 2*mbar*n + mbar*nbar*len_chi) (length in bits)
+            rbytes = self.shake(bytes(b'\x96') + seedSE, (2 * self.mbar * self.n + self.mbar * self.mbar) * self.len_chi_bytes)
+            r.append(np.frombuffer(rbytes, dtype='<u2', count=2 * self.mbar * self.n + self.mbar * self.nbar))
+        r = np.stack(r)
+        # 5. S' = Frodo.SampleMatrix(r[0 .. mbar*n-1], mbar, n)
+        Sprime = self.sample(r[:, 0 : self.mbar * self.n]).reshape(count, self.mbar, self.n)
+        # 6. E' = Frodo.SampleMatrix(r[mbar*n .. 2*mbar*n-1], mbar, n)
+        Eprime = self.sample(r[:, self.mbar * self.n : 2 * self.mbar * self.n]).reshape(count, self.mbar, self.n)
+        # 7. A = Frodo.Gen(seedA)
+        # 8. B' = S' A + E'
+        Bprime = self._matrix_add(self.__mul_gen_A_batch(Sprime, seedA), Eprime)
+        # 10. E'' = Frodo.SampleMatrix(r[2*mbar*n .. 2*mbar*n + mbar*nbar-1], mbar, nbar)
+        Eprimeprime = self.sample(r[:, 2 * self.mbar * self.n : 2 * self.mbar * self.n + self.mbar * self.nbar]).reshape(count, self.mbar, self.nbar)
+        # 11. B = Frodo.Unpack(b, n, nbar)
+        B = np.stack([self.unpack(b_i, self.n, self.nbar) for b_i in b])
+        # 12. V = S' B + E''
+        V = self._matrix_add(self._matrix_mul(Sprime, B), Eprimeprime)
+        # 13. C = V + Frodo.Encode(mu)
+        C = self._matrix_add(V, np.stack([self.encode(mu_i) for mu_i in mu]))
+        results = []
+        for i in range(count):
+            # 9. c1 = Frodo.Pack(B')
+            c1 = self.pack(Bprime[i])
+            # 14. c2 = Frodo.Pack(C)
+            c2 = self.pack(C[i])
+            # 15. ss = SHAKE(c1 || c2 || salt || k, len_ss)
+            ss = self.shake(c1 + c2 + salt[i] + k[i], self.len_ss_bytes)
+            ct = c1 + c2 + salt[i]
+            assert len(ct) == self.len_ct_bytes
+            assert len(ss) == self.len_ss_bytes
+            results.append((ct, ss))
+        return results
+
+    def kem_decaps_batch(self, sks, cts):
+        """Decapsulate each ciphertext in cts using the matching secret key in sks; 
+        returns a list of shared secrets identical to that of successive calls to 
+        kem_decaps"""
+        assert len(sks) == len(cts), "Mismatched number of secret keys and ciphertexts"
+        count = len(cts)
+        c1, c2, salt, s, seedA, b, Stransposed, pkh = [], [], [], [], [], [], [], []
+        for sk, ct in zip(sks, cts):
+            # Parse ct = c1 || c2 || salt
+            assert len(ct) == self.len_ct_bytes, "Incorrect ciphertext length"
+            offset = 0; length = int(self.mbar * self.n * self.D / 8)
+            c1.append(ct[offset:offset+length])
+            offset += length; length = int(self.mbar * self.nbar * self.D / 8)
+            c2.append(ct[offset:offset+length])
+            offset += length; length = self.len_salt_bytes
+            salt.append(ct[offset:offset+length])
+            # Parse sk = (s || seedA || b, S^T, pkh)
+            assert len(sk) == self.len_sk_bytes
+            offset = 0; length = self.len_s_bytes
+            s.append(sk[offset:offset+length])
+            offset += length; length = self.len_seedA_bytes
+            seedA.append(sk[offset:offset+length])
+            offset += length; length = int(self.D * self.n * self.nbar / 8)
+            b.append(sk[offset:offset+length])
+            offset += length; length = int(self.n * self.nbar * 16 / 8)
+            Stransposed.append(np.frombuffer(sk[offset:offset+length], dtype='<i2').reshape(self.nbar, self.n).astype(np.int64))
+            offset += length; length = self.len_pkh_bytes
+            pkh.append(sk[offset:offset+length])
+        S = np.swapaxes(np.stack(Stransposed), 1, 2)
+        # 1. B' = Frodo.Unpack(c1, mbar, n)
+        Bprime = np.stack([self.unpack(c1_i, self.mbar, self.n) for c1_i in c1])
+        # 2. C = Frodo.Unpack(c2, mbar, nbar)
+        C = np.stack([self.unpack(c2_i, self.mbar, self.nbar) for c2_i in c2])
+        # 3. M = C - B' S
+        M = self._matrix_sub(C, self._matrix_mul(Bprime, S))
+        r, muprime, kprime = [], [], []
+        for i in range(count):
+            # 4. mu' = Frodo.Decode(M)
+            muprime.append(self.decode(M[i]))
+            # 6. seedSE' || k' = SHAKE(pkh || mu' || salt, len_seedSE + len_k) (length in bits)
+            seedSEprime_kprime = self.shake(pkh[i] + muprime[i] + salt[i], self.len_seedSE_bytes + self.len_k_bytes)
+            seedSEprime = seedSEprime_kprime[0:self.len_seedSE_bytes]
+            kprime.append(seedSEprime_kprime[self.len_seedSE_bytes:self.len_seedSE_bytes + self.len_k_bytes])
+            # 7. r = SHAKE(0x96 || seedSE', 2*mbar*n + mbar*nbar*len_chi) (length in bits)
+            rbytes = self.shake(bytes(b'\x96') + seedSEprime, (2 * self.mbar * self.n + self.mbar * self.mbar) * self.len_chi_bytes)
+            r.append(np.frombuffer(rbytes, dtype='<u2', count=2 * self.mbar * self.n + self.mbar * self.nbar))
+        r = np.stack(r)
+        # 8. S' = Frodo.SampleMatrix(r[0 .. mbar*n-1], mbar, n)
+        Sprime = self.sample(r[:, 0 : self.mbar * self.n]).reshape(count, self.mbar, self.n)
+        # 9. E' = Frodo.SampleMatrix(r[mbar*n .. 2*mbar*n-1], mbar, n)
+        Eprime = self.sample(r[:, self.mbar * self.n : 2 * self.mbar * self.n]).reshape(count, self.mbar, self.n)
+        # 10. A = Frodo.Gen(seedA)
+        # 11. B'' = S' A + E'
+        Bprimeprime = self._matrix_add(self.__mul_gen_A_batch(Sprime, seedA), Eprime)
+        # 12. E'' = Frodo.SampleMatrix(r[2*mbar*n .. 2*mbar*n + mbar*nbar-1], mbar, n)
+        Eprimeprime = self.sample(r[:, 2 * self.mbar * self.n : 2 * self.mbar * self.n + self.mbar * self.nbar]).reshape(count, self.mbar, self.nbar)
+        # 13. B = Frodo.Unpack(b, n, nbar)
+        B = np.stack([self.unpack(b_i, self.n, self.nbar) for b_i in b])
+        # 14. V = S' B + E''
+        V = self._matrix_add(self._matrix_mul(Sprime, B), Eprimeprime)
+        # 15. C' = V + Frodo.Encode(muprime)
+        Cprime = self._matrix_add(V, np.stack([self.encode(muprime_i) for muprime_i in muprime]))
+        results = []
+        for i in range(count):
+            # 16. (in constant time) kbar = kprime if (B' || C == B'' || C') else kbar = s
+            use_kprime = self.__ctverify(np.concatenate((np.ravel(Bprime[i]), np.ravel(C[i]))), np.concatenate((np.ravel(Bprimeprime[i]), np.ravel(Cprime[i]))))
+            kbar = self.__ctselect(kprime[i], s[i], use_kprime)
+            # 17. ss = SHAKE(c1 || c2 || salt || kbar, len_ss) (length in bits)
+            ss = self.shake(c1[i] + c2[i] + salt[i] + kbar, self.len_ss_bytes)
+            assert len(ss) == self.len_ss_bytes
+            results.append(ss)
+        return results
+
+
+class FrodoKEMTrace(object):
+    """Structured sink for the intermediate values of FrodoKEM operations: set 
+    kem.trace = FrodoKEMTrace() and the values are recorded, in order, as 
+    (name, value) pairs without any formatting. Matrices are kept as the NumPy 
+    arrays produced by the operation and byte strings as bytes."""
+
+    def __init__(self):
+        self.records = []
+
+    def __call__(self, name, value):
+        self.records.append((name, value))
+
+    def __getitem__(self, name):
+        """The most recently recorded value with the given name"""
+        for (n, value) in reversed(self.records):
+            if n == name: return value
+        raise KeyError(name)
+
+    def __contains__(self, name):
+        return any(n == name for (n, value) in self.records)
+
+    def names(self):
+        """Names of the recorded values, in order of first occurrence"""
+        return list(dict.fromkeys(n for (n, value) in self.records))
+
+    def clear(self):
+        self.records = []
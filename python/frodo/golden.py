@@ -0,0 +1,142 @@
+import argparse
+import json
+import os
+import warnings
+import numpy as np
+from frodokem import FrodoKEM, FrodoKEMTrace
+from nist_kat import NISTKAT, KAT_FILES
+
+# Golden vectors: the intermediate values of keygen, encaps and decaps for the
+# seeds of the NIST KAT entries, exported for the hardware models and the RTL
+# testbenches. Matrices are written as .npy files (loadable memory-mapped), byte
+# strings as raw .bin files, and everything is described by manifest.json:
+#
+#   <out>/manifest.json
+#   <out>/<variant>/<count>/<op>/<name>.npy|.bin
+#
+# The manifest holds, per variant, the parameters and, per entry, the seed, the
+# pk/sk/ct/ss files and for each op the recorded values {name: {file, dtype,
+# shape}} in the order the operation produced them (byte strings also have
+# their length and, if short, their hex value).
+
+MANIFEST = 'manifest.json'
+OPS = ['keygen', 'encaps', 'decaps']
+
+# Sampled error/secret matrices are stored as signed 16-bit integers, all other
+# matrices as their mod-q representatives in unsigned 16-bit integers
+SIGNED = {'S^T', 'E', "S'", "E'", "E''"}
+
+# Byte strings up to this length are also written as hex into the manifest
+INLINE_HEX_BYTES = 64
+
+def file_name(name):
+    """Name of the file a traced value is stored in (S^T -> ST, B' -> Bprime)"""
+    return name.replace('^', '').replace("'", 'prime')
+
+def params(kem):
+    return {
+        'n': kem.n,
+        'nbar': kem.nbar,
+        'mbar': kem.mbar,
+        'q': kem.q,
+        'D': kem.D,
+        'B': kem.B,
+        'len_seedA_bytes': kem.len_seedA_bytes,
+    }
+
+class GoldenWriter(object):
+    """Writes the values of one KAT entry below <out>/<variant>/<count> and
+    collects their manifest entries"""
+
+    def __init__(self, out_dir, variant, count):
+        self.out_dir = out_dir
+        self.prefix = os.path.join(variant, str(count))
+
+    def __write(self, relpath, write):
+        path = os.path.join(self.out_dir, relpath)
+        os.makedirs(os.path.dirname(path), exist_ok = True)
+        with open(path, 'wb') as fh:
+            write(fh)
+        return relpath.replace(os.sep, '/')
+
+    def array(self, subdir, name, value, dtype):
+        value = np.asarray(value).astype(dtype)
+        relpath = os.path.join(self.prefix, subdir, file_name(name) + '.npy')
+        return {
+            'file': self.__write(relpath, lambda fh: np.save(fh, value)),
+            'dtype': np.dtype(dtype).name,
+            'shape': list(value.shape),
+        }
+
+    def bytes(self, subdir, name, value):
+        value = bytes(value)
+        relpath = os.path.join(self.prefix, subdir, file_name(name) + '.bin')
+        entry = {
+            'file': self.__write(relpath, lambda fh: fh.write(value)),
+            'dtype': 'bytes',
+            'length': len(value),
+        }
+        if len(value) <= INLINE_HEX_BYTES:
+            entry['hex'] = value.hex().upper()
+        return entry
+
+    def value(self, op, name, value):
+        if isinstance(value, (bytes, bytearray)):
+            return self.bytes(op, name, value)
+        return self.array(op, name, value, np.int16 if name in SIGNED else np.uint16)
+
+def export_entry(variant, count, seed, out_dir, include_A = True):
+    """Run keygen, encaps and decaps of the variant from the KAT seed and write
+    all their traced intermediate values (plus A if include_A) below out_dir;
+    returns the manifest entry"""
+    kem = FrodoKEM(variant)
+    kem.randombytes = NISTKAT.NISTRNG(seed).randombytes
+    writer = GoldenWriter(out_dir, variant, count)
+    traces = {op: FrodoKEMTrace() for op in OPS}
+    kem.trace = traces['keygen']
+    (pk, sk) = kem.kem_keygen()
+    kem.trace = traces['encaps']
+    (ct, ss_e) = kem.kem_encaps(pk)
+    kem.trace = traces['decaps']
+    ss_d = kem.kem_decaps(sk, ct)
+    kem.trace = None
+    assert ss_e == ss_d, "Shared secrets not equal"
+    entry = {
+        'count': count,
+        'seed': seed.hex().upper(),
+        'kat': {name: writer.bytes('kat', name, value) for (name, value) in [('pk', pk), ('sk', sk), ('ct', ct), ('ss', ss_e)]},
+    }
+    for op in OPS:
+        entry[op] = {name: writer.value(op, name, traces[op][name]) for name in traces[op].names()}
+    if include_A:
+        A = kem.gen(traces['keygen']['seedA'])
+        entry['keygen']['A'] = writer.array('keygen', 'A', A, np.uint16)
+    return entry
+
+def export(out_dir, variants = None, counts = (0,), include_A = True):
+    """Export the golden vectors of the given KAT counts for the given variants
+    (default: all) to out_dir and write the manifest; returns the manifest"""
+    if variants is None: variants = list(KAT_FILES.keys())
+    seeds = NISTKAT.kat_seeds(max(counts) + 1)
+    manifest = {'variants': dict()}
+    for variant in variants:
+        manifest['variants'][variant] = {
+            'params': params(FrodoKEM(variant)),
+            'entries': [export_entry(variant, count, seeds[count], out_dir, include_A) for count in counts],
+        }
+    with open(os.path.join(out_dir, MANIFEST), 'w') as fh:
+        json.dump(manifest, fh, indent = 4)
+    return manifest
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description = "Export FrodoKEM intermediate values as golden vectors (.npy + JSON manifest)")
+    parser.add_argument('out_dir')
+    parser.add_argument('--variants', nargs = '+', default = None, help = "variants to export (default: all)")
+    parser.add_argument('--counts', type = int, nargs = '+', default = [0], help = "KAT entries to export (default: 0)")
+    parser.add_argument('--no-A', dest = 'include_A', action = 'store_false', help = "do not export the matrix A")
+    args = parser.parse_args()
+    warnings.simplefilter("ignore")
+    os.makedirs(args.out_dir, exist_ok = True)
+    manifest = export(args.out_dir, args.variants, args.counts, args.include_A)
+    for variant, data in manifest['variants'].items():
+        print("{:s}: {:d} entries".format(variant, len(data['entries'])))
@@ -0,0 +1,325 @@
+import argparse
+import asyncio
+import collections
+import concurrent.futures
+import json
+import os
+import random
+import struct
+import sys
+import tempfile
+import warnings
+import numpy as np
+from frodokem import FrodoKEM
+from shared_a import SharedA, init_worker, worker_kem
+
+# Local FrodoKEM throughput service, as a software baseline under concurrent load.
+#
+# Frames on the socket are a 4-byte big-endian length followed by the body.
+# Requests are id (4 bytes) || op (1 byte) || payload, where the payload is pk
+# for encaps and sk || ct for decaps; responses are id || status (1 byte) ||
+# payload, with ct || ss (encaps) or ss (decaps) on success and an error message
+# otherwise. Requests on one connection may be pipelined and are answered as
+# they complete.
+
+OP_ENCAPS = 0
+OP_DECAPS = 1
+OPS = {'encaps': OP_ENCAPS, 'decaps': OP_DECAPS}
+
+STATUS_OK = 0
+STATUS_ERROR = 1
+
+async def read_frame(reader):
+    (length,) = struct.unpack('>I', await reader.readexactly(4))
+    return await reader.readexactly(length)
+
+def write_frame(writer, body):
+    writer.write(struct.pack('>I', len(body)) + body)
+
+def _encaps_batch(variant, pks):
+    return worker_kem(variant).kem_encaps_batch(pks)
+
+def _decaps_batch(variant, sks, cts):
+    return worker_kem(variant).kem_decaps_batch(sks, cts)
+
+def _warm_up(variant):
+    worker_kem(variant)
+
+class KEMService(object):
+    """asyncio front-end dispatching encaps/decaps requests to a process pool of
+    FrodoKEM workers. Requests waiting while all workers are busy are combined,
+    up to max_batch of the same op, into one kem_encaps_batch/kem_decaps_batch
+    call. If a SharedACache is given, the workers use it as their A_cache."""
+
+    def __init__(self, variant, workers = None, max_batch = 16, cache = None):
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")
+            self.kem = FrodoKEM(variant)
+        self.variant = variant
+        self.workers = workers or os.cpu_count()
+        self.max_batch = max_batch
+        self.cache = cache
+        self.batch_sizes = []
+        self.__executor = None
+        self.__queue = None
+        self.__server = None
+        self.__dispatcher = None
+        # Running batch tasks; the event loop keeps only weak references to tasks
+        self.__batches = set()
+
+    async def start(self, path = None, host = '127.0.0.1', port = 0):
+        """Start the workers and listen on the Unix socket path if given, else on
+        host:port (port 0 picks a free port); returns the address to connect to,
+        ('unix', path) or ('tcp', host, port)"""
+        self.__executor = concurrent.futures.ProcessPoolExecutor(max_workers = self.workers, initializer = init_worker, initargs = (self.cache,))
+        # Start the workers before listening: forked later, they would inherit the
+        # sockets of open connections and keep them from closing
+        loop = asyncio.get_running_loop()
+        await asyncio.gather(*[loop.run_in_executor(self.__executor, _warm_up, self.variant) for i in range(self.workers)])
+        self.__queue = asyncio.Queue()
+        self.__dispatcher = asyncio.ensure_future(self.__dispatch())
+        if path is not None:
+            self.__server = await asyncio.start_unix_server(self.__handle, path = path)
+            return ('unix', path)
+        self.__server = await asyncio.start_server(self.__handle, host = host, port = port)
+        return ('tcp', host, self.__server.sockets[0].getsockname()[1])
+
+    async def stop(self):
+        self.__server.close()
+        await self.__server.wait_closed()
+        self.__dispatcher.cancel()
+        self.__executor.shutdown()
+
+    def __check(self, op, payload):
+        """Error message for a malformed request, or None"""
+        if op == OP_ENCAPS:
+            if len(payload) != self.kem.len_pk_bytes: return "Incorrect public key length"
+        elif op == OP_DECAPS:
+            if len(payload) != self.kem.len_sk_bytes + self.kem.len_ct_bytes: return "Incorrect secret key / ciphertext length"
+        else:
+            return "Unknown op {:d}".format(op)
+        return None
+
+    async def __handle(self, reader, writer):
+        lock = asyncio.Lock()
+        pending = set()
+
+        async def respond(request_id, future):
+            try:
+                body = struct.pack('>IB', request_id, STATUS_OK) + await future
+            except Exception as e:
+                body = struct.pack('>IB', request_id, STATUS_ERROR) + "{:s}: {:s}".format(type(e).__name__, str(e)).encode()
+            async with lock:
+                write_frame(writer, body)
+                await writer.drain()
+
+        try:
+            while True:
+                try:
+                    body = await read_frame(reader)
+                except (asyncio.IncompleteReadError, ConnectionError):
+                    break
+                future = asyncio.get_running_loop().create_future()
+                if len(body) < 5:
+                    # Too short for id || op: answer with as much of the id as there is
+                    (request_id, op, payload) = (int.from_bytes(body[0:4], 'big'), None, b'')
+                    error = "Truncated request"
+                else:
+                    (request_id, op) = struct.unpack('>IB', body[0:5])
+                    payload = body[5:]
+                    error = self.__check(op, payload)
+                if error is None:
+                    self.__queue.put_nowait((op, payload, future))
+                else:
+                    future.set_exception(ValueError(error))
+                task = asyncio.ensure_future(respond(request_id, future))
+                pending.add(task)
+                task.add_done_callback(pending.discard)
+            if pending: await asyncio.wait(pending)
+        finally:
+            writer.close()
+            await writer.wait_closed()
+
+    async def __dispatch(self):
+        """Whenever a worker is free, take the requests that arrived meanwhile off
+        the queue and run the oldest waiting request together with up to max_batch
+        - 1 later ones of the same op as one batch"""
+        free = asyncio.Semaphore(self.workers)
+        waiting = collections.deque()
+        while True:
+            if not waiting:
+                waiting.append(await self.__queue.get())
+            await free.acquire()
+            while not self.__queue.empty():
+                waiting.append(self.__queue.get_nowait())
+            op = waiting[0][0]
+            batch, rest = [], collections.deque()
+            for request in waiting:
+                (batch if request[0] == op and len(batch) < self.max_batch else rest).append(request)
+            waiting = rest
+            task = asyncio.ensure_future(self.__run_batch(op, batch, free))
+            self.__batches.add(task)
+            task.add_done_callback(self.__batches.discard)
+
+    async def __run_batch(self, op, batch, free):
+        loop = asyncio.get_running_loop()
+        self.batch_sizes.append(len(batch))
+        try:
+            if op == OP_ENCAPS:
+                results = await loop.run_in_executor(self.__executor, _encaps_batch, self.variant, [payload for (_, payload, _) in batch])
+                results = [ct + ss for (ct, ss) in results]
+            else:
+                sks = [payload[0:self.kem.len_sk_bytes] for (_, payload, _) in batch]
+                cts = [payload[self.kem.len_sk_bytes:] for (_, payload, _) in batch]
+                results = await loop.run_in_executor(self.__executor, _decaps_batch, self.variant, sks, cts)
+            for ((_, _, future), result) in zip(batch, results):
+                if not future.done(): future.set_result(result)
+        except Exception as e:
+            for (_, _, future) in batch:
+                if not future.done(): future.set_exception(e)
+        finally:
+            free.release()
+
+class KEMClient(object):
+    """Connection to a KEMService on which requests can be pipelined"""
+
+    def __init__(self):
+        self.__futures = dict()
+        self.__next_id = 0
+
+    async def connect(self, address):
+        if address[0] == 'unix':
+            (self.__reader, self.__writer) = await asyncio.open_unix_connection(address[1])
+        else:
+            (self.__reader, self.__writer) = await asyncio.open_connection(address[1], address[2])
+        self.__receiver = asyncio.ensure_future(self.__receive())
+        return self
+
+    async def __receive(self):
+        try:
+            while True:
+                body = await read_frame(self.__reader)
+                (request_id, status) = struct.unpack('>IB', body[0:5])
+                future = self.__futures.pop(request_id)
+                if status == STATUS_OK:
+                    future.set_result(body[5:])
+                else:
+                    future.set_exception(RuntimeError(body[5:].decode()))
+        except (asyncio.IncompleteReadError, ConnectionError):
+            for future in self.__futures.values():
+                future.set_exception(ConnectionError("Connection closed"))
+
+    async def request(self, op, payload):
+        """Send a request and wait for its response payload"""
+        request_id = self.__next_id
+        self.__next_id = (self.__next_id + 1) % 2**32
+        future = asyncio.get_running_loop().create_future()
+        self.__futures[request_id] = future
+        write_frame(self.__writer, struct.pack('>IB', request_id, op) + payload)
+        await self.__writer.drain()
+        return await future
+
+    async def close(self):
+        """Close the connection once the service has answered and closed its end"""
+        self.__writer.write_eof()
+        await self.__receiver
+        self.__writer.close()
+        await self.__writer.wait_closed()
+
+async def offered_load(address, op, payload, rate, duration, connections = 4, poisson = True, seed = 0):
+    """Send op requests with the given payload at the given offered rate (requests
+    per second; Poisson arrivals unless poisson is False) for duration seconds,
+    spread over connections connections. The latency of a request is measured from
+    its scheduled send time, so a server that falls behind is not hidden by the
+    generator slowing down. Returns a report with the achieved ops/sec and the
+    latency percentiles in seconds."""
+    clients = [await KEMClient().connect(address) for i in range(connections)]
+    rng = random.Random(seed)
+    loop = asyncio.get_running_loop()
+    latencies = []
+    errors = []
+
+    async def one(client, scheduled):
+        try:
+            await client.request(op, payload)
+            latencies.append(loop.time() - scheduled)
+        except Exception as e:
+            errors.append(str(e))
+
+    tasks = []
+    start = loop.time()
+    scheduled = start
+    i = 0
+    while scheduled < start + duration:
+        delay = scheduled - loop.time()
+        if delay > 0: await asyncio.sleep(delay)
+        tasks.append(asyncio.ensure_future(one(clients[i % connections], scheduled)))
+        i += 1
+        scheduled += rng.expovariate(rate) if poisson else 1.0 / rate
+    await asyncio.gather(*tasks)
+    elapsed = loop.time() - start
+    for client in clients:
+        await client.close()
+    latencies = np.asarray(latencies)
+    return {
+        'offered_rate': rate,
+        'requests': len(tasks),
+        'completed': len(latencies),
+        'errors': len(errors),
+        'elapsed': elapsed,
+        'ops_per_second': len(latencies) / elapsed,
+        'p50': float(np.percentile(latencies, 50)) if len(latencies) else None,
+        'p99': float(np.percentile(latencies, 99)) if len(latencies) else None,
+        'mean': float(latencies.mean()) if len(latencies) else None,
+    }
+
+async def benchmark(variant, op, rates, duration, workers = None, max_batch = 16, connections = 4, unix = True, shared_A = True):
+    """Run a KEMService and measure it at each offered rate; returns a list of reports"""
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        kem = FrodoKEM(variant)
+    (pk, sk) = kem.kem_keygen()
+    (ct, ss) = kem.kem_encaps(pk)
+    payload = pk if op == 'encaps' else sk + ct
+    with SharedA() as shared, tempfile.TemporaryDirectory() as tmpdir:
+        if shared_A: shared.acquire(variant, pk[0:kem.len_seedA_bytes])
+        service = KEMService(variant, workers, max_batch, shared.cache() if shared_A else None)
+        address = await service.start(path = os.path.join(tmpdir, 'kem.sock') if unix else None)
+        # Warm up the workers (process start, imports, mapping A) before measuring
+        await offered_load(address, OPS[op], payload, service.workers, 1.0, connections, poisson = False)
+        reports = []
+        for rate in rates:
+            service.batch_sizes = []
+            report = await offered_load(address, OPS[op], payload, rate, duration, connections)
+            report['mean_batch'] = float(np.mean(service.batch_sizes)) if service.batch_sizes else 0.0
+            reports.append(report)
+        await service.stop()
+    return reports
+
+def print_reports(variant, op, reports):
+    print("{:s} {:s}".format(variant, op))
+    print("  {:>8s} {:>8s} {:>10s} {:>10s} {:>10s} {:>6s}".format("offered", "ops/s", "p50 ms", "p99 ms", "batch", "errors"))
+    for r in reports:
+        print("  {:8.1f} {:8.1f} {:10.2f} {:10.2f} {:10.2f} {:6d}".format(r['offered_rate'], r['ops_per_second'],
+            1e3 * (r['p50'] or 0), 1e3 * (r['p99'] or 0), r['mean_batch'], r['errors']))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description = "Throughput and latency of a local FrodoKEM service under offered load")
+    parser.add_argument('--variant', default = "FrodoKEM-640-SHAKE")
+    parser.add_argument('--op', choices = list(OPS.keys()), default = 'encaps')
+    parser.add_argument('--rates', type = float, nargs = '+', default = [10, 20, 40], help = "offered loads to measure, in requests per second")
+    parser.add_argument('--duration', type = float, default = 5.0, help = "seconds per offered load")
+    parser.add_argument('--workers', type = int, default = None, help = "worker processes (default: CPU count)")
+    parser.add_argument('--max-batch', type = int, default = 16)
+    parser.add_argument('--connections', type = int, default = 4)
+    parser.add_argument('--tcp', action = 'store_true', help = "listen on loopback TCP instead of a Unix socket")
+    parser.add_argument('--no-shared-A', dest = 'shared_A', action = 'store_false', help = "workers regenerate A instead of mapping it from shared memory")
+    parser.add_argument('--save', help = "write the reports as JSON to this file")
+    args = parser.parse_args()
+    warnings.simplefilter("ignore")
+    reports = asyncio.run(benchmark(args.variant, args.op, args.rates, args.duration, args.workers, args.max_batch, args.connections, not args.tcp, args.shared_A))
+    print_reports(args.variant, args.op, reports)
+    if args.save:
+        with open(args.save, 'w') as fh:
+            json.dump({'variant': args.variant, 'op': args.op, 'workers': args.workers, 'max_batch': args.max_batch, 'reports': reports}, fh, indent = 4)
+    sys.exit(0 if all(r['errors'] == 0 for r in reports) else 1)
@@ -0,0 +1,106 @@
+from cryptography.hazmat.backends import default_backend
+from cryptography.hazmat.primitives import hashes
+import numpy as np
+
+class LWEMatrixEngine(object):
+    """The SHAKE helpers and NumPy mod-q matrix arithmetic shared by FrodoKEM
+    (frodokem.py) and ScloudPlus (scloudplus.py), which both inherit from it.
+
+    Matrices are held as int64 NumPy arrays and q must be a power of two, so the
+    reduction mod q is a mask, which also maps negative entries correctly. A is
+    m x n where the class defines m, and n x n (as in FrodoKEM) otherwise; the
+    class provides q, n, variant, gen(seedA) and gen_rows(seedA, start, stop), and
+    the attributes A_chunk_rows and A_cache used when streaming A."""
+
+    @staticmethod
+    def _shake128(msg, digest_len):
+        """Returns a bytes object containing the SHAKE-128 hash of msg with
+        digest_len bytes of output"""
+        shake_ctx = hashes.Hash(hashes.SHAKE128(digest_len), backend = default_backend())
+        shake_ctx.update(msg)
+        return shake_ctx.finalize()
+
+    @staticmethod
+    def _shake256(msg, digest_len):
+        """Returns a bytes object containing the SHAKE-256 hash of msg with
+        digest_len bytes of output"""
+        shake_ctx = hashes.Hash(hashes.SHAKE256(digest_len), backend = default_backend())
+        shake_ctx.update(msg)
+        return shake_ctx.finalize()
+
+    def _matrix_mul(self, X, Y):
+        """Compute matrix multiplication X * Y mod q
+
+        Stacks of matrices (N x rows x cols) are multiplied pairwise."""
+        X = np.asarray(X, dtype=np.int64)
+        Y = np.asarray(Y, dtype=np.int64)
+        assert X.ndim >= 2 and Y.ndim >= 2 and X.shape[-1] == Y.shape[-2], "Mismatched matrix dimensions"
+        # Entries are below 2^16 in absolute value and n <= 1344, so the sums fit in int64
+        R = np.matmul(X, Y)
+        R &= self.q - 1
+        return R
+
+    def _matrix_add(self, X, Y):
+        """Compute matrix addition X + Y mod q"""
+        R = np.array(X, dtype=np.int64)
+        Y = np.asarray(Y, dtype=np.int64)
+        assert R.shape == Y.shape, "Mismatched matrix dimensions"
+        R += Y
+        R &= self.q - 1
+        return R
+
+    def _matrix_sub(self, X, Y):
+        """Compute matrix subtraction X - Y mod q"""
+        R = np.array(X, dtype=np.int64)
+        Y = np.asarray(Y, dtype=np.int64)
+        assert R.shape == Y.shape, "Mismatched matrix dimensions"
+        R -= Y
+        R &= self.q - 1
+        return R
+
+    def _matrix_transpose(self, X):
+        """Compute transpose of matrix X (a view, no copy is made)"""
+        return np.asarray(X).T
+
+    def _A_rows(self):
+        """Number of rows of A"""
+        return getattr(self, 'm', self.n)
+
+    def _A_chunks(self, seedA):
+        """Yield (start, stop, rows start .. stop-1 of A = Gen(seedA)) in chunks of
+        A_chunk_rows rows, taking A from A_cache when one is set"""
+        rows = self._A_rows()
+        chunk = self.A_chunk_rows or rows
+        if self.A_cache is not None:
+            A = self.A_cache.get(self.variant, seedA)
+            if A is None:
+                A = self.gen(seedA)
+                self.A_cache.put(self.variant, seedA, A)
+            for start in range(0, rows, chunk):
+                stop = min(start + chunk, rows)
+                yield start, stop, A[start:stop].astype(np.int64)
+            return
+        for start in range(0, rows, chunk):
+            stop = min(start + chunk, rows)
+            yield start, stop, self.gen_rows(seedA, start, stop).astype(np.int64)
+
+    def _gen_A_mul(self, seedA, S):
+        """Compute A * S mod q where A = Gen(seedA), streaming A by rows: each
+        chunk of rows of A gives the same rows of the product"""
+        S = np.asarray(S, dtype=np.int64)
+        R = np.empty((self._A_rows(), S.shape[1]), dtype=np.int64)
+        for start, stop, A_rows in self._A_chunks(seedA):
+            np.matmul(A_rows, S, out=R[start:stop])
+        R &= self.q - 1
+        return R
+
+    def _mul_gen_A(self, Sprime, seedA):
+        """Compute S' * A mod q where A = Gen(seedA), streaming A by rows: each
+        chunk of rows of A is multiplied by the matching column block of S' and
+        accumulated into the product"""
+        Sprime = np.asarray(Sprime, dtype=np.int64)
+        R = np.zeros((Sprime.shape[0], self.n), dtype=np.int64)
+        for start, stop, A_rows in self._A_chunks(seedA):
+            R += np.matmul(Sprime[:, start:stop], A_rows)
+        R &= self.q - 1
+        return R
@@ -2,119 +2,227 @@
 # SPDX-License-Identifier: CC0-1.0
 # Created by Douglas Stebila
 
+import concurrent.futures
+import contextlib
+import io
+import json
 import os
+import sys
+import time
+from cryptography.hazmat.backends import default_backend
+from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
 from frodokem import FrodoKEM
 
+# KAT file for each supported FrodoKEM variant
+KAT_FILES = {
+    'FrodoKEM-640-AES': 'PQCkemKAT_19888.rsp',
+    'FrodoKEM-640-SHAKE': 'PQCkemKAT_19888_shake.rsp',
+    'FrodoKEM-976-AES': 'PQCkemKAT_31296.rsp',
+    'FrodoKEM-976-SHAKE': 'PQCkemKAT_31296_shake.rsp',
+    'FrodoKEM-1344-AES': 'PQCkemKAT_43088.rsp',
+    'FrodoKEM-1344-SHAKE': 'PQCkemKAT_43088_shake.rsp',
+}
+
 class NISTKAT(object):
-    
+
     @staticmethod
-    def run(kem):
-        """Generate a NIST KAT output for the given KEM"""
-        rng = NISTKAT.NISTRNG()
+    def kat_seeds(count = 100):
+        """Returns the seeds of the first count KAT entries, as generated by
+        PQCgenKAT_kem.c from the entropy input 0, 1, ..., 47"""
+        rng = NISTKAT.NISTRNG(bytes(range(48)))
+        return [rng.randombytes(48) for i in range(count)]
+
+    @staticmethod
+    def run(kem, timings = None, count = 0, seed = None):
+        """Generate the NIST KAT output with the given count for the given KEM; the
+        seed of that entry is derived as in PQCgenKAT_kem.c unless given. If a
+        dictionary timings is given, the wall time in seconds of keygen, encaps and
+        decaps is stored in it"""
+        if timings is None: timings = dict()
+        if seed is None: seed = NISTKAT.kat_seeds(count + 1)[count]
+        rng = NISTKAT.NISTRNG(seed)
         kem.randombytes = rng.randombytes
         print("===============================================")
         print(kem.variant)
-        print("count = 0")
-        print("seed = <unspecified>")
+        print("count = {:d}".format(count))
+        print("seed =", seed.hex().upper())
+        start = time.perf_counter()
         (pk, sk) = kem.kem_keygen()
+        timings['keygen'] = time.perf_counter() - start
         print("pk =", pk.hex().upper())
         print("sk =", sk.hex().upper())
+        start = time.perf_counter()
         (ct, ss_e) = kem.kem_encaps(pk)
+        timings['encaps'] = time.perf_counter() - start
         print("ct =", ct.hex().upper())
         print("ss =", ss_e.hex().upper())
+        start = time.perf_counter()
         ss_d = kem.kem_decaps(sk, ct)
+        timings['decaps'] = time.perf_counter() - start
         assert ss_e.hex() == ss_d.hex(), "Shared secrets not equal"
         return {
             'variant': kem.variant,
-            'count': '0',
-            'seed': '<unspecified>',
+            'count': str(count),
+            'seed': seed.hex().upper(),
             'pk': pk.hex().upper(),
             'sk': sk.hex().upper(),
             'ct': ct.hex().upper(),
             'ss': ss_e.hex().upper()
         }
-    
+
+    @staticmethod
+    def read_rsp(katfile):
+        """Parse a KAT .rsp file in ../KAT (or at the given path) one entry at a time;
+        yields a dictionary per entry containing the variant and its count, seed, pk,
+        sk, ct and ss values"""
+        path = katfile if os.path.exists(katfile) else os.path.join('..', 'KAT', katfile)
+        with open(path, 'r') as fh:
+            variant = None
+            entry = dict()
+            for line in fh:
+                line = line.strip()
+                if line.startswith('#'):
+                    variant = line.replace('#', '').strip()
+                elif ' = ' in line:
+                    (key, value) = line.split(' = ', 1)
+                    entry[key] = value
+                elif len(entry) > 0:
+                    entry['variant'] = variant
+                    yield entry
+                    entry = dict()
+            if len(entry) > 0:
+                entry['variant'] = variant
+                yield entry
+
+    @staticmethod
+    def compare(katvalues, basekatvalues):
+        """Check that the KAT values in the dictionary katvalues match those in basekatvalues"""
+        for x in ['variant', 'count', 'pk', 'sk', 'ct', 'ss']:
+            assert katvalues[x] == basekatvalues[x], "{:s} not equal".format(x)
+
+    @staticmethod
     def check(katvalues, katfile):
         """Check that KAT values in the dictionary katvalues match those stored in katfile"""
-        with open(os.path.join('..', 'KAT', katfile), 'r') as fh:
-            basekatvalues = dict()
-            basekatvalues['variant'] = fh.readline().replace('#', '').strip()
-            fh.readline()
-            # count
-            a = fh.readline().strip().replace(' = ', ',').split(',')
-            basekatvalues[a[0]] = a[1]
-            # seed
-            a = fh.readline().strip().replace(' = ', ',').split(',')
-            basekatvalues[a[0]] = a[1]
-            # pk
-            a = fh.readline().strip().replace(' = ', ',').split(',')
-            basekatvalues[a[0]] = a[1]
-            # sk
-            a = fh.readline().strip().replace(' = ', ',').split(',')
-            basekatvalues[a[0]] = a[1]
-            # ct
-            a = fh.readline().strip().replace(' = ', ',').split(',')
-            basekatvalues[a[0]] = a[1]
-            # ss
-            a = fh.readline().strip().replace(' = ', ',').split(',')
-            basekatvalues[a[0]] = a[1]
-            for x in ['variant', 'count', 'pk', 'sk', 'ct', 'ss']:
-                assert katvalues[x] == basekatvalues[x], "{:s} not equal".format(x)
-            print("Computed KAT values match for {:s}".format(basekatvalues['variant']))
+        for basekatvalues in NISTKAT.read_rsp(katfile):
+            if basekatvalues['count'] == katvalues['count']:
+                NISTKAT.compare(katvalues, basekatvalues)
+                print("Computed KAT values match for {:s}".format(basekatvalues['variant']))
+                return
+        assert False, "count {:s} not found".format(katvalues['count'])
+
+    @staticmethod
+    def check_entry(variant, basekatvalues):
+        """Run and check one KAT entry for the variant, with its output suppressed;
+        returns (variant, count, passed, error message, timings). Any exception, e.g.
+        from malformed hex in the .rsp file, is reported as a failure of the entry
+        rather than raised. Suitable for use in a worker process."""
+        timings = dict()
+        count = basekatvalues.get('count')
+        try:
+            count = int(count)
+            with contextlib.redirect_stdout(io.StringIO()):
+                katvalues = NISTKAT.run(FrodoKEM(variant), timings, count, bytes.fromhex(basekatvalues['seed']))
+            NISTKAT.compare(katvalues, basekatvalues)
+            return (variant, count, True, None, timings)
+        except Exception as e:
+            return (variant, count, False, "{:s}: {:s}".format(type(e).__name__, str(e)), timings)
+
+    @staticmethod
+    def check_all(variants = None, counts = None, max_workers = None):
+        """Check the KATs for the given variants (default: all) concurrently in a process
+        pool. The .rsp files are parsed as a stream and every entry whose count is in
+        counts (default: all) is checked as a separate job; yields the results of
+        check_entry as they finish. A variant whose file cannot be read yields a single
+        failed result with count None."""
+        if variants is None: variants = list(KAT_FILES.keys())
+        with concurrent.futures.ProcessPoolExecutor(max_workers = max_workers) as executor:
+            futures = []
+            for variant in variants:
+                try:
+                    for basekatvalues in NISTKAT.read_rsp(KAT_FILES[variant]):
+                        if counts is None or int(basekatvalues['count']) in counts:
+                            futures.append(executor.submit(NISTKAT.check_entry, variant, basekatvalues))
+                except OSError as e:
+                    yield (variant, None, False, "{:s}: {:s}".format(type(e).__name__, str(e)), dict())
+            for future in concurrent.futures.as_completed(futures):
+                yield future.result()
 
     class NISTRNG(object):
-        """Dummy object that contains a serialization of the randombytes outputs that 
-        would be generated by the deterministic RNG in the NIST KAT generation algorithm 
-        when run on FrodoKEM; note that this is not a proper implementation of that RNG, 
-        it has the exact values generated hard-coded."""
-
-        # To get these values, add the following lines to rng.c in the C implementation to print out the required RNG outputs:
-        #     printf("randombytes_output (%llu): ", xlen_original);
-        #    for (size_t i = 0; i < xlen_original; i++) {
-        #        printf("%02X", x[i]);
-        #    }
-        #    printf("\n");
-
-        def __init__(self):
-            self.current_outputs = None
-            self.possible_outputs = [
-                [
-                    bytes.fromhex('7C9935A0B07694AA0C6D10E4DB6B1ADD2FD81A25CCB148032DCD739936737F2DB505D7CFAD1B497499323C8686325E4792F267AAFA3F87CA60D01CB54F29202A'),
-                    bytes.fromhex('EB4A7C66EF4EBA2DDB38C88D8BC706B1D639002198172A7B1942ECA8F6C001BA26202BEE59AC275484EA767D41D8D357'),
-                ],
-                [
-                    bytes.fromhex('7C9935A0B07694AA0C6D10E4DB6B1ADD2FD81A25CCB148032DCD739936737F2DB505D7CFAD1B497499323C8686325E4792F267AAFA3F87CA60D01CB54F29202A3E784CCB7EBCDCFD45542B7F6AF778742E0F4479175084AA'),
-                    bytes.fromhex('EE716762C15E3B72AA7650A63B9A510040B03C0FE70475C0463BBC45A0BA5B7980DD46EEF82FB062035077D042F306BB6391040E0DD965F1FDA9D183CA9FCCB48FC010B184AB0033'),
-                ],
-                [
-                    bytes.fromhex('7C9935A0B07694AA0C6D10E4DB6B1ADD2FD81A25CCB148032DCD739936737F2DB505D7CFAD1B497499323C8686325E4792F267AAFA3F87CA60D01CB54F29202A3E784CCB7EBCDCFD45542B7F6AF778742E0F4479175084AA488B3B74340678AA38E22E9628B0A161FDEB0BD252173B9C'),
-                    bytes.fromhex('9F08587687FF66765C671DE73E918D2823CA573FF4E7A31A9160324026E540EACB3A04E0D54C75DEB9705BFDFBDF935A7528802EE6E5B0C6A73B2B761D9BD0848A6E4CF3FC4CA84F14E0331AF35BFEF41E42B13A6DAE6DF937F738C1857BA1CA'),
-                ],
-            ]
-        
+        """The deterministic AES-256 CTR DRBG used by the NIST KAT generation algorithm
+        (randombytes_init and randombytes in rng.c of the NIST PQC submission package)"""
+
+        def __init__(self, entropy_input = None, personalization_string = None):
+            """randombytes_init: seed the DRBG with a 48-byte entropy input; by default
+            the seed of the KAT entry with count 0 is used"""
+            if entropy_input is None: entropy_input = NISTKAT.kat_seeds(1)[0]
+            assert len(entropy_input) == 48, "Entropy input must be 48 bytes"
+            seed_material = bytes(entropy_input)
+            if personalization_string is not None:
+                seed_material = bytes(a ^ b for (a, b) in zip(seed_material, personalization_string))
+            self.key = bytes(32)
+            self.v = 0
+            self.__update(seed_material)
+            self.reseed_counter = 1
+
+        def __blocks(self, nblocks):
+            """Encrypt V+1, ..., V+nblocks (V is a 128-bit big-endian counter) in one
+            ECB call and advance V"""
+            counters = b''.join(((self.v + i) % 2**128).to_bytes(16, 'big') for i in range(1, nblocks + 1))
+            self.v = (self.v + nblocks) % 2**128
+            encryptor_ctx = Cipher(algorithms.AES(self.key), modes.ECB(), backend = default_backend()).encryptor()
+            return encryptor_ctx.update(counters) + encryptor_ctx.finalize()
+
+        def __update(self, provided_data):
+            """AES256_CTR_DRBG_Update"""
+            temp = self.__blocks(3)
+            if provided_data is not None:
+                temp = bytes(a ^ b for (a, b) in zip(temp, provided_data))
+            self.key = temp[0:32]
+            self.v = int.from_bytes(temp[32:48], 'big')
+
         def randombytes(self, n):
-            # On each use, check if the output length requested matches one of the pre-programmed values
-            if self.current_outputs == None:
-                for i in range(len(self.possible_outputs)):
-                    if n == len(self.possible_outputs[i][0]):
-                        self.current_outputs = self.possible_outputs[i]
-                assert self.current_outputs != None, "Could not find pre-programmed output of desired length {:d}".format(n)
-            assert len(self.current_outputs) > 0, "No remaining outputs available"
-            assert n == len(self.current_outputs[0]), "Next output not of the appropriate length"
-            r = self.current_outputs.pop(0)
+            """Returns n bytes of output; all blocks are generated at once"""
+            r = self.__blocks((n + 15) // 16)[0:n]
+            self.__update(None)
+            self.reseed_counter += 1
             return r
 
 if __name__ == "__main__":
-    # Run KATs for all supported FrodoKEM variants
-    katvalues = NISTKAT.run(FrodoKEM('FrodoKEM-640-AES'))
-    NISTKAT.check(katvalues, 'PQCkemKAT_19888.rsp')
-    katvalues = NISTKAT.run(FrodoKEM('FrodoKEM-640-SHAKE'))
-    NISTKAT.check(katvalues, 'PQCkemKAT_19888_shake.rsp')
-    katvalues = NISTKAT.run(FrodoKEM('FrodoKEM-976-AES'))
-    NISTKAT.check(katvalues, 'PQCkemKAT_31296.rsp')
-    katvalues = NISTKAT.run(FrodoKEM('FrodoKEM-976-SHAKE'))
-    NISTKAT.check(katvalues, 'PQCkemKAT_31296_shake.rsp')
-    katvalues = NISTKAT.run(FrodoKEM('FrodoKEM-1344-AES'))
-    NISTKAT.check(katvalues, 'PQCkemKAT_43088.rsp')
-    katvalues = NISTKAT.run(FrodoKEM('FrodoKEM-1344-SHAKE'))
-    NISTKAT.check(katvalues, 'PQCkemKAT_43088_shake.rsp')
+    # Run KATs for all supported FrodoKEM variants in parallel. By default only count 0
+    # is checked; with --all every entry of each .rsp file is. Failures are reported as
+    # they happen and each variant is reported when all its entries are done; the
+    # per-variant timings (mean over the entries checked) are written as JSON to stdout
+    # or to the file given as an argument
+    args = [arg for arg in sys.argv[1:] if arg != '--all']
+    counts = None if '--all' in sys.argv[1:] else [0]
+    pending = dict()
+    for variant in KAT_FILES:
+        try:
+            pending[variant] = sum(1 for basekatvalues in NISTKAT.read_rsp(KAT_FILES[variant]) if counts is None or int(basekatvalues['count']) in counts)
+        except OSError:
+            pending[variant] = 1
+    report = {variant: {'passed': 0, 'failed': [], 'keygen': 0.0, 'encaps': 0.0, 'decaps': 0.0} for variant in KAT_FILES}
+    all_passed = True
+    for (variant, count, passed, error, timings) in NISTKAT.check_all(counts = counts):
+        all_passed = all_passed and passed
+        for op in timings:
+            report[variant][op] += timings[op]
+        if passed:
+            report[variant]['passed'] += 1
+        else:
+            report[variant]['failed'].append(count)
+            print("FAIL {:s} count = {:s}: {:s}".format(variant, str(count), error), file = sys.stderr)
+        pending[variant] -= 1
+        if pending[variant] == 0:
+            checked = report[variant]['passed'] + len([count for count in report[variant]['failed'] if count is not None])
+            for op in ['keygen', 'encaps', 'decaps']:
+                report[variant][op] /= max(checked, 1)
+            print("{:s} {:s}: {:d} passed, {:d} failed (keygen {:.3f}s, encaps {:.3f}s, decaps {:.3f}s)".format(
+                "PASS" if len(report[variant]['failed']) == 0 else "FAIL", variant, report[variant]['passed'], len(report[variant]['failed']),
+                report[variant]['keygen'], report[variant]['encaps'], report[variant]['decaps']), file = sys.stderr)
+    if len(args) > 0:
+        with open(args[0], 'w') as fh:
+            json.dump(report, fh, indent = 4)
+    else:
+        print(json.dumps(report, indent = 4))
+    sys.exit(0 if all_passed else 1)
@@ -7,6 +7,8 @@ rng = NISTKAT.NISTRNG()
 kem.randombytes = rng.randombytes
 pk, sk = kem.kem_keygen()
 ct,ss = kem.kem_encaps(pk)
+print("pkh", kem.shake(pk, kem.len_pkh_bytes).hex().upper())
+print("ss", ss.hex().upper())
 # kem.kem_decaps(sk,ct)
 
 
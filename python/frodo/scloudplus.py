@@ -0,0 +1,369 @@
+import secrets
+import struct
+import numpy as np
+from lwe_matrix import LWEMatrixEngine
+
+class ScloudPlus(LWEMatrixEngine):
+    """Reference implementation of an LWE-based KEM with the structure of Scloud+,
+    written in the style of the FrodoKEM implementation in frodokem.py and sharing
+    its NumPy mod-q matrix engine (LWEMatrixEngine in lwe_matrix.py), to produce
+    realistic Scloud workloads (matrix shapes, secret matrices and SHAKE call
+    volumes) for the hardware models.
+
+    A is an m x n matrix generated row by row with SHAKE-128 and q = 2^12. The
+    secrets S and S' are ternary with a fixed number of nonzero entries per row of
+    S^T and S', the errors are centred binomial, the ciphertext matrices C1 and C2
+    are compressed to logq1 and logq2 bits, and the KEM is obtained by the FO
+    transform with implicit rejection. The dimensions follow the Scloud-128/192/256
+    parameters used by the simulator; the secret weights are half the dimension,
+    matching the ternary distribution {-1: 1/4, 0: 1/2, 1: 1/4} assumed there.
+
+    This is not an interoperable Scloud+ implementation: the lattice-code message
+    encoding of Scloud+ is replaced by encoding B bits per coefficient as in
+    FrodoKEM, and there are no known answer tests to check against. Like the
+    FrodoKEM implementation, it is not designed to be fast or secure."""
+
+    def __init__(self, variant = "Scloud+-128"):
+        """Construct a new ScloudPlus instance
+
+        - variant: One of Scloud+-{128,192,256}"""
+        # Optional callable trace(name, value) receiving the named intermediate values
+        # of each operation (see FrodoKEMTrace in frodokem.py); when None nothing is
+        # captured
+        self.trace = None
+        # Number of rows of A generated at a time when computing A*S and S'*A;
+        # None generates the whole matrix at once
+        self.A_chunk_rows = None
+        # Optional ACache (see a_cache.py) from which A is reused across operations
+        # with the same seedA instead of being regenerated
+        self.A_cache = None
+        self.variant = variant
+        self.randombytes = lambda k : bytes((secrets.randbits(8) for i in range(k)))
+        if variant == "Scloud+-128":
+            self.setParamsScloud128()
+        elif variant == "Scloud+-192":
+            self.setParamsScloud192()
+        elif variant == "Scloud+-256":
+            self.setParamsScloud256()
+        else:
+            assert False, "Unknown variant"
+        self.gen = self.genSHAKE128
+        self.gen_rows = self.genSHAKE128_rows
+        self.shake = ScloudPlus._shake256
+        self.setLengths()
+
+    def setParamsScloud128(self):
+        """Set the parameters for Scloud+-128"""
+        self.m = 600
+        self.n = 600
+        self.mbar = 8
+        self.nbar = 8
+        self.logq = 12
+        self.logq1 = 9
+        self.logq2 = 7
+        self.h1 = 300
+        self.h2 = 300
+        self.eta1 = 2
+        self.eta2 = 2
+        self.B = 2
+        self.len_seedA_bytes = 16
+        self.len_seedSE_bytes = 32
+        self.len_z_bytes = 32
+        self.len_mu_bytes = 16
+        self.len_pkh_bytes = 32
+        self.len_k_bytes = 32
+        self.len_ss_bytes = 16
+
+    def setParamsScloud192(self):
+        """Set the parameters for Scloud+-192"""
+        self.m = 928
+        self.n = 896
+        self.mbar = 8
+        self.nbar = 8
+        self.logq = 12
+        self.logq1 = 10
+        self.logq2 = 8
+        self.h1 = 448
+        self.h2 = 464
+        self.eta1 = 2
+        self.eta2 = 2
+        self.B = 3
+        self.len_seedA_bytes = 16
+        self.len_seedSE_bytes = 48
+        self.len_z_bytes = 48
+        self.len_mu_bytes = 24
+        self.len_pkh_bytes = 48
+        self.len_k_bytes = 48
+        self.len_ss_bytes = 24
+
+    def setParamsScloud256(self):
+        """Set the parameters for Scloud+-256"""
+        self.m = 1136
+        self.n = 1120
+        self.mbar = 12
+        self.nbar = 11
+        self.logq = 12
+        self.logq1 = 9
+        self.logq2 = 7
+        self.h1 = 560
+        self.h2 = 568
+        self.eta1 = 2
+        self.eta2 = 2
+        self.B = 2
+        self.len_seedA_bytes = 16
+        self.len_seedSE_bytes = 64
+        self.len_z_bytes = 64
+        self.len_mu_bytes = 32
+        self.len_pkh_bytes = 64
+        self.len_k_bytes = 64
+        self.len_ss_bytes = 32
+
+    def setLengths(self):
+        """Derive q and the key and ciphertext lengths from the parameters"""
+        self.q = 2 ** self.logq
+        assert 8 * self.len_mu_bytes <= self.B * self.mbar * self.nbar, "Message does not fit in mbar x nbar coefficients"
+        self.len_b_bytes = -(-self.m * self.nbar * self.logq // 8)
+        self.len_c1_bytes = -(-self.mbar * self.n * self.logq1 // 8)
+        self.len_c2_bytes = -(-self.mbar * self.nbar * self.logq2 // 8)
+        self.len_pk_bytes = self.len_seedA_bytes + self.len_b_bytes
+        # sk = S^T || pk || pkh || z, with S^T stored as nbar x n signed bytes
+        self.len_sk_bytes = self.nbar * self.n + self.len_pk_bytes + self.len_pkh_bytes + self.len_z_bytes
+        self.len_ct_bytes = self.len_c1_bytes + self.len_c2_bytes
+
+    @staticmethod
+    def __ctverify(a, b):
+        """Compare two byte strings in constant time; returns 0 if they are equal,
+        -1 otherwise"""
+        a = np.frombuffer(a, dtype=np.uint8)
+        b = np.frombuffer(b, dtype=np.uint8)
+        # r is 0 if the strings are equal and in 1 .. 255 otherwise; (r + 255) >> 8 is
+        # then 0 or 1 without branching on r
+        r = int(np.bitwise_or.reduce(a ^ b, initial=0))
+        return -((r + 0xff) >> 8)
+
+    @staticmethod
+    def __ctselect(a, b, selector):
+        """Select a if selector == 0, b if selector == -1, in constant time"""
+        # mask is 0xFF if selector is -1, 0x00 if it is 0
+        mask = np.uint8(selector & 0xff)
+        a = np.frombuffer(a, dtype=np.uint8)
+        b = np.frombuffer(b, dtype=np.uint8)
+        return ((a & ~mask) | (b & mask)).tobytes()
+
+    def encode(self, mu):
+        """Encode the bit string mu as an mbar x nbar matrix, B bits per coefficient
+        in the most significant bits, coefficients in row-major order and bits in
+        little-endian order; the coefficients beyond the message are 0"""
+        bits = np.unpackbits(np.frombuffer(mu, dtype=np.uint8), bitorder='little').reshape(-1, self.B)
+        K = np.zeros(self.mbar * self.nbar, dtype=np.int64)
+        K[:len(bits)] = (bits @ (1 << np.arange(self.B))) << (self.logq - self.B)
+        return K.reshape(self.mbar, self.nbar)
+
+    def decode(self, M):
+        """Decode the mbar x nbar matrix M into a bit string (inverse of encode,
+        rounding each coefficient to the nearest multiple of q / 2^B)"""
+        count = 8 * self.len_mu_bytes // self.B
+        K = np.ravel(np.asarray(M, dtype=np.int64))[:count]
+        K = (((K << self.B) + (1 << (self.logq - 1))) >> self.logq) & ((1 << self.B) - 1)
+        bits = (K[:, None] >> np.arange(self.B)) & 1
+        return np.packbits(bits.astype(np.uint8).ravel(), bitorder='little').tobytes()
+
+    def compress(self, X, d):
+        """Round each coefficient of X to d bits: round(x * 2^d / q) mod 2^d"""
+        X = np.asarray(X, dtype=np.int64)
+        return (((X << d) + (1 << (self.logq - 1))) >> self.logq) & ((1 << d) - 1)
+
+    def decompress(self, Y, d):
+        """Map d-bit coefficients back to Z_q: y * q / 2^d"""
+        return np.asarray(Y, dtype=np.int64) << (self.logq - d)
+
+    def pack(self, C, d):
+        """Pack the d-bit coefficients of the matrix C into a bit string, in
+        row-major order and big-endian bit order, padded to a whole byte"""
+        C = np.ravel(np.asarray(C)).astype('>u2')
+        bits = np.unpackbits(C.view(np.uint8)).reshape(-1, 16)[:, 16 - d:]
+        return np.packbits(bits.ravel()).tobytes()
+
+    def unpack(self, b, n1, n2, d):
+        """Unpack a bit string into an n1 x n2 matrix of d-bit coefficients
+        (inverse of pack)"""
+        bits = np.unpackbits(np.frombuffer(b, dtype=np.uint8))[:n1 * n2 * d].reshape(n1 * n2, d)
+        return (bits.astype(np.int64) @ (1 << np.arange(d - 1, -1, -1))).reshape(n1, n2)
+
+    def sample_secret(self, r, n1, n2, h):
+        """Sample an n1 x n2 ternary matrix with exactly h nonzero entries in each
+        row from the bytes r, parsed as n1 * n2 32-bit integers in little-endian
+        byte order: in each row the entries with the h smallest values of the top
+        31 bits are nonzero, with the sign given by the lowest bit"""
+        t = np.frombuffer(r, dtype='<u4', count=n1 * n2).reshape(n1, n2)
+        chosen = np.argsort(t >> 1, axis=1, kind='stable')[:, :h]
+        rows = np.arange(n1)[:, None]
+        S = np.zeros((n1, n2), dtype=np.int64)
+        S[rows, chosen] = 1 - 2 * (t[rows, chosen] & 1).astype(np.int64)
+        return S
+
+    def sample_matrix(self, r, n1, n2, eta):
+        """Sample an n1 x n2 matrix from the centred binomial distribution with
+        parameter eta using the bytes r: each entry is the difference of the sums
+        of two groups of eta bits"""
+        bits = np.unpackbits(np.frombuffer(r, dtype=np.uint8), bitorder='little')[:n1 * n2 * 2 * eta]
+        bits = bits.reshape(n1 * n2, 2, eta).sum(axis=2, dtype=np.int64)
+        return (bits[:, 0] - bits[:, 1]).reshape(n1, n2)
+
+    def cbd_bytes(self, count, eta):
+        """Number of bytes of randomness sample_matrix uses for count entries"""
+        return -(-count * 2 * eta // 8)
+
+    def genSHAKE128(self, seedA):
+        """Generate the m x n matrix A using SHAKE-128; A is returned as a uint16
+        NumPy array"""
+        return self.genSHAKE128_rows(seedA, 0, self.m)
+
+    def genSHAKE128_rows(self, seedA, start, stop):
+        """Generate rows start .. stop-1 of matrix A using SHAKE-128: row i is
+        SHAKE128(i || seedA, 2n) parsed as n 16-bit little-endian integers mod q"""
+        A = np.empty((stop - start, self.n), dtype=np.uint16)
+        for i in range(start, stop):
+            c_i = np.frombuffer(ScloudPlus._shake128(struct.pack('<H', i) + seedA, 2 * self.n), dtype='<u2')
+            np.bitwise_and(c_i, self.q - 1, out=A[i - start])
+        return A
+
+    def __encrypt(self, seedA, B, mu, seedSE):
+        """The deterministic encryption of mu under (seedA, B) with the randomness
+        derived from seedSE; returns (c1, c2)"""
+        # 1. r = SHAKE(0x96 || seedSE) for S', E1 and E2
+        len_Sprime = 4 * self.mbar * self.m
+        len_E1 = self.cbd_bytes(self.mbar * self.n, self.eta2)
+        len_E2 = self.cbd_bytes(self.mbar * self.nbar, self.eta2)
+        r = self.shake(bytes(b'\x96') + seedSE, len_Sprime + len_E1 + len_E2)
+        if self.trace is not None: self.trace("r", r)
+        # 2. S' = SampleSecret(r, mbar, m, h2)
+        Sprime = self.sample_secret(r[0:len_Sprime], self.mbar, self.m, self.h2)
+        if self.trace is not None: self.trace("S'", Sprime)
+        # 3. E1 = SampleMatrix(r, mbar, n, eta2), E2 = SampleMatrix(r, mbar, nbar, eta2)
+        E1 = self.sample_matrix(r[len_Sprime:len_Sprime + len_E1], self.mbar, self.n, self.eta2)
+        if self.trace is not None: self.trace("E1", E1)
+        E2 = self.sample_matrix(r[len_Sprime + len_E1:], self.mbar, self.nbar, self.eta2)
+        if self.trace is not None: self.trace("E2", E2)
+        # 4. C1 = S' A + E1
+        C1 = self._matrix_add(self._mul_gen_A(Sprime, seedA), E1)
+        if self.trace is not None: self.trace("C1", C1)
+        # 5. C2 = S' B + E2 + Encode(mu)
+        V = self._matrix_add(self._matrix_mul(Sprime, B), E2)
+        if self.trace is not None: self.trace("V", V)
+        C2 = self._matrix_add(V, self.encode(mu))
+        if self.trace is not None: self.trace("C2", C2)
+        # 6. c1 = Pack(Compress(C1, logq1)), c2 = Pack(Compress(C2, logq2))
+        c1 = self.pack(self.compress(C1, self.logq1), self.logq1)
+        if self.trace is not None: self.trace("c1", c1)
+        c2 = self.pack(self.compress(C2, self.logq2), self.logq2)
+        if self.trace is not None: self.trace("c2", c2)
+        return (c1, c2)
+
+    def kem_keygen(self):
+        """Generate a public key / secret key pair"""
+        # 1. Choose uniformly random seeds d || z
+        d_z = self.randombytes(self.len_seedSE_bytes + self.len_z_bytes)
+        if self.trace is not None: self.trace("randomness", d_z)
+        d = bytes(d_z[0:self.len_seedSE_bytes])
+        z = bytes(d_z[self.len_seedSE_bytes:])
+        # 2. seedA || seedSE = SHAKE(d)
+        seedA_seedSE = self.shake(d, self.len_seedA_bytes + self.len_seedSE_bytes)
+        seedA = seedA_seedSE[0:self.len_seedA_bytes]
+        if self.trace is not None: self.trace("seedA", seedA)
+        seedSE = seedA_seedSE[self.len_seedA_bytes:]
+        # 3. r = SHAKE(0x5F || seedSE) for S^T and E
+        len_S = 4 * self.nbar * self.n
+        len_E = self.cbd_bytes(self.m * self.nbar, self.eta1)
+        r = self.shake(bytes(b'\x5f') + seedSE, len_S + len_E)
+        if self.trace is not None: self.trace("r", r)
+        # 4. S^T = SampleSecret(r, nbar, n, h1)
+        Stransposed = self.sample_secret(r[0:len_S], self.nbar, self.n, self.h1)
+        if self.trace is not None: self.trace("S^T", Stransposed)
+        S = self._matrix_transpose(Stransposed)
+        # 5. E = SampleMatrix(r, m, nbar, eta1)
+        E = self.sample_matrix(r[len_S:], self.m, self.nbar, self.eta1)
+        if self.trace is not None: self.trace("E", E)
+        # 6. B = A S + E where A = Gen(seedA)
+        B = self._matrix_add(self._gen_A_mul(seedA, S), E)
+        if self.trace is not None: self.trace("B", B)
+        # 7. pk = seedA || Pack(B), sk = (S^T, pk, pkh, z)
+        b = self.pack(B, self.logq)
+        if self.trace is not None: self.trace("b", b)
+        pk = seedA + b
+        assert len(pk) == self.len_pk_bytes
+        pkh = self.shake(pk, self.len_pkh_bytes)
+        if self.trace is not None: self.trace("pkh", pkh)
+        sk = np.asarray(Stransposed, dtype=np.int8).tobytes() + pk + pkh + z
+        assert len(sk) == self.len_sk_bytes
+        return (pk, sk)
+
+    def kem_encaps(self, pk):
+        """Encapsulate against a public key to create a ciphertext and shared secret"""
+        assert len(pk) == self.len_pk_bytes, "Incorrect public key length"
+        seedA = pk[0:self.len_seedA_bytes]
+        B = self.unpack(pk[self.len_seedA_bytes:], self.m, self.nbar, self.logq)
+        if self.trace is not None: self.trace("B", B)
+        # 1. Choose a uniformly random message mu
+        mu = self.randombytes(self.len_mu_bytes)
+        if self.trace is not None: self.trace("mu", mu)
+        # 2. seedSE || k = SHAKE(SHAKE(pk) || mu)
+        pkh = self.shake(pk, self.len_pkh_bytes)
+        if self.trace is not None: self.trace("pkh", pkh)
+        seedSE_k = self.shake(pkh + mu, self.len_seedSE_bytes + self.len_k_bytes)
+        seedSE = seedSE_k[0:self.len_seedSE_bytes]
+        if self.trace is not None: self.trace("seedSE", seedSE)
+        k = seedSE_k[self.len_seedSE_bytes:]
+        if self.trace is not None: self.trace("k", k)
+        # 3. (c1, c2) = Enc((seedA, B), mu; seedSE)
+        (c1, c2) = self.__encrypt(seedA, B, mu, seedSE)
+        # 4. ss = SHAKE(c1 || c2 || k)
+        ct = c1 + c2
+        ss = self.shake(ct + k, self.len_ss_bytes)
+        assert len(ct) == self.len_ct_bytes
+        return (ct, ss)
+
+    def kem_decaps(self, sk, ct):
+        """Decapsulate a ciphertext using a secret key to obtain a shared secret"""
+        assert len(ct) == self.len_ct_bytes, "Incorrect ciphertext length"
+        assert len(sk) == self.len_sk_bytes, "Incorrect secret key length"
+        c1 = ct[0:self.len_c1_bytes]
+        c2 = ct[self.len_c1_bytes:]
+        # Parse sk = (S^T, pk, pkh, z)
+        offset = 0; length = self.nbar * self.n
+        Stransposed = np.frombuffer(sk[offset:offset+length], dtype=np.int8).reshape(self.nbar, self.n)
+        if self.trace is not None: self.trace("S^T", Stransposed)
+        S = self._matrix_transpose(Stransposed)
+        offset += length; length = self.len_pk_bytes
+        pk = sk[offset:offset+length]
+        seedA = pk[0:self.len_seedA_bytes]
+        B = self.unpack(pk[self.len_seedA_bytes:], self.m, self.nbar, self.logq)
+        offset += length; length = self.len_pkh_bytes
+        pkh = sk[offset:offset+length]
+        offset += length; length = self.len_z_bytes
+        z = sk[offset:offset+length]
+        # 1. C1 = Decompress(Unpack(c1)), C2 = Decompress(Unpack(c2))
+        C1 = self.decompress(self.unpack(c1, self.mbar, self.n, self.logq1), self.logq1)
+        if self.trace is not None: self.trace("C1", C1)
+        C2 = self.decompress(self.unpack(c2, self.mbar, self.nbar, self.logq2), self.logq2)
+        if self.trace is not None: self.trace("C2", C2)
+        # 2. M = C2 - C1 S
+        C1S = self._matrix_mul(C1, S)
+        if self.trace is not None: self.trace("C1S", C1S)
+        M = self._matrix_sub(C2, C1S)
+        if self.trace is not None: self.trace("M", M)
+        # 3. mu' = Decode(M)
+        muprime = self.decode(M)
+        if self.trace is not None: self.trace("mu'", muprime)
+        # 4. seedSE' || k' = SHAKE(pkh || mu')
+        seedSEprime_kprime = self.shake(pkh + muprime, self.len_seedSE_bytes + self.len_k_bytes)
+        seedSEprime = seedSEprime_kprime[0:self.len_seedSE_bytes]
+        if self.trace is not None: self.trace("seedSE'", seedSEprime)
+        kprime = seedSEprime_kprime[self.len_seedSE_bytes:]
+        if self.trace is not None: self.trace("k'", kprime)
+        # 5. (c1', c2') = Enc((seedA, B), mu'; seedSE')
+        (c1prime, c2prime) = self.__encrypt(seedA, B, muprime, seedSEprime)
+        # 6. ss = SHAKE(c1 || c2 || k') if (c1', c2') = (c1, c2), else SHAKE(c1 || c2 || z)
+        selector = self.__ctverify(c1 + c2, c1prime + c2prime)
+        kbar = self.__ctselect(kprime, z, selector)
+        return self.shake(ct + kbar, self.len_ss_bytes)
@@ -0,0 +1,160 @@
+import concurrent.futures
+import sys
+import time
+import warnings
+from multiprocessing import shared_memory
+import numpy as np
+from frodokem import FrodoKEM
+
+class SharedA(object):
+    """A matrices generated once into multiprocessing.shared_memory blocks, for
+    process pools running many operations against the same public keys.
+
+    The owning process calls acquire(variant, seedA) for each seedA in use: the
+    first call generates A into a new block, later calls only count a reference.
+    release() drops a reference and unlinks the block when none remain; close()
+    (or leaving a with block) unlinks everything. Worker processes get cache(),
+    a SharedACache which can be pickled to them and set as kem.A_cache, and map
+    the blocks read-only without copying or regenerating A. Unlinking a block
+    while workers still have it mapped is safe: their mapping stays valid."""
+
+    def __init__(self):
+        self.__blocks = dict()
+
+    def acquire(self, variant, seedA):
+        """Return the spec of the shared block holding A for (variant, seedA),
+        generating A into a new block on the first reference"""
+        key = (variant, bytes(seedA))
+        if key not in self.__blocks:
+            with warnings.catch_warnings():
+                warnings.simplefilter("ignore")
+                kem = FrodoKEM(variant)
+            shm = shared_memory.SharedMemory(create = True, size = kem.n * kem.n * np.dtype(np.uint16).itemsize)
+            A = np.ndarray((kem.n, kem.n), dtype = np.uint16, buffer = shm.buf)
+            A[:] = kem.gen(bytes(seedA))
+            del A
+            spec = {'variant': variant, 'seedA': bytes(seedA), 'name': shm.name, 'shape': (kem.n, kem.n), 'dtype': 'uint16'}
+            self.__blocks[key] = [shm, 0, spec]
+        self.__blocks[key][1] += 1
+        return self.__blocks[key][2]
+
+    def release(self, variant, seedA):
+        """Drop a reference to A for (variant, seedA), unlinking its block when
+        no references remain"""
+        key = (variant, bytes(seedA))
+        self.__blocks[key][1] -= 1
+        if self.__blocks[key][1] == 0:
+            shm = self.__blocks.pop(key)[0]
+            shm.close()
+            shm.unlink()
+
+    def refcount(self, variant, seedA):
+        entry = self.__blocks.get((variant, bytes(seedA)))
+        return 0 if entry is None else entry[1]
+
+    def cache(self):
+        """A SharedACache over all blocks currently held"""
+        return SharedACache([entry[2] for entry in self.__blocks.values()])
+
+    def close(self):
+        """Unlink all blocks regardless of their reference counts"""
+        for (shm, refs, spec) in self.__blocks.values():
+            shm.close()
+            shm.unlink()
+        self.__blocks.clear()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+class SharedACache(object):
+    """Read-only A_cache (see a_cache.py) backed by the shared memory blocks of a
+    SharedA. Blocks are attached on first use and returned as read-only NumPy
+    views; A for other seeds is not cached (put is a no-op). Only the block specs
+    are pickled, so the cache can be passed to worker processes."""
+
+    def __init__(self, specs = ()):
+        self.hits = 0
+        self.misses = 0
+        self.__specs = {(spec['variant'], spec['seedA']): spec for spec in specs}
+        self.__attached = dict()
+        self.__views = dict()
+
+    def __getstate__(self):
+        return {'specs': list(self.__specs.values())}
+
+    def __setstate__(self, state):
+        self.__init__(state['specs'])
+
+    def get(self, variant, seedA):
+        """Return the shared (read-only) A for (variant, seedA), or None"""
+        key = (variant, bytes(seedA))
+        if key not in self.__views:
+            spec = self.__specs.get(key)
+            if spec is None:
+                self.misses += 1
+                return None
+            shm = shared_memory.SharedMemory(name = spec['name'])
+            A = np.ndarray(spec['shape'], dtype = spec['dtype'], buffer = shm.buf)
+            A.flags.writeable = False
+            self.__attached[key] = shm
+            self.__views[key] = A
+        self.hits += 1
+        return self.__views[key]
+
+    def put(self, variant, seedA, A):
+        pass
+
+    def close(self):
+        """Detach from all blocks. A block of which views returned by get are still
+        alive stays mapped until they are garbage collected."""
+        self.__views.clear()
+        for shm in self.__attached.values():
+            try:
+                shm.close()
+            except BufferError:
+                pass
+        self.__attached.clear()
+
+_worker_kems = dict()
+
+def init_worker(cache):
+    """ProcessPoolExecutor initializer: the FrodoKEM instances of the worker use
+    the given SharedACache"""
+    warnings.simplefilter("ignore")
+    _worker_kems.clear()
+    _worker_kems['cache'] = cache
+
+def worker_kem(variant):
+    """The FrodoKEM instance of this worker process for the variant"""
+    if variant not in _worker_kems:
+        _worker_kems[variant] = FrodoKEM(variant)
+        _worker_kems[variant].A_cache = _worker_kems.get('cache')
+    return _worker_kems[variant]
+
+def _encaps(variant, pk):
+    start = time.perf_counter()
+    worker_kem(variant).kem_encaps(pk)
+    return time.perf_counter() - start
+
+if __name__ == "__main__":
+    # Encapsulate many times against one public key in a process pool, with each
+    # worker regenerating A and with A in shared memory
+    variant = sys.argv[1] if len(sys.argv) > 1 else "FrodoKEM-1344-SHAKE"
+    workers = int(sys.argv[2]) if len(sys.argv) > 2 else 4
+    operations = int(sys.argv[3]) if len(sys.argv) > 3 else 64
+    warnings.simplefilter("ignore")
+    kem = FrodoKEM(variant)
+    (pk, sk) = kem.kem_keygen()
+    seedA = pk[0:kem.len_seedA_bytes]
+    with SharedA() as shared:
+        shared.acquire(variant, seedA)
+        for (label, cache) in [('regenerated A', None), ('shared A', shared.cache())]:
+            with concurrent.futures.ProcessPoolExecutor(max_workers = workers, initializer = init_worker, initargs = (cache,)) as executor:
+                start = time.perf_counter()
+                times = list(executor.map(_encaps, [variant] * operations, [pk] * operations))
+                elapsed = time.perf_counter() - start
+            print("{:s} {:s}: {:d} encaps on {:d} workers in {:.3f}s ({:.1f} ops/s, median {:.2f} ms)".format(
+                variant, label, operations, workers, elapsed, operations / elapsed, 1e3 * float(np.median(times))))
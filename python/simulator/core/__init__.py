@@ -8,6 +8,7 @@
 - HwModule: 硬件模块基类，所有硬件组件的基础
 - Delay: 延迟指令类，用于协程中暂停执行
 - Task: 任务包装器类，用于管理协程任务
+- Fifo: 有界FIFO，协程间传递数据并提供反压
 
 使用示例（协程版）：
     from core import Simulator, HwModule, Delay, Task
@@ -33,8 +34,9 @@
 from .event import Event
 from .simulator import Simulator, Delay, Task
 from .hw_module import HwModule
+from .fifo import Fifo
 
 __version__ = "1.0.0"
 __author__ = "PQC_DSS Project"
 
-__all__ = ["Event", "Simulator", "HwModule", "Delay", "Task"]
+__all__ = ["Event", "Simulator", "HwModule", "Delay", "Task", "Fifo"]
@@ -0,0 +1,67 @@
+# core/fifo.py
+
+from __future__ import annotations
+import collections
+from typing import Any, Optional, List
+
+from .simulator import Simulator, Task
+from .hw_module import HwModule
+
+
+class Fifo(HwModule):
+    """
+    有界FIFO，用于在协程之间传递数据并提供反压。
+
+    用法:
+        yield fifo.push(item)      # 满时阻塞，直到有空位
+        item = yield fifo.pop()    # 空时阻塞，直到有数据
+    """
+    def __init__(self, name: str, sim: Simulator, depth: int,
+                 parent: Optional[HwModule] = None):
+        super().__init__(name, sim, parent)
+        if depth < 1:
+            raise ValueError("FIFO深度必须大于等于1")
+        self.depth = depth
+        self._queue: collections.deque = collections.deque()
+        self._push_waiters: List[Task] = []
+        self._pop_waiters: List[Task] = []
+
+        self._register_stat("total_pushed", 0)
+        self._register_stat("max_occupancy", 0)
+        self._register_stat("push_stall_cycles", 0)
+        self._register_stat("pop_stall_cycles", 0)
+
+    def __len__(self) -> int:
+        return len(self._queue)
+
+    def _wait(self, waiters: List[Task]) -> Task:
+        """创建一个“挂起”任务，调用者 yield 它后会一直等待，直到被 _wake 唤醒"""
+        def _park_coro():
+            if False: yield # 只是为了让它成为一个生成器
+        waiter = Task(self.sim, _park_coro(), parent=None)
+        waiters.append(waiter)
+        return waiter
+
+    def _wake(self, waiters: List[Task]):
+        for waiter in waiters:
+            self.sim._schedule_task_now(waiter)
+        waiters.clear()
+
+    def push(self, item: Any):
+        start_time = self.sim.current_time
+        while len(self._queue) >= self.depth:
+            yield self._wait(self._push_waiters)
+        self._increment_stat("push_stall_cycles", self.sim.current_time - start_time)
+        self._queue.append(item)
+        self._increment_stat("total_pushed")
+        self.stats["max_occupancy"] = max(self.stats["max_occupancy"], len(self._queue))
+        self._wake(self._pop_waiters)
+
+    def pop(self):
+        start_time = self.sim.current_time
+        while not self._queue:
+            yield self._wait(self._pop_waiters)
+        self._increment_stat("pop_stall_cycles", self.sim.current_time - start_time)
+        item = self._queue.popleft()
+        self._wake(self._push_waiters)
+        return item
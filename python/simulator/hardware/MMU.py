@@ -1,10 +1,36 @@
 from __future__ import annotations
 from typing import List, Any, Optional, Generator
-from core import Simulator, HwModule, Delay, Task
+from core import Simulator, HwModule, Delay, Task, Fifo
 from utils.matrix_processing import create_transrow_tasks_from_matrix
 from utils.data import MatrixSlice
 import numpy as np
 
+
+def _double_lanes_finish_table(S_bits, max_rows):
+    """
+    双寄存器结构的调度表: table[k][c] 为第k个fifo弹出第c行时所在的周期(从1计),
+    table[k][0] = 0。与 Engine._caculate_latency_double_lanes 的轮转顺序一致。
+    """
+    if S_bits == 5:
+        n_fifos, step = 5, 1
+    elif S_bits == 2:
+        n_fifos, step = 4, 2
+    else:
+        raise ValueError("S_bits只能是2或5")
+    table = np.zeros((5, max_rows + 1), dtype=np.int64)
+    served = [0] * n_fifos
+    cnt = 0
+    cycle = 0
+    while min(served) < max_rows:
+        cycle += 1
+        for lane in (cnt % n_fifos, (cnt + 1) % n_fifos):
+            if served[lane] < max_rows:
+                served[lane] += 1
+                table[lane, served[lane]] = cycle
+        cnt += step
+    return table
+
+
 class Engine(HwModule):
     def __init__(self, name: str, sim: Simulator,
                     data_simulate_enable = False,
@@ -147,6 +173,56 @@ class Engine(HwModule):
         else:
             raise ValueError("n_lanes只能是1,2,5")
 
+    def _fifo_counts_batch(self,S_slices,S_bits=5):
+        #slice+fifo的向量化版本，只统计每个fifo的行数
+        #S_slices: (..., N, K)，与slice()的输入相同，返回 (..., 5)
+        if S_bits != 5 and S_bits != 2:
+            raise ValueError("S_bits只能是2或5")
+        S_slices = np.asarray(S_slices)
+        min_val = -(1 << (S_bits - 1))
+        max_val = (1 << (S_bits - 1)) - 1
+        #削峰后取S_bits位补码
+        codes = np.clip(S_slices, min_val, max_val).astype(np.int64) & ((1 << S_bits) - 1)
+        shifts = np.arange(S_bits - 1, -1, -1) #s=0是MSB
+        bits = (codes[..., None] >> shifts) & 1 #(..., N, K, S_bits)
+        if self.sparse_enable:
+            nonzero = bits.any(axis=-2) #(..., N, S_bits), 即popcount != 0
+        else:
+            nonzero = np.ones(bits.shape[:-2] + (S_bits,), dtype=bool)
+        #transrow的行号为 i*S_bits+s
+        rows = nonzero.reshape(nonzero.shape[:-2] + (-1,))
+        counts = np.zeros(rows.shape[:-1] + (5,), dtype=np.int64)
+        if S_bits == 5:
+            counts[...] = rows.reshape(rows.shape[:-1] + (-1, 5)).sum(axis=-2)
+        else:
+            #与fifo()一致，只分发前 num_rows//4*4 行
+            usable = rows.shape[-1] // 4 * 4
+            counts[..., :4] = rows[..., :usable].reshape(rows.shape[:-1] + (-1, 4)).sum(axis=-2)
+        return counts
+
+    def _caculate_latency_batch(self,S_slices,S_bits=5):
+        #_caculate_latency(fifo(slice(S_slice)))的向量化版本
+        #S_slices: (..., N, K)，返回每个S_slice的latency (...)
+        S_slices = np.asarray(S_slices)
+        if self.n_lanes == 5:
+            num_rows = S_slices.shape[-2] * S_bits
+            if S_bits == 5:
+                latency = num_rows//5
+            elif S_bits == 2:
+                latency = num_rows//4
+            else:
+                raise ValueError("S_bits只能是2或5")
+            return np.full(S_slices.shape[:-2], latency + self.slice_latency, dtype=np.int64)
+        counts = self._fifo_counts_batch(S_slices,S_bits)
+        if self.n_lanes == 1:
+            latency = counts.sum(axis=-1)
+        elif self.n_lanes == 2:
+            table = _double_lanes_finish_table(S_bits, int(counts.max(initial=0)))
+            latency = table[np.arange(5), counts].max(axis=-1)
+        else:
+            raise ValueError("n_lanes只能是1,2,5")
+        return latency + self.slice_latency + self.buffer_latency
+
     # def _caculate(self,fifo_list,weights_matrix,S_bits=5):
     #     #目前默认计算正确，保留原有代码
     #     if self.n_PEs != weights_matrix.shape[0]:
@@ -304,6 +380,7 @@ class MMU(HwModule):
         self.n_lanes = n_lanes
         self.slice_latency = slice_latency
         self.buffer_latency = buffer_latency
+        self.data_simulate_enable = data_simulate_enable
         self.engines = []
         for i in range(n_engines):
             self.engines.append(Engine(name=f"engine_{i}", sim=sim, data_simulate_enable=data_simulate_enable, n_PEs=n_PEs, n_lanes=n_lanes, slice_latency=slice_latency, buffer_latency=buffer_latency,sparse_enable=sparse_enable,parent=self))
@@ -444,6 +521,397 @@ class MMU(HwModule):
         self._set_idle()
         return result_matrix, max_latency
 
+    def _partition(self, n):
+        #与execute_left/execute_right相同的分组方式，返回每个engine的(start,end)
+        base_n_per_engine = n // self.n_engines
+        remainder = n % self.n_engines
+        bounds = []
+        start_idx = 0
+        for i in range(self.n_engines):
+            n_per_engine = base_n_per_engine + (1 if i < remainder else 0)
+            bounds.append((start_idx, start_idx + n_per_engine))
+            start_idx += n_per_engine
+        return bounds
+
+    def _engine_latencies_left(self, S_matrices, S_bits=5):
+        #左乘时每个engine的latency，S_matrices: (B, n, nbar)，返回 (B, n_engines)
+        batch_size, n, nbar = S_matrices.shape
+        engine_latencies = np.zeros((batch_size, self.n_engines), dtype=np.int64)
+        for i, (start_idx, end_idx) in enumerate(self._partition(n)):
+            S_part = S_matrices[:, start_idx:end_idx, :]  # B * n' * nbar
+            n_per_engine = end_idx - start_idx
+            if n_per_engine % 4 != 0:
+                padding_size = 4 - (n_per_engine % 4)
+                S_part = np.pad(S_part, ((0, 0), (0, padding_size), (0, 0)), mode='constant', constant_values=0)
+            # 每4行S为一个S_slice，转置后为 nbar * 4
+            n_bands = S_part.shape[1] // 4
+            S_slices = S_part.reshape(batch_size, n_bands, 4, nbar).transpose(0, 1, 3, 2)
+            engine_latencies[:, i] = self.engines[i]._caculate_latency_batch(S_slices, S_bits).sum(axis=-1)
+        return engine_latencies
+
+    def _engine_latencies_right(self, S_matrices, n, S_bits=5):
+        #右乘时每个engine的latency，S_matrices: (B, mbar, n_PEs)，n为A的列数，返回 (B, n_engines)
+        batch_size = S_matrices.shape[0]
+        slice_latencies = self.engines[0]._caculate_latency_batch(S_matrices, S_bits)
+        engine_latencies = np.zeros((batch_size, self.n_engines), dtype=np.int64)
+        for i, (start_idx, end_idx) in enumerate(self._partition(n)):
+            # S由所有engine共用，每4列A都要重新处理一遍同一个S
+            n_bands = (end_idx - start_idx + 3) // 4
+            engine_latencies[:, i] = slice_latencies * n_bands
+        return engine_latencies
+
+    def execute_left_batch(self, S_matrices, A_matrices, S_bits=5):
+        """
+        execute_left 的批量版本: B 组独立的 (S, A) 背靠背执行。
+
+        参数:
+            S_matrices: (B, n, nbar) 的S堆叠
+            A_matrices: (B, n_PEs, n) 的A堆叠
+
+        返回:
+            (result_matrices, latencies)
+            result_matrices: data_simulate_enable 时为 (B, n_PEs, nbar)，否则为 None
+            latencies: (B,) 每组的latency，与逐个调用 execute_left 的结果一致
+        """
+        S_matrices = np.asarray(S_matrices)
+        A_matrices = np.asarray(A_matrices)
+        if S_matrices.ndim != 3 or A_matrices.ndim != 3:
+            raise ValueError("S_matrices和A_matrices必须是三维的(B,...)")
+        if S_matrices.shape[0] != A_matrices.shape[0]:
+            raise ValueError("S_matrices与A_matrices的batch大小不一致")
+        if S_matrices.shape[1] != A_matrices.shape[2]:
+            raise ValueError("S_matrix行数不等于A_matrix列数")
+        if A_matrices.shape[1] != self.n_PEs:
+            raise ValueError("A_matrix行数不是n_PEs")
+        if S_bits != 5 and S_bits != 2:
+            raise ValueError("S_bits只能是2或5")
+        if self.busy:
+            raise ValueError("MMU正在繁忙")
+        self._set_busy()
+
+        engine_latencies = self._engine_latencies_left(S_matrices, S_bits)
+        for i in range(self.n_engines):
+            self.engines[i]._increment_stat("total_latency_calculated", int(engine_latencies[:, i].sum()))
+
+        latencies = engine_latencies.max(axis=1)
+        result_matrices = np.matmul(A_matrices, S_matrices) if self.data_simulate_enable else None
+
+        yield self.sim.delay(int(latencies.sum()))
+        self._set_idle()
+        return result_matrices, latencies
+
+    def execute_right_batch(self, S_matrices, A_matrices, S_bits=5):
+        """
+        execute_right 的批量版本: B 组独立的 (S, A) 背靠背执行。
+
+        参数:
+            S_matrices: (B, mbar, n_PEs) 的S堆叠
+            A_matrices: (B, n_PEs, n) 的A堆叠
+
+        返回:
+            (result_matrices, latencies)
+            result_matrices: data_simulate_enable 时为 (B, mbar, n)，否则为 None
+            latencies: (B,) 每组的latency，与逐个调用 execute_right 的结果一致
+        """
+        S_matrices = np.asarray(S_matrices)
+        A_matrices = np.asarray(A_matrices)
+        if S_matrices.ndim != 3 or A_matrices.ndim != 3:
+            raise ValueError("S_matrices和A_matrices必须是三维的(B,...)")
+        if S_matrices.shape[0] != A_matrices.shape[0]:
+            raise ValueError("S_matrices与A_matrices的batch大小不一致")
+        if S_matrices.shape[2] != A_matrices.shape[1]:
+            raise ValueError("S_matrix列数不等于A_matrix行数")
+        if A_matrices.shape[1] != self.n_PEs:
+            raise ValueError("A_matrix行数不是n_PEs")
+        if S_bits != 5 and S_bits != 2:
+            raise ValueError("S_bits只能是2或5")
+        if self.busy:
+            raise ValueError("MMU正在繁忙")
+        self._set_busy()
+
+        engine_latencies = self._engine_latencies_right(S_matrices, A_matrices.shape[2], S_bits)
+        for i in range(self.n_engines):
+            self.engines[i]._increment_stat("total_latency_calculated", int(engine_latencies[:, i].sum()))
+
+        latencies = engine_latencies.max(axis=1)
+        result_matrices = np.matmul(S_matrices, A_matrices) if self.data_simulate_enable else None
+
+        yield self.sim.delay(int(latencies.sum()))
+        self._set_idle()
+        return result_matrices, latencies
+
+    def _schedule_bands(self, band_latencies, window=2, writeback_latency=0):
+        """
+        将矩阵乘指令(每条完成n_PEs行A)按顺序流水发射到各engine。
+
+        每个engine按顺序执行各条指令，执行完当前指令即可开始下一条，不等待其他engine；
+        但同时在飞的指令数不超过 window(A的行缓冲个数)，第b条指令要等第b-window条写回后才能发射。
+
+        参数:
+            band_latencies: (n_bands, n_engines)，第b条指令在第e个engine上的latency
+            window: 在飞指令数上限，1即相邻指令之间不重叠
+            writeback_latency: 一条指令所有engine完成后，加法树与结果写回所需的周期
+
+        返回:
+            (band_done, engine_busy): 每条指令的完成时刻 (n_bands,)，每个engine的忙碌周期 (n_engines,)
+        """
+        if window < 1:
+            raise ValueError("window必须大于等于1")
+        n_bands = band_latencies.shape[0]
+        engine_free = np.zeros(self.n_engines, dtype=np.int64)
+        band_done = np.zeros(n_bands, dtype=np.int64)
+        for b in range(n_bands):
+            issue_time = band_done[b - window] if b >= window else 0
+            engine_free = np.maximum(engine_free, issue_time) + band_latencies[b]
+            band_done[b] = engine_free.max() + writeback_latency
+        return band_done, band_latencies.sum(axis=0)
+
+    def _band_latencies_left(self, S_matrix, m, S_bits=5):
+        #A*S(A为m行)每条指令在每个engine上的latency (n_bands, n_engines)
+        #左乘时所有指令共用同一个S，每个engine在每条指令上的latency相同
+        n_bands = -(-m // self.n_PEs)
+        engine_latencies = self._engine_latencies_left(S_matrix[None], S_bits)[0]
+        return np.tile(engine_latencies, (n_bands, 1))
+
+    def _band_latencies_right(self, S_matrix, n, S_bits=5):
+        #S'*A(A为n列)每条指令在每个engine上的latency (n_bands, n_engines)
+        m = S_matrix.shape[1]
+        n_bands = -(-m // self.n_PEs)
+        S_padded = S_matrix
+        if m % self.n_PEs != 0:
+            S_padded = np.pad(S_matrix, ((0, 0), (0, n_bands * self.n_PEs - m)), mode='constant', constant_values=0)
+        # 第b条指令使用S'的第b组n_PEs列: (n_bands, mbar, n_PEs)
+        S_bands = S_padded.reshape(S_matrix.shape[0], n_bands, self.n_PEs).transpose(1, 0, 2)
+        return self._engine_latencies_right(S_bands, n, S_bits)
+
+    def _full_matmul_report(self, band_latencies, window, writeback_latency):
+        #调度全部指令，更新统计，返回报告
+        band_done, engine_busy = self._schedule_bands(band_latencies, window, writeback_latency)
+        total_cycles = int(band_done[-1])
+        n_bands = band_latencies.shape[0]
+        for i in range(self.n_engines):
+            self.engines[i]._increment_stat("total_latency_calculated", int(engine_busy[i]))
+        self._increment_stat("total_instructions", n_bands)
+        utilization = engine_busy / total_cycles if total_cycles > 0 else np.zeros(self.n_engines)
+        return {
+            'n_instructions': n_bands,
+            'total_cycles': total_cycles,
+            'cycles_per_instruction': total_cycles / n_bands,
+            # 不重叠时的周期数，即逐条调用 execute_left/execute_right 的总和
+            'serial_cycles': int(band_latencies.max(axis=1).sum()) + n_bands * writeback_latency,
+            'engine_busy_cycles': engine_busy.tolist(),
+            'engine_utilization': utilization.tolist(),
+            'mean_utilization': float(np.mean(utilization)),
+            'band_done': band_done,
+        }
+
+    def execute_full_left(self, S_matrix, A_matrix, S_bits=5, window=2, writeback_latency=0):
+        """
+        完整的左乘 A*S: A为 m*n，S为 n*nbar。
+        A按n_PEs行切分为 m/n_PEs 条矩阵乘指令，每条指令等价于一次 execute_left，
+        各指令在engine间流水执行(见 _schedule_bands)。
+
+        返回:
+            (result_matrix, report)
+            result_matrix: data_simulate_enable 时为 m*nbar，否则为 None
+            report: 总周期数、每个engine的忙碌周期与利用率等
+        """
+        S_matrix = np.asarray(S_matrix)
+        A_matrix = np.asarray(A_matrix)
+        if S_matrix.shape[0] != A_matrix.shape[1]:
+            raise ValueError("S_matrix行数不等于A_matrix列数")
+        if A_matrix.shape[0] == 0:
+            raise ValueError("A_matrix行数不能为0")
+        if S_bits != 5 and S_bits != 2:
+            raise ValueError("S_bits只能是2或5")
+        if self.busy:
+            raise ValueError("MMU正在繁忙")
+        self._set_busy()
+
+        band_latencies = self._band_latencies_left(S_matrix, A_matrix.shape[0], S_bits)
+        report = self._full_matmul_report(band_latencies, window, writeback_latency)
+
+        result_matrix = np.matmul(A_matrix, S_matrix) if self.data_simulate_enable else None
+
+        yield self.sim.delay(report['total_cycles'])
+        self._set_idle()
+        return result_matrix, report
+
+    def execute_full_right(self, S_matrix, A_matrix, S_bits=5, window=2, writeback_latency=0):
+        """
+        完整的右乘 S'*A: S'为 mbar*m，A为 m*n。
+        A按n_PEs行切分为 m/n_PEs 条矩阵乘指令，第b条指令为 S'[:, b*n_PEs:(b+1)*n_PEs] 乘 A的对应行，
+        等价于一次 execute_right，各指令在engine间流水执行(见 _schedule_bands)。
+
+        返回:
+            (result_matrix, report)
+            result_matrix: data_simulate_enable 时为 mbar*n，否则为 None
+            report: 总周期数、每个engine的忙碌周期与利用率等
+        """
+        S_matrix = np.asarray(S_matrix)
+        A_matrix = np.asarray(A_matrix)
+        if S_matrix.shape[1] != A_matrix.shape[0]:
+            raise ValueError("S_matrix列数不等于A_matrix行数")
+        if A_matrix.shape[0] == 0:
+            raise ValueError("A_matrix行数不能为0")
+        if S_bits != 5 and S_bits != 2:
+            raise ValueError("S_bits只能是2或5")
+        if self.busy:
+            raise ValueError("MMU正在繁忙")
+        self._set_busy()
+
+        band_latencies = self._band_latencies_right(S_matrix, A_matrix.shape[1], S_bits)
+        report = self._full_matmul_report(band_latencies, window, writeback_latency)
+
+        result_matrix = np.matmul(S_matrix, A_matrix) if self.data_simulate_enable else None
+
+        yield self.sim.delay(report['total_cycles'])
+        self._set_idle()
+        return result_matrix, report
+
+    def _execute_stream(self, band_latencies, a_stream, n_rows, window, writeback_latency):
+        """
+        A逐行从 a_stream 到达时的指令流水。
+        装载单元每凑齐n_PEs行即发射一条指令(占用一个A行缓冲，共window个)，
+        各engine按顺序执行，指令写回后释放缓冲。
+
+        返回:
+            (rows, band_done, engine_stall): 收到的A行列表，每条指令的完成时刻，每个engine等待指令的周期
+        """
+        if window < 1:
+            raise ValueError("window必须大于等于1")
+        n_bands = band_latencies.shape[0]
+        slots = Fifo(f"{self.name}_a_slots", self.sim, window)
+        engine_queues = [Fifo(f"{engine.name}_queue", self.sim, window) for engine in self.engines]
+        remaining = [self.n_engines] * n_bands
+        band_done = np.zeros(n_bands, dtype=np.int64)
+        rows = []
+
+        def writeback(b):
+            yield self.sim.delay(writeback_latency)
+            band_done[b] = self.sim.current_time
+            yield slots.push(b)
+
+        def loader():
+            for b in range(n_bands):
+                # 第b条指令需等第b-window条写回后才有空闲的A行缓冲
+                if b >= window:
+                    yield slots.pop()
+                for _ in range(min(self.n_PEs, n_rows - b * self.n_PEs)):
+                    row = yield a_stream.pop()
+                    rows.append(row)
+                for queue in engine_queues:
+                    yield queue.push(b)
+
+        def worker(e):
+            engine = self.engines[e]
+            for _ in range(n_bands):
+                b = yield engine_queues[e].pop()
+                engine._set_busy()
+                yield self.sim.delay(int(band_latencies[b, e]))
+                engine._set_idle()
+                engine._increment_stat("total_latency_calculated", int(band_latencies[b, e]))
+                remaining[b] -= 1
+                if remaining[b] == 0:
+                    self.sim.spawn(writeback(b))
+
+        tasks = [self.sim.spawn(loader())]
+        tasks += [self.sim.spawn(worker(e)) for e in range(self.n_engines)]
+        yield tasks
+        # 等待最后(至多window条)在飞指令写回
+        for _ in range(min(window, n_bands)):
+            yield slots.pop()
+        self._increment_stat("total_instructions", n_bands)
+        engine_stall = [queue.stats["pop_stall_cycles"] for queue in engine_queues]
+        return rows, band_done, engine_stall
+
+    def _stream_report(self, band_latencies, band_done, engine_stall, a_stream, start_time, window, writeback_latency):
+        total_cycles = int(band_done[-1]) - start_time
+        mmu_done, engine_busy = self._schedule_bands(band_latencies, window, writeback_latency)
+        return {
+            'n_instructions': band_latencies.shape[0],
+            'total_cycles': total_cycles,
+            # A已全部就绪时MMU自身所需的周期数
+            'mmu_cycles': int(mmu_done[-1]),
+            'engine_busy_cycles': engine_busy.tolist(),
+            'engine_stall_cycles': engine_stall,
+            'engine_utilization': (engine_busy / total_cycles).tolist(),
+            'stream_max_occupancy': a_stream.stats["max_occupancy"],
+            # SHAKE因stream满而停顿的周期 / MMU等待A行的周期
+            'producer_stall_cycles': a_stream.stats["push_stall_cycles"],
+            'consumer_stall_cycles': a_stream.stats["pop_stall_cycles"],
+            'band_done': band_done - start_time,
+        }
+
+    def _rows_to_matrix(self, rows, n_cols):
+        #数据仿真时将收到的A行拼成矩阵，SHAKE输出的字节按16位小端解析
+        #stream 不携带数据时(如 SHAKE 未开启数据仿真，行为占位的标量)直接报错，避免得到错误的结果
+        matrix = []
+        for i, row in enumerate(rows):
+            if isinstance(row, (bytes, bytearray)):
+                row = np.frombuffer(row, dtype='<u2')
+            row = np.asarray(row)
+            if row.shape != (n_cols,):
+                raise ValueError(f"a_stream第{i}行不是长度为{n_cols}的数据(形状{row.shape})，"
+                                 "stream不携带数据时需关闭MMU的data_simulate_enable")
+            matrix.append(row)
+        return np.stack(matrix).astype(np.int64)
+
+    def execute_full_left_stream(self, S_matrix, a_stream, n_rows, S_bits=5, window=2, writeback_latency=0):
+        """
+        与 execute_full_left 相同的 A*S，但A的 n_rows 行依次从 a_stream (Fifo) 中到达，
+        例如由 SHAKE.execute_stream 逐行生成。
+
+        返回:
+            (result_matrix, report)
+            report 在 execute_full_left 的基础上给出 mmu_cycles(A已就绪时的周期数)
+            以及 stream 两端的停顿周期，用于判断是哈希受限还是MMU受限
+        """
+        S_matrix = np.asarray(S_matrix)
+        if S_bits != 5 and S_bits != 2:
+            raise ValueError("S_bits只能是2或5")
+        if n_rows == 0:
+            raise ValueError("n_rows不能为0")
+        if self.busy:
+            raise ValueError("MMU正在繁忙")
+        self._set_busy()
+        start_time = self.sim.current_time
+
+        band_latencies = self._band_latencies_left(S_matrix, n_rows, S_bits)
+        rows, band_done, engine_stall = yield self._execute_stream(band_latencies, a_stream, n_rows, window, writeback_latency)
+        report = self._stream_report(band_latencies, band_done, engine_stall, a_stream, start_time, window, writeback_latency)
+
+        self._set_idle()
+        result_matrix = None
+        if self.data_simulate_enable:
+            result_matrix = np.matmul(self._rows_to_matrix(rows, S_matrix.shape[0]), S_matrix)
+        return result_matrix, report
+
+    def execute_full_right_stream(self, S_matrix, a_stream, n_cols, S_bits=5, window=2, writeback_latency=0):
+        """
+        与 execute_full_right 相同的 S'*A，但A的 S'.shape[1] 行依次从 a_stream (Fifo) 中到达，
+        n_cols 为A的列数。返回值同 execute_full_left_stream。
+        """
+        S_matrix = np.asarray(S_matrix)
+        if S_bits != 5 and S_bits != 2:
+            raise ValueError("S_bits只能是2或5")
+        if S_matrix.shape[1] == 0:
+            raise ValueError("S_matrix列数不能为0")
+        if self.busy:
+            raise ValueError("MMU正在繁忙")
+        self._set_busy()
+        start_time = self.sim.current_time
+
+        band_latencies = self._band_latencies_right(S_matrix, n_cols, S_bits)
+        rows, band_done, engine_stall = yield self._execute_stream(band_latencies, a_stream, S_matrix.shape[1], window, writeback_latency)
+        report = self._stream_report(band_latencies, band_done, engine_stall, a_stream, start_time, window, writeback_latency)
+
+        self._set_idle()
+        result_matrix = None
+        if self.data_simulate_enable:
+            result_matrix = np.matmul(S_matrix, self._rows_to_matrix(rows, n_cols))
+        return result_matrix, report
+
     # def configure(self, config: dict):
     #     """
     #     通过字典配置MMU及其内部所有engine的参数。
@@ -13,13 +13,14 @@ class SHAKE(HwModule):
                  data_simulate_enable: bool = False,
                  input_width: int = 64,
                  output_width: int = 64,
+                 shake: str = "SHAKE-256",
                  parent: Optional[HwModule] = None):
         super().__init__(name, sim, parent)
         
         self.keccak_latency = keccak_latency
         self.padding_latency = padding_latency
         self.data_simulate_enable = data_simulate_enable
-        self.shake = "SHAKE-256"
+        self.shake = shake
         self.input_width = input_width//8 #输入宽度，单位为字节
         self.output_width = output_width//8 #输出宽度，单位为字节
 
@@ -51,32 +52,27 @@ class SHAKE(HwModule):
             raise ValueError("shake只能是SHAKE-128或SHAKE-256")
 
     #只关心keccak的latency，输入输出的latency不在这里反映
+    #不足64位的最后一个字在填充阶段补齐，因此输入长度不要求是8字节的倍数
     def _shake128_absorb_latency(self,data):
-        len = len(data)
-        if len % 8 != 0:
-            raise ValueError("data长度不是8的倍数")
-        len = len * 8
-        if len < 1344:
+        data_len = len(data) * 8
+        if data_len < 1344:
             return  self.padding_latency + self.keccak_latency #填充需要3个周期
         else:
-            round = len//1344
+            round = data_len//1344
             latency = round * self.keccak_latency
-            rest = len % 1344
+            rest = data_len % 1344
             if rest != 0:
                 latency += self.keccak_latency + self.padding_latency
             return latency
     
     def _shake256_absorb_latency(self,data):
-        len = len(data)
-        if len % 8 != 0:
-            raise ValueError("data长度不是8的倍数")
-        len = len * 8
-        if len < 1088:
+        data_len = len(data) * 8
+        if data_len < 1088:
             return self.padding_latency + self.keccak_latency #填充需要3个周期
         else:
-            round = len//1088
+            round = data_len//1088
             latency = round * self.keccak_latency
-            rest = len % 1088
+            rest = data_len % 1088
             if rest != 0:
                 latency += self.keccak_latency + self.padding_latency
             return latency
@@ -129,11 +125,34 @@ class SHAKE(HwModule):
             result = self._shake(data,output_len)
         else:
             result = 0
+        self._increment_stat("total_latency_calculated", latency)
         yield self.sim.delay(latency)
         self._set_idle()
 
         return result,latency
 
+    def execute_stream(self,inputs,output_len,stream):
+        """
+        依次对 inputs 中的每个输入计算 SHAKE，每个输出在其最后一个挤压块完成时压入 stream。
+        stream 满时SHAKE停顿(反压)，直到下游取走数据。
+        例如Frodo生成A: inputs 为每行的 i||seedA，output_len 为 2n 字节，每个输出即A的一行。
+
+        返回:
+            int: 哈希计算本身的总周期数(不含反压停顿)
+        """
+        if self.busy:
+            raise ValueError("SHAKE正在繁忙")
+        self._set_busy()
+        total_latency = 0
+        for data in inputs:
+            latency = self._shake_latency(data,output_len)
+            yield self.sim.delay(latency)
+            total_latency += latency
+            self._increment_stat("total_latency_calculated", latency)
+            yield stream.push(self._shake(data,output_len))
+        self._set_idle()
+        return total_latency
+
         
 
 
@@ -0,0 +1,168 @@
+from __future__ import annotations
+from typing import List, Any, Optional, Callable
+from core import Simulator, HwModule, Fifo
+from hardware.SHAKE import SHAKE
+import numpy as np
+
+
+class ShakeRequest:
+    """
+    一次SHAKE请求，记录到达时刻以便统计排队延迟。
+    """
+    def __init__(self, data, output_len, shake, priority, requester, arrival_time, response):
+        self.data = data
+        self.output_len = output_len
+        self.shake = shake
+        self.priority = priority
+        self.requester = requester
+        self.arrival_time = arrival_time
+        self.response = response
+
+
+# --- 仲裁策略: policy(pending, pool) -> 被选中请求在 pending 中的下标 ---
+
+def arbitrate_fifo(pending, pool):
+    """先到先服务"""
+    return 0
+
+def arbitrate_priority(pending, pool):
+    """priority 值越小越优先，相同时先到先服务"""
+    return min(range(len(pending)), key=lambda i: pending[i].priority)
+
+def arbitrate_shortest(pending, pool):
+    """最短作业优先(按 keccak latency 估计)"""
+    return min(range(len(pending)), key=lambda i: pool._request_latency(pending[i]))
+
+def arbitrate_round_robin(pending, pool):
+    """在不同 requester 之间轮转，同一 requester 内先到先服务"""
+    requesters = sorted(set(req.requester for req in pending), key=str)
+    last = pool._last_requester
+    if last is not None:
+        later = [r for r in requesters if str(r) > str(last)]
+        if later:
+            requesters = later
+    target = requesters[0]
+    return next(i for i, req in enumerate(pending) if req.requester == target)
+
+
+ARBITRATION_POLICIES = {
+    "fifo": arbitrate_fifo,
+    "priority": arbitrate_priority,
+    "shortest": arbitrate_shortest,
+    "round_robin": arbitrate_round_robin,
+}
+
+
+class SHAKEPool(HwModule):
+    """
+    N个Keccak核组成的SHAKE池，请求先进入队列，由仲裁策略分配给空闲的核。
+
+    用法:
+        result, latency, queue_delay = yield pool.execute(data, output_len, shake="SHAKE-128")
+    """
+    def __init__(self, name: str, sim: Simulator,
+                 n_cores: int = 2,
+                 arbitration: str | Callable = "fifo",
+                 keccak_latency: int = 24,
+                 padding_latency: int = 3,
+                 data_simulate_enable: bool = False,
+                 input_width: int = 64,
+                 output_width: int = 64,
+                 parent: Optional[HwModule] = None):
+        super().__init__(name, sim, parent)
+        if n_cores < 1:
+            raise ValueError("n_cores必须大于等于1")
+        if callable(arbitration):
+            self.arbitration = arbitration
+        elif arbitration in ARBITRATION_POLICIES:
+            self.arbitration = ARBITRATION_POLICIES[arbitration]
+        else:
+            raise ValueError(f"arbitration只能是{list(ARBITRATION_POLICIES.keys())}或一个可调用对象")
+
+        self.n_cores = n_cores
+        self.cores: List[SHAKE] = []
+        for i in range(n_cores):
+            self.cores.append(SHAKE(name=f"core_{i}", sim=sim, keccak_latency=keccak_latency,
+                                    padding_latency=padding_latency, data_simulate_enable=data_simulate_enable,
+                                    input_width=input_width, output_width=output_width, parent=self))
+        self._pending: List[ShakeRequest] = []
+        self._idle_cores: List[SHAKE] = list(self.cores)
+        self._last_requester = None
+        self._queue_delays: List[int] = []
+        self._first_arrival = None
+        self._last_completion = 0
+
+        self._register_stat("total_requests", 0)
+        self._register_stat("total_input_bytes", 0)
+        self._register_stat("total_output_bytes", 0)
+        self._register_stat("total_queue_delay", 0)
+        self._register_stat("max_queue_length", 0)
+
+    def execute(self, data, output_len, shake="SHAKE-128", priority=0, requester=None):
+        """
+        提交一次SHAKE请求，等待其完成。
+
+        返回:
+            (result, latency, queue_delay): 哈希结果、keccak计算周期、在队列中等待的周期
+        """
+        if shake != "SHAKE-128" and shake != "SHAKE-256":
+            raise ValueError("shake只能是SHAKE-128或SHAKE-256")
+        response = Fifo(f"{self.name}_response", self.sim, 1)
+        request = ShakeRequest(data, output_len, shake, priority, requester, self.sim.current_time, response)
+        if self._first_arrival is None:
+            self._first_arrival = self.sim.current_time
+        self._pending.append(request)
+        self.stats["max_queue_length"] = max(self.stats["max_queue_length"], len(self._pending))
+        self._dispatch()
+        result = yield response.pop()
+        return result
+
+    def _request_latency(self, request):
+        core = self.cores[0]
+        if request.shake == "SHAKE-128":
+            return core._shake128_absorb_latency(request.data) + core._shake128_squeeze_latency(request.output_len)
+        return core._shake256_absorb_latency(request.data) + core._shake256_squeeze_latency(request.output_len)
+
+    def _dispatch(self):
+        while self._idle_cores and self._pending:
+            index = self.arbitration(self._pending, self)
+            request = self._pending.pop(index)
+            core = self._idle_cores.pop(0)
+            self._last_requester = request.requester
+            self.sim.spawn(self._serve(core, request))
+
+    def _serve(self, core, request):
+        queue_delay = self.sim.current_time - request.arrival_time
+        core.shake = request.shake
+        result, latency = yield core.execute(request.data, request.output_len)
+        self._queue_delays.append(queue_delay)
+        self._increment_stat("total_requests")
+        self._increment_stat("total_input_bytes", len(request.data))
+        self._increment_stat("total_output_bytes", request.output_len)
+        self._increment_stat("total_queue_delay", queue_delay)
+        self._last_completion = self.sim.current_time
+        self._idle_cores.append(core)
+        self._dispatch()
+        yield request.response.push((result, latency, queue_delay))
+
+    def report(self):
+        """
+        返回池的吞吐统计: 每个核的利用率、排队延迟、总的字节/周期。
+        统计区间为第一个请求到达至最后一个请求完成。
+        """
+        if self._first_arrival is None:
+            elapsed = 0
+        else:
+            elapsed = self._last_completion - self._first_arrival
+        busy = np.array([core.stats["total_latency_calculated"] for core in self.cores])
+        queue_delays = np.array(self._queue_delays) if self._queue_delays else np.zeros(1)
+        return {
+            'n_cores': self.n_cores,
+            'elapsed_cycles': elapsed,
+            'core_busy_cycles': busy.tolist(),
+            'core_utilization': (busy / elapsed).tolist() if elapsed > 0 else [0.0] * self.n_cores,
+            'mean_queue_delay': float(np.mean(queue_delays)),
+            'max_queue_delay': int(np.max(queue_delays)),
+            'output_bytes_per_cycle': self.stats["total_output_bytes"] / elapsed if elapsed > 0 else 0.0,
+            'input_bytes_per_cycle': self.stats["total_input_bytes"] / elapsed if elapsed > 0 else 0.0,
+        }
@@ -84,7 +84,38 @@ def get_distribution(mode,n_PEs):
     return dis,n,mbar,nbar,S_bits,hash_latency
 
 
-def Sparse_evaluation(mode,batch_size,multiply_type,config):
+def run_sparse_batch(sim, mmu, dis, n, mbar, nbar, n_PEs, S_bits, batch_size, multiply_type, workload=None):
+    """
+    一次性生成 batch_size 组 S/A，并通过 MMU 的批量接口得到每组的 latency。
+    给定 workload (utils.workload.KEMWorkload) 时，S 取自 KEM 采样器生成的真实矩阵
+    (左乘用 kind='S'，右乘用 kind="S'" 的列块)，否则按分布 dis 随机生成。
+
+    返回:
+        np.ndarray: (batch_size,) 的 latency 数组
+    """
+    if multiply_type == "left":
+        if workload is not None:
+            S_matrices = workload.blocks(batch_size, (n, nbar)).astype(int)
+        else:
+            S_matrices = ProbabilityDistribution(dis).generate_matrix(shape=(batch_size, n, nbar))
+        A = np.random.randint(-7, 8, size=(batch_size, n_PEs, n))
+        task = sim.spawn(mmu.execute_left_batch, S_matrices, A, S_bits)
+    elif multiply_type == "right":
+        if workload is not None:
+            S_matrices = workload.blocks(batch_size, (mbar, n_PEs)).astype(int)
+        else:
+            S_matrices = ProbabilityDistribution(dis).generate_matrix(shape=(batch_size, mbar, n_PEs))
+        A = np.random.randint(-7, 8, size=(batch_size, n_PEs, n))
+        task = sim.spawn(mmu.execute_right_batch, S_matrices, A, S_bits)
+    else:
+        raise ValueError("multiply_type只能是left,right")
+    sim.run(print_progress=False)
+    _, latency_array = task.result
+    return latency_array
+
+
+def Sparse_evaluation(mode,batch_size,multiply_type,config,workload=None):
+    #workload: 可选的 KEMWorkload，稀疏评估时用真实采样的 S/S' 代替按 dis 生成的矩阵
     #不使用稀疏
     sim = Simulator()
     #mmu = MMU("mmu",sim,**config)
@@ -138,35 +169,15 @@ def Sparse_evaluation(mode,batch_size,multiply_type,config):
         latency_array = np.array([ref_latency])
         return stats, latency_array
 
-    latency_list = []
-    for i in range(batch_size):
-        sim.reset()
-        #mmu = MMU("mmu",sim,**config)
-        config['sparse_enable'] = True
-        mmu = MMU("mmu",sim,**config)
-        if multiply_type == "left": 
-            S_matrix = ProbabilityDistribution(dis).generate_matrix(shape=(n,nbar))
-            A = np.random.randint(-7, 8, size=(n_PEs,n))
-            task = sim.spawn(mmu.execute_left, S_matrix, A, S_bits)
-            sim.run(print_progress=False)
-            _, latency = task.result
-        elif multiply_type == "right":
-            S_matrix = ProbabilityDistribution(dis).generate_matrix(shape=(mbar,n_PEs))
-            A = np.random.randint(-7, 8, size=(4,n))
-            task = sim.spawn(mmu.execute_right, S_matrix, A, S_bits)
-            sim.run(print_progress=False)
-            _, latency = task.result
-        else:
-            raise ValueError("multiply_type只能是left,right")
-        latency_list.append(latency)
-    
-    # 转换为numpy数组便于统计
-    latency_array = np.array(latency_list)
+    sim.reset()
+    config['sparse_enable'] = True
+    mmu = MMU("mmu",sim,**config)
+    latency_array = run_sparse_batch(sim, mmu, dis, n, mbar, nbar, n_PEs, S_bits, batch_size, multiply_type, workload)
     
     # 基本统计量
     stats = {
         'mode': mode,
-        'count': len(latency_list),
+        'count': len(latency_array),
         'mean': np.mean(latency_array),
         'median': np.median(latency_array),
         'std': np.std(latency_array),
@@ -261,29 +272,9 @@ def plot_latency_histogram(mode, batch_size, config, multiply_type="left"):
     n_PEs = config['n_PEs']
     dis, n, mbar, nbar, S_bits, hash_latency = get_distribution(mode, n_PEs)
     
-    latency_list = []
-    for i in range(batch_size):
-        sim.reset()
-        config['sparse_enable'] = True
-        mmu = MMU("mmu", sim, **config)
-        if multiply_type == "left":
-            S_matrix = ProbabilityDistribution(dis).generate_matrix(shape=(n, nbar))
-            A = np.random.randint(-7, 8, size=(n_PEs, n))
-            task = sim.spawn(mmu.execute_left, S_matrix, A, S_bits)
-            sim.run(print_progress=False)
-            _, latency = task.result
-        elif multiply_type == "right":
-            S_matrix = ProbabilityDistribution(dis).generate_matrix(shape=(mbar, n_PEs))
-            A = np.random.randint(-7, 8, size=(n_PEs, n))
-            task = sim.spawn(mmu.execute_right, S_matrix, A, S_bits)
-            sim.run(print_progress=False)
-            _, latency = task.result
-        else:
-            raise ValueError("multiply_type只能是left,right")
-        latency_list.append(latency)
-    
-    # 转换为numpy数组
-    latency_array = np.array(latency_list)
+    config['sparse_enable'] = True
+    mmu = MMU("mmu", sim, **config)
+    latency_array = run_sparse_batch(sim, mmu, dis, n, mbar, nbar, n_PEs, S_bits, batch_size, multiply_type)
     
     # 计算合适的bins数量（基于数据范围和样本数）
     latency_min = int(np.min(latency_array))
@@ -337,7 +328,7 @@ def plot_latency_histogram(mode, batch_size, config, multiply_type="left"):
     # 构建统计信息
     stats = {
         'mode': mode,
-        'count': len(latency_list),
+        'count': len(latency_array),
         'mean': mean_latency,
         'median': median_latency,
         'std': std_latency,
@@ -371,6 +362,34 @@ def Performance_evaluation(batch_size,config):
         # print_stats(stats)
     print(f"{'='*60}\n")
 
+def Full_matmul_evaluation(mode, config, window=2, writeback_latency=0):
+    """
+    对完整的 A*S (n*n 乘 n*nbar) 与 S'*A (mbar*n 乘 n*n) 做指令级调度，
+    给出端到端周期数与engine利用率。
+    """
+    sim = Simulator()
+    n_PEs = config['n_PEs']
+    dis, n, mbar, nbar, S_bits, hash_latency = get_distribution(mode, n_PEs)
+    A = np.random.randint(-7, 8, size=(n, n))
+    reports = {}
+    for multiply_type in ["left", "right"]:
+        sim.reset()
+        config['sparse_enable'] = True
+        mmu = MMU("mmu", sim, **config)
+        if multiply_type == "left":
+            S_matrix = ProbabilityDistribution(dis).generate_matrix(shape=(n, nbar))
+            task = sim.spawn(mmu.execute_full_left, S_matrix, A, S_bits, window, writeback_latency)
+        else:
+            S_matrix = ProbabilityDistribution(dis).generate_matrix(shape=(mbar, n))
+            task = sim.spawn(mmu.execute_full_right, S_matrix, A, S_bits, window, writeback_latency)
+        sim.run(print_progress=False)
+        _, report = task.result
+        reports[multiply_type] = report
+        print(f"{mode} {multiply_type}: 指令数 {report['n_instructions']}, "
+              f"总周期 {report['total_cycles']} (不重叠 {report['serial_cycles']}), "
+              f"平均利用率 {report['mean_utilization']:.2%}")
+    return reports
+
 if __name__ == "__main__":
     sim = Simulator()
     
@@ -389,10 +408,18 @@ if __name__ == "__main__":
     # stats, latency_array = Sparse_evaluation("Scloud-192",batch_size,"left",config)
     # print_stats(stats)
 
+    # 用 FrodoKEM 采样器生成的真实 S 评估(结果缓存在 workloads/ 下)
+    # from utils.workload import KEMWorkload
+    # workload = KEMWorkload("FrodoKEM-640-SHAKE", "S", count=batch_size, cache_dir="workloads")
+    # stats, latency_array = Sparse_evaluation("Frodo-640",batch_size,"left",config,workload)
+    # print_stats(stats)
+
     config['n_engines'] = 8
     config['n_lanes'] = 1
     plot_latency_histogram("Frodo-640",batch_size,config)
 
+    # Full_matmul_evaluation("Frodo-640",config,window=2,writeback_latency=2)
+
     # config['n_lanes'] = 1
     # config['n_engines'] = 8
     # Performance_evaluation(batch_size,config)
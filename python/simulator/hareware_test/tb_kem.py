@@ -0,0 +1,212 @@
+import sys
+import os
+# 添加父目录到路径，以便导入 core 和 hardware 模块
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# FrodoKEM 参考实现
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), 'frodo'))
+
+from core import Simulator, Fifo
+from hardware.MMU import MMU
+from hardware.SHAKEPool import SHAKEPool
+from frodokem import FrodoKEM
+from scloudplus import ScloudPlus
+import numpy as np
+import struct
+
+
+class KEMCycleEstimator:
+    """
+    运行真实的 FrodoKEM (或 ScloudPlus) keygen/encaps/decaps，记录其中每一次 SHAKE 调用、A 的生成、
+    采样与矩阵乘，再把这些操作按顺序映射到 SHAKEPool 与 MMU 上仿真，得到每个KEM操作的周期数。
+
+    - SHAKE 调用: SHAKEPool 上的一次请求
+    - A 的生成: 每行一次 SHAKE-128(i||seedA, 2n字节)，A 的m行(FrodoKEM中m=n)通过 stream 送入 MMU
+    - 采样: 没有对应的硬件模块，按每周期 sample_rate 个元素计
+    - 矩阵乘: 以采样得到的小矩阵(S/S')做切片，另一个矩阵作为A，调用 MMU 的完整矩阵乘
+    加法、打包与编码不计入。
+    """
+    def __init__(self, kem, mmu_config,
+                 n_shake_cores=1,
+                 sample_rate=4,
+                 overlap_A=True,
+                 stream_depth=8,
+                 window=2,
+                 writeback_latency=0,
+                 S_bits=5,
+                 freq_mhz=100):
+        if not kem.gen_rows.__name__.startswith("genSHAKE"):
+            raise ValueError("仿真器中没有AES模型，只支持用SHAKE-128生成A的变体")
+        self.kem = kem
+        self.mmu_config = dict(mmu_config)
+        self.n_shake_cores = n_shake_cores
+        self.sample_rate = sample_rate
+        self.overlap_A = overlap_A
+        self.stream_depth = stream_depth
+        self.window = window
+        self.writeback_latency = writeback_latency
+        self.S_bits = S_bits
+        self.freq_mhz = freq_mhz
+        self._trace = []
+        self._install_hooks()
+
+    def _install_hooks(self):
+        kem = self.kem
+        #矩阵乘来自两者共用的 LWEMatrixEngine(lwe_matrix.py)
+        shake = kem.shake
+        gen_A_mul = kem._gen_A_mul
+        mul_gen_A = kem._mul_gen_A
+        matrix_mul = kem._matrix_mul
+        self.shake_mode = "SHAKE-128" if shake.__name__.endswith("shake128") else "SHAKE-256"
+
+        def traced_shake(msg, digest_len):
+            self._trace.append(('shake', bytes(msg), digest_len))
+            return shake(msg, digest_len)
+
+        def traced_gen_A_mul(seedA, S):
+            self._trace.append(('gen_matmul', bytes(seedA), S, True))
+            return gen_A_mul(seedA, S)
+
+        def traced_mul_gen_A(Sprime, seedA):
+            self._trace.append(('gen_matmul', bytes(seedA), Sprime, False))
+            return mul_gen_A(Sprime, seedA)
+
+        def traced_sampler(sampler):
+            #FrodoKEM.sample_matrix(r, n1, n2)，ScloudPlus.sample_matrix/sample_secret(r, n1, n2, 参数)
+            def traced(r, n1, n2, *args):
+                self._trace.append(('sample', n1 * n2))
+                return sampler(r, n1, n2, *args)
+            return traced
+
+        def traced_matrix_mul(X, Y):
+            self._trace.append(('matmul', X, Y))
+            return matrix_mul(X, Y)
+
+        kem.shake = traced_shake
+        kem._gen_A_mul = traced_gen_A_mul
+        kem._mul_gen_A = traced_mul_gen_A
+        kem._matrix_mul = traced_matrix_mul
+        for name in ("sample_matrix", "sample_secret"):
+            if hasattr(kem, name):
+                setattr(kem, name, traced_sampler(getattr(kem, name)))
+
+    def _traced(self, func, *args):
+        self._trace = []
+        result = func(*args)
+        return result, self._trace
+
+    def _is_secret(self, M):
+        #S/S'的元素都在S_bits位补码范围内，A/B/B'不会
+        return np.max(np.abs(np.asarray(M))) < (1 << (self.S_bits - 1))
+
+    def _gen_rows(self, sim, pool, stream, seedA):
+        #每次向池提交n_shake_cores行，按行号顺序送入stream
+        n = self.kem.n
+        m = getattr(self.kem, "m", n)
+        for start in range(0, m, self.n_shake_cores):
+            rows = range(start, min(start + self.n_shake_cores, m))
+            tasks = [sim.spawn(pool.execute(struct.pack('<H', i) + seedA, 2 * n, shake="SHAKE-128")) for i in rows]
+            yield tasks
+            for i in rows:
+                yield stream.push(i)
+
+    def _gen_matmul(self, sim, pool, mmu, seedA, S_matrix, left, stages):
+        n = self.kem.n
+        m = getattr(self.kem, "m", n)
+        start = sim.current_time
+        stream = Fifo("a_stream", sim, self.stream_depth if self.overlap_A else m)
+        producer = sim.spawn(self._gen_rows(sim, pool, stream, seedA))
+        if not self.overlap_A:
+            yield producer
+            stages['gen_A'] += sim.current_time - start
+            start = sim.current_time
+        if left:
+            yield mmu.execute_full_left_stream(S_matrix, stream, m, self.S_bits, self.window, self.writeback_latency)
+        else:
+            yield mmu.execute_full_right_stream(S_matrix, stream, n, self.S_bits, self.window, self.writeback_latency)
+        yield producer
+        stages['gen_A+matmul' if self.overlap_A else 'matmul'] += sim.current_time - start
+
+    def _replay(self, trace):
+        sim = Simulator()
+        pool = SHAKEPool("shake_pool", sim, n_cores=self.n_shake_cores)
+        config = dict(self.mmu_config)
+        config['data_simulate_enable'] = False
+        mmu = MMU("mmu", sim, **config)
+        stages = {'hash': 0, 'sample': 0, 'matmul': 0}
+        if self.overlap_A:
+            stages['gen_A+matmul'] = 0
+        else:
+            stages['gen_A'] = 0
+
+        def main():
+            for event in trace:
+                start = sim.current_time
+                if event[0] == 'shake':
+                    #SHAKE模块按64位lane输出，输出长度向上取整到8字节
+                    yield pool.execute(event[1], -(-event[2] // 8) * 8, shake=self.shake_mode)
+                    stages['hash'] += sim.current_time - start
+                elif event[0] == 'gen_matmul':
+                    yield self._gen_matmul(sim, pool, mmu, event[1], np.asarray(event[2]), event[3], stages)
+                elif event[0] == 'sample':
+                    yield sim.delay(-(-event[1] // self.sample_rate))
+                    stages['sample'] += sim.current_time - start
+                elif event[0] == 'matmul':
+                    X, Y = event[1], event[2]
+                    if self._is_secret(X):
+                        yield mmu.execute_full_right(np.asarray(X), np.asarray(Y), self.S_bits, self.window, self.writeback_latency)
+                        stages['matmul'] += sim.current_time - start
+                    else:
+                        yield mmu.execute_full_left(np.asarray(Y), np.asarray(X), self.S_bits, self.window, self.writeback_latency)
+                        stages['matmul'] += sim.current_time - start
+
+        sim.spawn(main())
+        sim.run(print_progress=False)
+        total_cycles = sim.current_time
+        return {
+            'total_cycles': total_cycles,
+            'stages': stages,
+            'latency_us': total_cycles / self.freq_mhz,
+            'ops_per_second': self.freq_mhz * 1e6 / total_cycles,
+        }
+
+    def run(self):
+        """依次执行 keygen、encaps、decaps，返回每个操作的周期数与各阶段分解"""
+        (pk, sk), keygen_trace = self._traced(self.kem.kem_keygen)
+        (ct, ss_e), encaps_trace = self._traced(self.kem.kem_encaps, pk)
+        ss_d, decaps_trace = self._traced(self.kem.kem_decaps, sk, ct)
+        assert ss_e == ss_d, "Shared secrets not equal"
+        return {
+            'keygen': self._replay(keygen_trace),
+            'encaps': self._replay(encaps_trace),
+            'decaps': self._replay(decaps_trace),
+        }
+
+
+def print_kem_report(variant, report):
+    print(f"\n{'='*60}")
+    print(f"{variant}")
+    print(f"{'='*60}")
+    for op, result in report.items():
+        print(f"{op}: {result['total_cycles']} cycles, {result['latency_us']:.1f} us, "
+              f"{result['ops_per_second']:.1f} ops/s")
+        for stage, cycles in result['stages'].items():
+            print(f"    {stage:<14}: {cycles}")
+    print(f"{'='*60}\n")
+
+
+if __name__ == "__main__":
+    config = {
+        'sparse_enable': True,
+        'n_engines': 4,
+        'n_PEs': 4,
+        'n_lanes': 2,
+        'slice_latency': 1,
+        'buffer_latency': 1,
+    }
+    for variant in ["FrodoKEM-640-SHAKE", "FrodoKEM-976-SHAKE", "FrodoKEM-1344-SHAKE"]:
+        estimator = KEMCycleEstimator(FrodoKEM(variant), config, n_shake_cores=2)
+        print_kem_report(variant, estimator.run())
+    #Scloud+的S/S'为三值矩阵，按2位切片
+    for variant in ["Scloud+-128", "Scloud+-192", "Scloud+-256"]:
+        estimator = KEMCycleEstimator(ScloudPlus(variant), config, n_shake_cores=2, S_bits=2)
+        print_kem_report(variant, estimator.run())
@@ -0,0 +1,84 @@
+import sys
+import os
+# 添加父目录到路径，以便导入 core 和 hardware 模块
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core import Simulator
+from hardware.MMU import MMU
+from hardware.SHAKEPool import SHAKEPool
+import numpy as np
+import struct
+from utils.data import ProbabilityDistribution
+from tb_MMU import get_distribution
+
+
+def run_pool(n_cores, inputs, output_len, shake="SHAKE-128", arbitration="fifo"):
+    """所有请求在 t=0 同时到达，返回池的统计报告"""
+    sim = Simulator()
+    pool = SHAKEPool("shake_pool", sim, n_cores=n_cores, arbitration=arbitration)
+
+    def requester(data, index):
+        yield pool.execute(data, output_len, shake=shake, requester=index)
+
+    for i, data in enumerate(inputs):
+        sim.spawn(requester(data, i))
+    sim.run(print_progress=False)
+    return pool.report()
+
+
+def mmu_cycles(mode, config):
+    """A已就绪时完整 A*S 的MMU周期数"""
+    sim = Simulator()
+    dis, n, mbar, nbar, S_bits, _ = get_distribution(mode, config['n_PEs'])
+    config['sparse_enable'] = True
+    mmu = MMU("mmu", sim, **config)
+    S_matrix = ProbabilityDistribution(dis).generate_matrix(shape=(n, nbar))
+    task = sim.spawn(mmu.execute_full_left, S_matrix, np.zeros((n, n), dtype=np.int64), S_bits)
+    sim.run(print_progress=False)
+    _, report = task.result
+    return report['total_cycles']
+
+
+def Pool_sizing(mode, config, max_cores=8, arbitration="fifo", seedA=bytes(16)):
+    """
+    找出生成完整A(每行 SHAKE(i||seedA, 2n字节))不慢于MMU完成 A*S 所需的最少Keccak核数。
+    同时给出 SHAKE-128 与 SHAKE-256 两种速率下池的吞吐。
+    """
+    dis, n, mbar, nbar, S_bits, _ = get_distribution(mode, config['n_PEs'])
+    inputs = [struct.pack('<H', i) + seedA for i in range(n)]
+    target = mmu_cycles(mode, config)
+    print(f"\n{'='*60}")
+    print(f"{mode}: n_engines={config['n_engines']}, MMU周期 {target}, "
+          f"需求 {2 * n * n / target:.2f} 字节/周期")
+    print(f"{'='*60}")
+    required = {}
+    for shake in ["SHAKE-128", "SHAKE-256"]:
+        required[shake] = None
+        for n_cores in range(1, max_cores + 1):
+            report = run_pool(n_cores, inputs, 2 * n, shake, arbitration)
+            print(f"{shake} 核数 {n_cores}: 周期 {report['elapsed_cycles']}, "
+                  f"{report['output_bytes_per_cycle']:.2f} 字节/周期, "
+                  f"平均利用率 {np.mean(report['core_utilization']):.2%}, "
+                  f"平均排队 {report['mean_queue_delay']:.0f}")
+            if report['elapsed_cycles'] <= target:
+                required[shake] = n_cores
+                break
+        print(f"{shake} 所需核数: {required[shake] if required[shake] is not None else f'>{max_cores}'}")
+    return required
+
+
+if __name__ == "__main__":
+    config = {
+        'data_simulate_enable': False,
+        'sparse_enable': True,
+        'n_engines': 4,
+        'n_PEs': 4,
+        'n_lanes': 2,
+        'slice_latency': 1,
+        'buffer_latency': 1,
+    }
+    modes = ["Frodo-640", "Frodo-976", "Frodo-1344", "Scloud-128", "Scloud-192", "Scloud-256"]
+    for n_engines in [4, 8]:
+        config['n_engines'] = n_engines
+        for mode in modes:
+            Pool_sizing(mode, config)
@@ -0,0 +1,93 @@
+import sys
+import os
+# 添加父目录到路径，以便导入 core 和 hardware 模块
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core import Simulator, Fifo
+from hardware.MMU import MMU
+from hardware.SHAKE import SHAKE
+import struct
+from utils.data import ProbabilityDistribution
+from tb_MMU import get_distribution
+
+
+def Stream_evaluation(mode, config, fifo_depths=(1, 2, 4, 8, 16, 32, 64), multiply_type="left",
+                      window=2, writeback_latency=0, seedA=bytes(16)):
+    """
+    SHAKE 逐行生成 A 并通过有界 stream 送入 MMU，扫描 stream 深度。
+
+    返回:
+        list: 每个深度的结果字典
+    """
+    n_PEs = config['n_PEs']
+    dis, n, mbar, nbar, S_bits, _ = get_distribution(mode, n_PEs)
+    if multiply_type == "left":
+        S_matrix = ProbabilityDistribution(dis).generate_matrix(shape=(n, nbar))
+    elif multiply_type == "right":
+        S_matrix = ProbabilityDistribution(dis).generate_matrix(shape=(mbar, n))
+    else:
+        raise ValueError("multiply_type只能是left,right")
+    # A的第i行 = SHAKE128(i || seedA, 2n字节)
+    inputs = [struct.pack('<H', i) + seedA for i in range(n)]
+
+    results = []
+    for depth in fifo_depths:
+        sim = Simulator()
+        config['sparse_enable'] = True
+        mmu = MMU("mmu", sim, **config)
+        shake = SHAKE("shake", sim, shake="SHAKE-128")
+        a_stream = Fifo("a_stream", sim, depth)
+        hash_task = sim.spawn(shake.execute_stream, inputs, 2 * n, a_stream)
+        if multiply_type == "left":
+            mmu_task = sim.spawn(mmu.execute_full_left_stream, S_matrix, a_stream, n, S_bits, window, writeback_latency)
+        else:
+            mmu_task = sim.spawn(mmu.execute_full_right_stream, S_matrix, a_stream, n, S_bits, window, writeback_latency)
+        sim.run(print_progress=False)
+        hash_cycles = hash_task.result
+        _, report = mmu_task.result
+        result = {
+            'mode': mode,
+            'fifo_depth': depth,
+            'total_cycles': report['total_cycles'],
+            'hash_cycles': hash_cycles,
+            'mmu_cycles': report['mmu_cycles'],
+            'bound': "hash" if hash_cycles >= report['mmu_cycles'] else "mmu",
+            # 与两者中较慢一方的差距，即未被重叠掉的周期
+            'gap': report['total_cycles'] - max(hash_cycles, report['mmu_cycles']),
+            'producer_stall_cycles': report['producer_stall_cycles'],
+            'consumer_stall_cycles': report['consumer_stall_cycles'],
+            'stream_max_occupancy': report['stream_max_occupancy'],
+        }
+        results.append(result)
+    return results
+
+
+def print_stream_results(results):
+    print(f"\n{'='*60}")
+    print(f"SHAKE->MMU 流水: {results[0]['mode']}")
+    print(f"哈希周期: {results[0]['hash_cycles']}  MMU周期: {results[0]['mmu_cycles']}  "
+          f"({'哈希受限' if results[0]['bound'] == 'hash' else 'MMU受限'})")
+    print(f"{'='*60}")
+    print(f"{'深度':>6} {'总周期':>10} {'差距':>8} {'SHAKE停顿':>10} {'MMU等待':>10}")
+    for r in results:
+        print(f"{r['fifo_depth']:>6} {r['total_cycles']:>10} {r['gap']:>8} "
+              f"{r['producer_stall_cycles']:>10} {r['consumer_stall_cycles']:>10}")
+    best = min(r['total_cycles'] for r in results)
+    depth = min(r['fifo_depth'] for r in results if r['total_cycles'] == best)
+    print(f"达到最小总周期 {best} 所需的最小深度: {depth} 行")
+    print(f"{'='*60}\n")
+
+
+if __name__ == "__main__":
+    config = {
+        'data_simulate_enable': False,
+        'sparse_enable': True,
+        'n_engines': 4,
+        'n_PEs': 4,
+        'n_lanes': 2,
+        'slice_latency': 1,
+        'buffer_latency': 1,
+    }
+    for mode in ["Frodo-640", "Frodo-976", "Frodo-1344"]:
+        results = Stream_evaluation(mode, config, writeback_latency=2)
+        print_stream_results(results)
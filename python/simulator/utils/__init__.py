@@ -1,5 +1,6 @@
 from .matrix_processing import create_transrow_tasks_from_matrix
 from .data import TransRow
+from .golden import GoldenVectors, GoldenEntry
 
-__all__ = ['create_transrow_tasks_from_matrix', 'TransRow']
+__all__ = ['create_transrow_tasks_from_matrix', 'TransRow', 'GoldenVectors', 'GoldenEntry']
 
@@ -0,0 +1,99 @@
+import json
+import os
+
+import numpy as np
+
+
+class GoldenEntry:
+    """
+    一个 KAT 条目(某个变体的某个 count)的 golden vector。
+    矩阵在第一次访问时以 np.load(mmap_mode='r') 只读内存映射加载，字节串读为 bytes。
+
+    用法:
+        entry['keygen', 'S^T']   # 按 (操作, 名字) 取值
+        entry.names('encaps')    # 该操作记录的全部名字(按产生顺序)
+        entry.kat('pk')          # NIST KAT 的 pk/sk/ct/ss
+    """
+
+    def __init__(self, directory, variant, params, data):
+        self.directory = directory
+        self.variant = variant
+        self.params = params
+        self.count = data['count']
+        self.seed = bytes.fromhex(data['seed'])
+        self._data = data
+        self._loaded = {}
+
+    def _load(self, desc):
+        path = os.path.join(self.directory, desc['file'])
+        if path not in self._loaded:
+            if desc['dtype'] == 'bytes':
+                with open(path, 'rb') as fh:
+                    self._loaded[path] = fh.read()
+            else:
+                self._loaded[path] = np.load(path, mmap_mode='r')
+        return self._loaded[path]
+
+    def names(self, op):
+        return list(self._data[op].keys())
+
+    def describe(self, op, name):
+        """返回清单中的描述 {file, dtype, shape/length}，不加载数据"""
+        return self._data[op][name]
+
+    def __getitem__(self, key):
+        op, name = key
+        return self._load(self._data[op][name])
+
+    def __contains__(self, key):
+        op, name = key
+        return op in self._data and name in self._data[op]
+
+    def kat(self, name):
+        return self._load(self._data['kat'][name])
+
+
+class GoldenVectors:
+    """
+    读取 python/frodo/golden.py 导出的 golden vector 目录(manifest.json + .npy/.bin)。
+    只解析清单，数据在访问时才加载，可供仿真器硬件模型和 cocotb 测试直接使用真实数据。
+
+    用法:
+        gv = GoldenVectors("golden")
+        entry = gv["FrodoKEM-640-SHAKE", 0]
+        A = entry["keygen", "A"]         # (n, n) uint16, 内存映射
+        S = entry["keygen", "S^T"].T     # (n, nbar) int16
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        with open(os.path.join(directory, 'manifest.json'), 'r') as fh:
+            self.manifest = json.load(fh)
+        self._entries = {}
+
+    def variants(self):
+        return list(self.manifest['variants'].keys())
+
+    def params(self, variant):
+        return self.manifest['variants'][variant]['params']
+
+    def counts(self, variant):
+        return [data['count'] for data in self.manifest['variants'][variant]['entries']]
+
+    def __getitem__(self, key):
+        variant, count = key
+        if key not in self._entries:
+            info = self.manifest['variants'][variant]
+            for data in info['entries']:
+                if data['count'] == count:
+                    self._entries[key] = GoldenEntry(self.directory, variant, info['params'], data)
+                    break
+            else:
+                raise KeyError(key)
+        return self._entries[key]
+
+    def entries(self, variant=None):
+        """依次返回(某个变体或全部变体的)所有条目"""
+        for v in ([variant] if variant is not None else self.variants()):
+            for count in self.counts(v):
+                yield self[v, count]
@@ -0,0 +1,226 @@
+import concurrent.futures
+import hashlib
+import os
+import sys
+import warnings
+
+import numpy as np
+
+from .data import ProbabilityDistribution
+
+# FrodoKEM / ScloudPlus 参考实现
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), 'frodo'))
+from frodokem import FrodoKEM
+from scloudplus import ScloudPlus
+
+# kind: 'S' 为 keygen 中的 S (n*nbar，左乘 A*S)，"S'" 为 encaps 中的 S' (mbar*m，右乘 S'*A)
+KINDS = ('S', "S'")
+
+
+def make_kem(variant):
+    """按变体名构造 FrodoKEM-* 或 Scloud+-* 的实例"""
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        if variant.startswith("Scloud+"):
+            return ScloudPlus(variant)
+        return FrodoKEM(variant)
+
+
+def seed_for(seed, index, length):
+    """种子流中第 index 个 seedSE: SHAKE-256(seed || index(8字节小端), length)"""
+    return hashlib.shake_256(bytes(seed) + int(index).to_bytes(8, 'little')).digest(length)
+
+
+def sample_secret(kem, seedSE, kind):
+    """
+    按 KEM 中的过程由 seedSE 采样秘密矩阵，与 keygen/encaps 在同一 seedSE 下得到的矩阵完全相同。
+
+    参数:
+        kem: FrodoKEM 或 ScloudPlus 实例
+        seedSE (bytes): 种子
+        kind: 'S' 返回 S (n*nbar)，"S'" 返回 S' (mbar*m，FrodoKEM中m=n)
+    """
+    if kind not in KINDS:
+        raise ValueError("kind只能是S或S'")
+    # SHAKE 是XOF，只取采样 S/S' 所需的前缀与 KEM 中的输出一致
+    if isinstance(kem, ScloudPlus):
+        if kind == 'S':
+            r = kem.shake(b'\x5f' + seedSE, 4 * kem.nbar * kem.n)
+            return kem.sample_secret(r, kem.nbar, kem.n, kem.h1).T
+        r = kem.shake(b'\x96' + seedSE, 4 * kem.mbar * kem.m)
+        return kem.sample_secret(r, kem.mbar, kem.m, kem.h2)
+    if kind == 'S':
+        r = np.frombuffer(kem.shake(b'\x5f' + seedSE, 2 * kem.n * kem.nbar), dtype='<u2')
+        return kem.sample_matrix(r, kem.nbar, kem.n).T
+    r = np.frombuffer(kem.shake(b'\x96' + seedSE, 2 * kem.mbar * kem.n), dtype='<u2')
+    return kem.sample_matrix(r, kem.mbar, kem.n)
+
+
+def exact_distribution(variant, kind='S'):
+    """
+    秘密矩阵元素的精确分布。
+
+    FrodoKEM: 对 sample 的全部 2^16 个输入计数，即由 T_chi 确定的分布；
+    Scloud+: 每行恰有 h 个 ±1 (符号等概率)，单个元素为 ±1 的概率各 h/(2*长度)。
+
+    返回:
+        ProbabilityDistribution
+    """
+    kem = make_kem(variant)
+    if isinstance(kem, ScloudPlus):
+        h, length = (kem.h1, kem.n) if kind == 'S' else (kem.h2, kem.m)
+        return ProbabilityDistribution({-1: h / (2 * length), 0: 1 - h / length, 1: h / (2 * length)})
+    e = kem.sample(np.arange(2 ** 16, dtype=np.uint16))
+    values, counts = np.unique(e, return_counts=True)
+    return ProbabilityDistribution({int(v): int(c) / 2 ** 16 for v, c in zip(values, counts)})
+
+
+_worker_kems = {}
+
+
+def _worker_kem(variant):
+    if variant not in _worker_kems:
+        _worker_kems[variant] = make_kem(variant)
+    return _worker_kems[variant]
+
+
+def _sample_chunk(variant, kind, seed, start, stop):
+    kem = _worker_kem(variant)
+    return np.stack([sample_secret(kem, seed_for(seed, i, kem.len_seedSE_bytes), kind) for i in range(start, stop)]).astype(np.int8)
+
+
+def _fill_chunk(variant, kind, seed, start, stop, path):
+    out = np.load(path, mmap_mode='r+')
+    out[start:stop] = _sample_chunk(variant, kind, seed, start, stop)
+    out.flush()
+
+
+class KEMWorkload:
+    """
+    由真实 KEM 采样器生成的 S/S' 工作负载。
+    第 i 个矩阵由种子流 seed_for(seed, i) 作为 seedSE 采样得到，可复现；
+    多进程并行生成，给定 cache_dir 时结果以 .npy 保存并以内存映射方式读取，下次直接复用。
+
+    用法:
+        workload = KEMWorkload("FrodoKEM-640-SHAKE", "S", count=1000, cache_dir="workloads")
+        for S in workload: ...                       # 逐个取矩阵
+        S_batch = workload.blocks(100, (640, 8))     # (100, 640, 8) 的批量
+        dis = workload.distribution()                # 精确分布
+    """
+
+    def __init__(self, variant, kind='S', count=1000, seed=b'', workers=None, cache_dir=None, chunk=64):
+        """
+        参数:
+            variant: FrodoKEM-{640,976,1344}-{AES,SHAKE} 或 Scloud+-{128,192,256}
+            kind: 'S' 或 "S'"
+            count: 矩阵个数
+            seed (bytes): 种子流的种子
+            workers: 进程数，None 为CPU个数，1 为在本进程中串行生成
+            cache_dir: 缓存目录，None 则只在内存中生成
+            chunk: 每个任务生成的矩阵个数
+        """
+        if kind not in KINDS:
+            raise ValueError("kind只能是S或S'")
+        self.variant = variant
+        self.kind = kind
+        self.count = count
+        self.seed = bytes(seed)
+        self.workers = workers or os.cpu_count()
+        self.cache_dir = cache_dir
+        self.chunk = chunk
+        kem = make_kem(variant)
+        m = getattr(kem, 'm', kem.n)
+        self.shape = (kem.n, kem.nbar) if kind == 'S' else (kem.mbar, m)
+        self._matrices = None
+
+    def __len__(self):
+        return self.count
+
+    def _ranges(self):
+        return [(start, min(start + self.chunk, self.count)) for start in range(0, self.count, self.chunk)]
+
+    def _path(self):
+        name = "{:s}-{:s}-{:s}-{:d}.npy".format(self.variant, 'S' if self.kind == 'S' else 'Sprime',
+                                                hashlib.sha256(self.seed).hexdigest()[:16], self.count)
+        return os.path.join(self.cache_dir, name)
+
+    def _generate(self):
+        """在内存中生成全部矩阵"""
+        if self.workers <= 1:
+            return np.concatenate([_sample_chunk(self.variant, self.kind, self.seed, start, stop) for start, stop in self._ranges()])
+        with concurrent.futures.ProcessPoolExecutor(max_workers=self.workers) as executor:
+            ranges = self._ranges()
+            chunks = executor.map(_sample_chunk, [self.variant] * len(ranges), [self.kind] * len(ranges), [self.seed] * len(ranges),
+                                  [start for start, stop in ranges], [stop for start, stop in ranges])
+            return np.concatenate(list(chunks))
+
+    def _generate_cached(self, path):
+        """各进程直接写入临时 .npy 文件中属于自己的部分，完成后再改名，其他进程不会读到不完整的文件"""
+        os.makedirs(self.cache_dir, exist_ok=True)
+        tmp_path = "{:s}.{:d}.tmp".format(path, os.getpid())
+        out = np.lib.format.open_memmap(tmp_path, mode='w+', dtype=np.int8, shape=(self.count,) + self.shape)
+        del out
+        if self.workers <= 1:
+            for start, stop in self._ranges():
+                _fill_chunk(self.variant, self.kind, self.seed, start, stop, tmp_path)
+        else:
+            with concurrent.futures.ProcessPoolExecutor(max_workers=self.workers) as executor:
+                futures = [executor.submit(_fill_chunk, self.variant, self.kind, self.seed, start, stop, tmp_path) for start, stop in self._ranges()]
+                for future in futures:
+                    future.result()
+        os.replace(tmp_path, path)
+
+    def matrices(self):
+        """
+        返回全部矩阵，形状 (count, rows, cols)，int8。
+        有缓存目录时为只读内存映射。
+        """
+        if self._matrices is None:
+            if self.cache_dir is None:
+                self._matrices = self._generate()
+            else:
+                path = self._path()
+                if not os.path.exists(path):
+                    self._generate_cached(path)
+                self._matrices = np.load(path, mmap_mode='r')
+        return self._matrices
+
+    def __iter__(self):
+        if self._matrices is None and self.cache_dir is None:
+            # 不缓存时按块流式生成，不必等全部生成完
+            if self.workers <= 1:
+                for start, stop in self._ranges():
+                    yield from _sample_chunk(self.variant, self.kind, self.seed, start, stop)
+                return
+            with concurrent.futures.ProcessPoolExecutor(max_workers=self.workers) as executor:
+                futures = [executor.submit(_sample_chunk, self.variant, self.kind, self.seed, start, stop) for start, stop in self._ranges()]
+                for future in futures:
+                    yield from future.result()
+            return
+        yield from self.matrices()
+
+    def blocks(self, count, shape):
+        """
+        返回 count 个 shape 大小的块，形状 (count, rows, cols)。
+        rows 须等于矩阵行数，每个矩阵按列切成 cols 列的块(余下的列丢弃)，
+        例如左乘直接取 S (n*nbar)，右乘取 S' 的 mbar*n_PEs 列块。
+        """
+        rows, cols = shape
+        if rows != self.shape[0] or cols > self.shape[1]:
+            raise ValueError(f"块形状{shape}与矩阵形状{self.shape}不匹配")
+        per = self.shape[1] // cols
+        needed = -(-count // per)
+        if needed > self.count:
+            raise ValueError(f"需要{needed}个矩阵，但工作负载只有{self.count}个")
+        M = np.asarray(self.matrices()[:needed])
+        B = M[:, :, :per * cols].reshape(needed, rows, per, cols).transpose(0, 2, 1, 3).reshape(-1, rows, cols)
+        return B[:count]
+
+    def distribution(self):
+        """秘密矩阵元素的精确分布(见 exact_distribution)"""
+        return exact_distribution(self.variant, self.kind)
+
+    def empirical_distribution(self):
+        """工作负载中元素的经验分布"""
+        values, counts = np.unique(np.asarray(self.matrices()), return_counts=True)
+        return ProbabilityDistribution({int(v): int(c) for v, c in zip(values, counts)})